@@ -105,6 +105,63 @@ def calculate_distance(ind1, ind2):
     return math.sqrt((ind1.x - ind2.x)**2 + (ind1.y - ind2.y)**2)
 
 
+def get_cell(individual, cell_size):
+    """
+    Finds the grid cell that an individual falls into.
+    
+    Parameters:
+        individual (Individual): The individual to locate.
+        cell_size (float): The width and height of each cell.
+    
+    Returns:
+        tuple: The (column, row) of the cell.
+    """
+    return (int(individual.x // cell_size), int(individual.y // cell_size))
+
+
+def build_spatial_hash(population, cell_size, state="infected"):
+    """
+    Builds a uniform spatial hash of the individuals in a given state.
+    
+    Parameters:
+        population (list): List of Individual objects.
+        cell_size (float): The width and height of each cell.
+        state (str): Only individuals in this state are added to the hash.
+    
+    Returns:
+        dict: Maps (column, row) cells to lists of population indices.
+    """
+    spatial_hash = {}
+    for index, individual in enumerate(population):
+        if individual.state == state:
+            spatial_hash.setdefault(get_cell(individual, cell_size), []).append(index)
+    return spatial_hash
+
+
+def find_nearby_indices(individual, spatial_hash, cell_size):
+    """
+    Collects the indices stored in the cell of an individual and its eight neighbouring cells.
+    
+    Parameters:
+        individual (Individual): The individual at the centre of the search.
+        spatial_hash (dict): A hash created by build_spatial_hash.
+        cell_size (float): The cell size the hash was built with.
+    
+    Returns:
+        list: Candidate population indices in ascending order.
+    """
+    column, row = get_cell(individual, cell_size)
+    candidates = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            cell = spatial_hash.get((column + dx, row + dy))
+            if cell:
+                candidates.extend(cell)
+    # Keep population order so random draws match a full scan.
+    candidates.sort()
+    return candidates
+
+
 def simulate_step(population, parameters):
     """
     Performs a single simulation time step:
@@ -129,16 +186,20 @@ def simulate_step(population, parameters):
     for individual in population:
         move_individual(individual, parameters)
 
-    # 2. For each susceptible individual, check for nearby infected individuals.
-    for individual in population:
+    # 2. For each susceptible individual, check infected individuals in nearby cells.
+    cell_size = infection_distance if infection_distance > 0 else 1
+    infected_hash = build_spatial_hash(population, cell_size)
+    for index, individual in enumerate(population):
         if individual.state == "susceptible":
-            for other in population:
-                if other.state == "infected":
-                    if calculate_distance(individual, other) <= infection_distance:
-                        if random.random() < p_transmission:
-                            individual.state = "infected"
-                            individual.days_infected = 0
-                            break  # No need to check further once infected.
+            for other_index in find_nearby_indices(individual, infected_hash, cell_size):
+                other = population[other_index]
+                if calculate_distance(individual, other) <= infection_distance:
+                    if random.random() < p_transmission:
+                        individual.state = "infected"
+                        individual.days_infected = 0
+                        # Newly infected individuals can infect others in this same step.
+                        infected_hash.setdefault(get_cell(individual, cell_size), []).append(index)
+                        break  # No need to check further once infected.
 
     # 3. Update infected individuals.
     for individual in population:
@@ -0,0 +1,355 @@
+"""
+Scaling Benchmarks for the Disease Spread Simulation
+
+This program runs the simulation across a ladder of population sizes,
+densities and step counts for each engine, and records steps per second,
+peak memory and distance evaluations per step to a JSON file. When a baseline
+file from an earlier run is given, each case is compared against it so that
+regressions show up as numbers, and the program exits with status 1.
+
+Store a baseline once, then compare later runs against it:
+    python benchmark_simulation.py --save-baseline baseline.json
+    python benchmark_simulation.py --output bench.json --baseline baseline.json
+"""
+
+# ---------------------------
+# Module Imports
+# ---------------------------
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from simulation_program import run_simulation, StepStats
+
+# ---------------------------------
+# Engines to benchmark: name -> (run_simulation engine, extra parameters,
+# largest population the engine is run with). The mean-field model's cost
+# does not depend on the population, and the memmap engine is capped like
+# the in-memory arrays so its files stay small enough for a temporary directory.
+# ---------------------------------
+ENGINES = {
+    "python": ("python", {}, 20000),
+    "python-scheduled": ("python", {"scheduled_recovery": True, "aggregate_draws": True}, 20000),
+    "numpy": ("numpy", {}, 10**6),
+    "numpy-scheduled": ("numpy", {"scheduled_recovery": True, "aggregate_draws": True}, 10**6),
+    "shared": ("shared", {}, 10**6),
+    "distributed": ("distributed", {}, 10**6),
+    "memmap": ("memmap", {}, 10**6),
+    "ode": ("ode", {}, 10**6)
+}
+
+# ---------------------------------
+# Engines that do not collect StepStats, so their distance evaluations are
+# not measured. The shared and distributed engines also allocate most of
+# their memory in worker processes, which tracemalloc does not see.
+# ---------------------------------
+UNMEASURED_ENGINES = ("shared", "distributed", "ode")
+
+# ---------------------------------
+# Ladders of population sizes, densities (individuals per unit area)
+# and step counts.
+# ---------------------------------
+FULL_LADDER = {
+    "population_sizes": [1000, 10000, 100000, 1000000],
+    "densities": [0.05, 0.2],
+    "step_counts": [20]
+}
+QUICK_LADDER = {
+    "population_sizes": [500, 2000],
+    "densities": [0.05],
+    "step_counts": [5]
+}
+
+# -----------------------------------------------------
+# Function: make_parameters
+# Builds the simulation parameters for one benchmark case.
+# -----------------------------------------------------
+def make_parameters(population_size, density, simulation_steps):
+    """
+    Builds simulation parameters with a grid sized for the requested density.
+
+    Parameters:
+        population_size (int): The number of individuals.
+        density (float): Individuals per unit of grid area.
+        simulation_steps (int): The number of steps to run.
+
+    Returns:
+        dict: Simulation parameters.
+    """
+    return {
+        "population_size": population_size,
+        "initial_infected": max(1, population_size // 100),
+        "grid_size": math.sqrt(population_size / density),
+        "movement_rate": 5,
+        "infection_distance": 5,
+        "p_transmission": 0.3,
+        "infection_duration": 10,
+        "p_death": 0.02,
+        "simulation_steps": simulation_steps,
+        # Keep simulating after extinction so every case does the same amount of work
+        "stop_when_extinct": False
+    }
+
+# -----------------------------------------------------
+# Function: run_case
+# Benchmarks one engine on one set of parameters.
+# -----------------------------------------------------
+def run_case(engine_name, parameters, seed=0, repeats=3):
+    """
+    Times runs of the simulation, keeping the fastest to reduce noise, then
+    runs it once more under tracemalloc with a StepStats to measure peak
+    memory and distance evaluations.
+
+    Parameters:
+        engine_name (str): A key of ENGINES.
+        parameters (dict): Simulation parameters from make_parameters.
+        seed (int): The random seed for every run.
+        repeats (int): The number of timed runs.
+
+    Returns:
+        dict: The case description and its measurements. The distance
+              evaluations are None for the engines in UNMEASURED_ENGINES.
+    """
+    engine, extra_parameters, _ = ENGINES[engine_name]
+    parameters = dict(parameters, **extra_parameters)
+
+    elapsed = float("inf")
+    for repeat in range(repeats):
+        random.seed(seed)
+        start = time.perf_counter()
+        run_simulation(parameters, engine=engine)
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    # Measuring memory slows the run down, so it is timed separately
+    stats = None if engine in UNMEASURED_ENGINES else StepStats()
+    random.seed(seed)
+    tracemalloc.start()
+    run_simulation(parameters, engine=engine, stats=stats)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "engine": engine_name,
+        "population_size": parameters["population_size"],
+        "density": parameters["population_size"] / parameters["grid_size"]**2,
+        "simulation_steps": parameters["simulation_steps"],
+        "seconds": elapsed,
+        "steps_per_second": parameters["simulation_steps"] / elapsed if elapsed else float("inf"),
+        "peak_memory_bytes": peak_memory,
+        "distance_evaluations_per_step": (None if stats is None
+                                          else stats.summary()["distance_evaluations_per_step"])
+    }
+
+# -----------------------------------------------------
+# Function: run_benchmarks
+# Runs every case of a ladder for every engine.
+# -----------------------------------------------------
+def run_benchmarks(ladder, engines=None, seed=0, repeats=3, log=print):
+    """
+    Runs the benchmark ladder.
+
+    Parameters:
+        ladder (dict): Lists of "population_sizes", "densities" and "step_counts".
+        engines (list): Names from ENGINES to run. Defaults to all of them.
+        seed (int): The random seed for every case.
+        repeats (int): The number of timed runs per case.
+        log (function): Called with a line of text after each case, or None.
+
+    Returns:
+        list: One result dictionary per case from run_case.
+    """
+    if engines is None:
+        engines = list(ENGINES)
+    results = []
+    for engine_name in engines:
+        max_population = ENGINES[engine_name][2]
+        for population_size in ladder["population_sizes"]:
+            if population_size > max_population:
+                continue
+            for density in ladder["densities"]:
+                for simulation_steps in ladder["step_counts"]:
+                    parameters = make_parameters(population_size, density, simulation_steps)
+                    result = run_case(engine_name, parameters, seed, repeats)
+                    results.append(result)
+                    if log is not None:
+                        log(format_result(result))
+    return results
+
+# -----------------------------------------------------
+# Function: case_key
+# Identifies a benchmark case for baseline comparisons.
+# -----------------------------------------------------
+def case_key(result):
+    """
+    Parameters:
+        result (dict): A result from run_case.
+
+    Returns:
+        tuple: (engine, population_size, density, simulation_steps).
+    """
+    return (result["engine"], result["population_size"], round(result["density"], 6),
+            result["simulation_steps"])
+
+# -----------------------------------------------------
+# Function: compare_to_baseline
+# Finds cases that got slower or used more memory.
+# -----------------------------------------------------
+def compare_to_baseline(results, baseline, tolerance=0.2):
+    """
+    Compares benchmark results with a baseline run.
+
+    Parameters:
+        results (list): Results from run_benchmarks.
+        baseline (list): Results from an earlier run.
+        tolerance (float): The fractional change that counts as a regression.
+
+    Returns:
+        list: One dictionary per regression with the case, metric, baseline
+              value, current value and ratio of current to baseline.
+    """
+    baseline_by_key = {case_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        previous = baseline_by_key.get(case_key(result))
+        if previous is None:
+            continue
+        # Lower steps per second is worse; higher memory and work are worse
+        checks = [
+            ("steps_per_second", previous["steps_per_second"] > 0 and
+             result["steps_per_second"] < previous["steps_per_second"] * (1 - tolerance)),
+            ("peak_memory_bytes",
+             result["peak_memory_bytes"] > previous["peak_memory_bytes"] * (1 + tolerance)),
+            ("distance_evaluations_per_step",
+             result["distance_evaluations_per_step"] is not None and
+             previous["distance_evaluations_per_step"] is not None and
+             result["distance_evaluations_per_step"] > previous["distance_evaluations_per_step"] * (1 + tolerance))
+        ]
+        for metric, regressed in checks:
+            if regressed:
+                regressions.append({
+                    "case": case_key(result),
+                    "metric": metric,
+                    "baseline": previous[metric],
+                    "current": result[metric],
+                    "ratio": result[metric] / previous[metric] if previous[metric] else float("inf")
+                })
+    return regressions
+
+# -----------------------------------------------------
+# Function: format_result
+# Formats one result as a line of text.
+# -----------------------------------------------------
+def format_result(result):
+    """
+    Parameters:
+        result (dict): A result from run_case.
+
+    Returns:
+        str: A one-line summary of the case.
+    """
+    distances = result["distance_evaluations_per_step"]
+    distances = "n/a" if distances is None else f"{distances:.0f}"
+    return (f"{result['engine']:>18} N={result['population_size']:>8} "
+            f"density={result['density']:.3f} steps={result['simulation_steps']:>4} "
+            f"{result['steps_per_second']:10.2f} steps/s "
+            f"{result['peak_memory_bytes'] / 2**20:9.1f} MiB "
+            f"{distances:>12} distances/step")
+
+# -----------------------------------------------------
+# Function: save_results
+# Writes benchmark results to a JSON file.
+# -----------------------------------------------------
+def save_results(path, results, ladder):
+    """
+    Writes the results, with the Python version, machine and ladder they came
+    from, to a JSON file that load_baseline can read back.
+
+    Parameters:
+        path (str): The JSON file to write.
+        results (list): Results from run_benchmarks.
+        ladder (dict): The ladder the results were measured on.
+    """
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "ladder": ladder,
+        "results": results
+    }
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2)
+
+# -----------------------------------------------------
+# Function: load_baseline
+# Reads the results stored by save_results.
+# -----------------------------------------------------
+def load_baseline(path):
+    """
+    Parameters:
+        path (str): A JSON file written by save_results.
+
+    Returns:
+        list: The stored results, for compare_to_baseline.
+    """
+    with open(path) as file:
+        return json.load(file)["results"]
+
+# -----------------------------------------------------
+# Main function to run the benchmarks.
+# -----------------------------------------------------
+def main(argv=None):
+    """
+    Main function that:
+      1. Reads the command-line options.
+      2. Runs the benchmark ladder.
+      3. Writes the results to a JSON file, and to a baseline file if asked to.
+      4. Compares them with a baseline file if one was given.
+
+    Parameters:
+        argv (list): Optional command-line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: The exit status, 1 if any case regressed against the baseline and 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the disease spread simulation.")
+    parser.add_argument("--output", default="bench_output.json", help="JSON file to write results to")
+    parser.add_argument("--save-baseline", help="Also store the results in this JSON file as a baseline")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare against")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), help="Engines to benchmark")
+    parser.add_argument("--quick", action="store_true", help="Run a small ladder")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Fractional change counted as a regression")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for every case")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per case; the fastest is kept")
+    args = parser.parse_args(argv)
+
+    # Read the baseline first so a missing file fails before the long run
+    baseline = load_baseline(args.baseline) if args.baseline else None
+    ladder = QUICK_LADDER if args.quick else FULL_LADDER
+    results = run_benchmarks(ladder, args.engines, args.seed, args.repeats)
+    save_results(args.output, results, ladder)
+    print(f"Wrote {len(results)} results to {args.output}")
+    if args.save_baseline:
+        save_results(args.save_baseline, results, ladder)
+        print(f"Saved the results as a baseline in {args.save_baseline}")
+
+    if baseline is None:
+        return 0
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression['case']} {regression['metric']}: "
+              f"{regression['baseline']:.4g} -> {regression['current']:.4g} "
+              f"({regression['ratio']:.2f}x)")
+    if regressions:
+        return 1
+    print("No regressions against the baseline.")
+    return 0
+
+# -----------------------------------------------------
+# Entry point of the program.
+# -----------------------------------------------------
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""
+Shared helpers for the test files. pytest loads this file before the tests,
+and the test files import make_parameters from it.
+"""
+
+# ---------------------------------
+# A small set of simulation parameters that runs quickly with every engine.
+# ---------------------------------
+BASE_PARAMETERS = {
+    "population_size": 200,
+    "initial_infected": 10,
+    "grid_size": 50,
+    "movement_rate": 5,
+    "infection_distance": 4,
+    "p_transmission": 0.3,
+    "infection_duration": 5,
+    "p_death": 0.1,
+    "simulation_steps": 10
+}
+
+
+def make_parameters(**changes):
+    """Return a small set of simulation parameters with optional changes."""
+    parameters = dict(BASE_PARAMETERS)
+    parameters.update(changes)
+    return parameters
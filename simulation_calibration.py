@@ -0,0 +1,253 @@
+"""
+Calibration of the Disease Spread Simulation
+
+This module fits simulation parameters, such as p_transmission and
+infection_distance, to an observed series of infected or dead counts. A
+Nelder-Mead simplex search, which needs no derivatives, proposes candidate
+parameter sets within the given bounds. Each candidate is scored by the mean
+squared error between the target and the mean of a batch of replicates.
+
+To make the comparison between candidates fair, every candidate is run with
+the same replicate seeds (common random numbers), so differences in the score
+come from the parameters rather than from luck. Replicates of all candidates
+that are proposed together run on one process pool, and candidates that were
+already evaluated are looked up instead of run again.
+"""
+
+# ---------------------------
+# Module Imports
+# ---------------------------
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from simulation_program import STATES, PROCESS_ENGINES
+from simulation_ensemble import replicate_seeds, run_replicate
+
+# -----------------------------------------------------
+# Function: nelder_mead
+# Minimizes a function inside the unit cube.
+# -----------------------------------------------------
+def nelder_mead(evaluate, start, max_evaluations=60, tolerance=1e-8, step=0.25):
+    """
+    Minimizes a function of points in the unit cube with the Nelder-Mead
+    simplex method. Points outside the cube are clipped back into it.
+
+    Parameters:
+        evaluate (function): Called with a list of points (numpy arrays) and
+                             returns their values, so that points that are
+                             needed together can be evaluated in parallel.
+        start (numpy.ndarray): The starting point.
+        max_evaluations (int): Stop after evaluating about this many points.
+        tolerance (float): Stop when the values of the simplex differ by less than this.
+        step (float): The size of the starting simplex along each axis.
+
+    Returns:
+        tuple: The best point and its value.
+    """
+    start = np.clip(np.asarray(start, dtype=float), 0, 1)
+    dimensions = len(start)
+    simplex = [start]
+    for axis in range(dimensions):
+        vertex = start.copy()
+        # Step away from the nearer edge of the cube
+        vertex[axis] += step if vertex[axis] + step <= 1 else -step
+        simplex.append(vertex)
+    values = list(evaluate(simplex))
+    evaluations = len(simplex)
+
+    while evaluations < max_evaluations:
+        order = np.argsort(values)
+        simplex = [simplex[index] for index in order]
+        values = [values[index] for index in order]
+        if values[-1] - values[0] <= tolerance:
+            break
+
+        centroid = np.mean(simplex[:-1], axis=0)
+        reflected = np.clip(centroid + (centroid - simplex[-1]), 0, 1)
+        reflected_value = evaluate([reflected])[0]
+        evaluations += 1
+        if reflected_value < values[0]:
+            expanded = np.clip(centroid + 2 * (centroid - simplex[-1]), 0, 1)
+            expanded_value = evaluate([expanded])[0]
+            evaluations += 1
+            if expanded_value < reflected_value:
+                simplex[-1], values[-1] = expanded, expanded_value
+            else:
+                simplex[-1], values[-1] = reflected, reflected_value
+            continue
+        if reflected_value < values[-2]:
+            simplex[-1], values[-1] = reflected, reflected_value
+            continue
+
+        # Contract towards the better of the worst point and its reflection
+        if reflected_value < values[-1]:
+            contracted = centroid + 0.5 * (reflected - centroid)
+        else:
+            contracted = centroid + 0.5 * (simplex[-1] - centroid)
+        contracted_value = evaluate([contracted])[0]
+        evaluations += 1
+        if contracted_value < min(reflected_value, values[-1]):
+            simplex[-1], values[-1] = contracted, contracted_value
+            continue
+
+        # Shrink every point towards the best one
+        simplex = [simplex[0]] + [simplex[0] + 0.5 * (vertex - simplex[0]) for vertex in simplex[1:]]
+        values = [values[0]] + list(evaluate(simplex[1:]))
+        evaluations += dimensions
+
+    best = int(np.argmin(values))
+    return simplex[best], values[best]
+
+# -----------------------------------------------------
+# Function: point_to_parameters
+# Maps a point of the unit cube onto parameter bounds.
+# -----------------------------------------------------
+def point_to_parameters(point, bounds):
+    """
+    Parameters:
+        point (numpy.ndarray): Coordinates between 0 and 1, one per bound.
+        bounds (dict): Maps parameter names to (low, high) tuples. Parameters
+                       whose bounds are both integers are rounded to integers.
+
+    Returns:
+        dict: The parameter values.
+    """
+    values = {}
+    for coordinate, (key, (low, high)) in zip(point, bounds.items()):
+        value = low + float(coordinate) * (high - low)
+        if isinstance(low, int) and isinstance(high, int):
+            values[key] = int(round(value))
+        else:
+            values[key] = round(value, 12)
+    return values
+
+# -----------------------------------------------------
+# Function: curve_error
+# Scores replicate runs against the target series.
+# -----------------------------------------------------
+def curve_error(runs, target, state="infected"):
+    """
+    Computes the mean squared error between the replicate mean of one state and the target.
+
+    Parameters:
+        runs (numpy.ndarray): Counts shaped (replicates, steps + 1, 4).
+        target (numpy.ndarray): The observed counts from time step 0 onwards.
+                                Only the steps that both series have are compared.
+        state (str): The state the target counts.
+
+    Returns:
+        float: The mean squared error.
+    """
+    curve = runs[:, :, STATES.index(state)].mean(axis=0)
+    length = min(len(curve), len(target))
+    return float(np.mean((curve[:length] - target[:length])**2))
+
+# -----------------------------------------------------
+# Function: run_timed_replicate
+# Runs one replicate and measures how long it took.
+# -----------------------------------------------------
+def run_timed_replicate(task):
+    """
+    Parameters:
+        task (tuple): A task for run_replicate.
+
+    Returns:
+        tuple: The result of run_replicate and the seconds it took.
+    """
+    start = time.perf_counter()
+    result = run_replicate(task)
+    return result, time.perf_counter() - start
+
+# -----------------------------------------------------
+# Function: calibrate
+# Fits parameters to an observed epidemic curve.
+# -----------------------------------------------------
+def calibrate(parameters, target, bounds, state="infected", replicates=8, seed=0, processes=None,
+              engine="python", max_evaluations=60, tolerance=1e-8, start=None):
+    """
+    Searches for the parameter values within bounds whose replicate mean best
+    matches the target series.
+
+    Parameters:
+        parameters (dict): Base simulation parameters. Their simulation_steps
+                           should cover the length of the target.
+        target (list): Observed counts of state from time step 0 onwards.
+        bounds (dict): Maps the parameters to fit to (low, high) tuples.
+        state (str): "infected" or "dead", or any other state the target counts.
+        replicates (int): Replicates averaged per candidate.
+        seed (int): Seed that the shared replicate seeds are derived from.
+        processes (int): Number of worker processes. Defaults to all cores;
+                         1 runs everything in this process, as do the
+                         engines in PROCESS_ENGINES, which start their own.
+        engine (str): The run_simulation engine to use.
+        max_evaluations (int): The most candidates the search may propose.
+        tolerance (float): Stop when the simplex's errors differ by less than this.
+        start (dict): Optional starting values. Defaults to the middle of the bounds.
+
+    Returns:
+        dict: "best_parameters" (the full parameters with the best fit),
+              "best_error", "evaluations" (the number of candidates run),
+              "total_time" in seconds, and "history", a DataFrame with one
+              row per proposed candidate: its values, "error", "seconds"
+              (replicate run time) and "cached".
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    target = np.asarray(target, dtype=float)
+    seeds = replicate_seeds(seed, replicates)
+    memo = {}
+    history = []
+    start_time = time.perf_counter()
+
+    def evaluate(points, pool):
+        candidates = [point_to_parameters(point, bounds) for point in points]
+        keys = [tuple(sorted(candidate.items())) for candidate in candidates]
+        new_keys = list(dict.fromkeys(key for key in keys if key not in memo))
+
+        # Every replicate of every new candidate is one task, all using the same seeds
+        tasks = [((number, replicate), dict(parameters, **dict(key)), engine, replicate_seed)
+                 for number, key in enumerate(new_keys)
+                 for replicate, replicate_seed in enumerate(seeds)]
+        runs = [[None] * replicates for _ in new_keys]
+        seconds = [0.0] * len(new_keys)
+        results = map(run_timed_replicate, tasks) if pool is None else pool.imap_unordered(run_timed_replicate, tasks)
+        for ((number, replicate), counts), elapsed in results:
+            runs[number][replicate] = counts
+            seconds[number] += elapsed
+        for number, key in enumerate(new_keys):
+            memo[key] = (curve_error(np.stack(runs[number]), target, state), seconds[number])
+
+        for candidate, key in zip(candidates, keys):
+            error, elapsed = memo[key]
+            cached = key not in new_keys
+            if not cached:
+                new_keys.remove(key)
+            history.append(dict(candidate, error=error, seconds=0.0 if cached else elapsed, cached=cached))
+        return [memo[key][0] for key in keys]
+
+    if start is None:
+        start_point = np.full(len(bounds), 0.5)
+    else:
+        start_point = np.array([(start[key] - low) / (high - low) for key, (low, high) in bounds.items()])
+
+    if processes == 1 or engine in PROCESS_ENGINES:
+        best_point, best_error = nelder_mead(lambda points: evaluate(points, None), start_point,
+                                             max_evaluations, tolerance)
+    else:
+        with Pool(processes) as pool:
+            best_point, best_error = nelder_mead(lambda points: evaluate(points, pool), start_point,
+                                                 max_evaluations, tolerance)
+
+    df = pd.DataFrame(history)
+    df.index.name = "Evaluation"
+    return {
+        "best_parameters": dict(parameters, **point_to_parameters(best_point, bounds)),
+        "best_error": best_error,
+        "evaluations": len(memo),
+        "total_time": time.perf_counter() - start_time,
+        "history": df
+    }
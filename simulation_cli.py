@@ -0,0 +1,312 @@
+"""
+Batch Command-Line Interface for the Disease Spread Simulation
+
+This program runs many scenarios without a window. Scenarios are read from a
+JSON file (one object, or a list of objects) or a JSON-lines file (one object
+per line). Each scenario holds the simulation parameters that differ from
+DEFAULT_PARAMETERS, plus an optional "name" and "engine". The scenarios run
+concurrently on a process pool. Each writes its state counts to a CSV or .npy
+file, and a throughput summary is printed at the end.
+
+Neither tkinter nor matplotlib.pyplot is imported, so the program starts
+quickly on servers. With --plot, each chart is drawn with a plain matplotlib
+Figure and saved as a PNG next to its counts.
+
+Run it from the command line:
+    python simulation_cli.py scenarios.jsonl --output-dir results --format npy --workers 8
+"""
+
+# ---------------------------
+# Module Imports
+# ---------------------------
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import traceback
+from multiprocessing import Pool
+
+import numpy as np
+
+from simulation_program import run_simulation, process_results, visualize_data, ENGINES, PROCESS_ENGINES
+from simulation_ensemble import replicate_seeds, results_to_array
+
+# ---------------------------------
+# Parameters used for any key a scenario leaves out.
+# ---------------------------------
+DEFAULT_PARAMETERS = {
+    "population_size": 200,
+    "initial_infected": 5,
+    "grid_size": 100,
+    "movement_rate": 5,
+    "infection_distance": 5,
+    "p_transmission": 0.3,
+    "infection_duration": 10,
+    "p_death": 0.02,
+    "simulation_steps": 50
+}
+
+# ---------------------------------
+# Output file formats and their extensions.
+# ---------------------------------
+FORMATS = {"csv": ".csv", "npy": ".npy"}
+
+# -----------------------------------------------------
+# Function: load_scenarios
+# Reads scenarios from a JSON or JSON-lines file.
+# -----------------------------------------------------
+def load_scenarios(path):
+    """
+    Parameters:
+        path (str): A JSON file holding one scenario object or a list of them,
+                    or a JSON-lines file with one scenario object per line.
+
+    Returns:
+        list: The scenario dictionaries, in file order.
+    """
+    with open(path) as file:
+        text = file.read()
+    try:
+        scenarios = json.loads(text)
+    except json.JSONDecodeError:
+        scenarios = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(scenarios, dict):
+        scenarios = [scenarios]
+    for scenario in scenarios:
+        if not isinstance(scenario, dict):
+            raise ValueError(f"Each scenario in {path} must be a JSON object, not {scenario!r}")
+    return scenarios
+
+# -----------------------------------------------------
+# Function: prepare_scenarios
+# Fills in each scenario's name, engine and parameters.
+# -----------------------------------------------------
+def prepare_scenarios(scenarios, engine="python"):
+    """
+    Parameters:
+        scenarios (list): Scenario dictionaries from load_scenarios.
+        engine (str): The engine for scenarios that do not name one.
+
+    Returns:
+        list: (name, engine, parameters) tuples with the defaults filled in.
+
+    Raises:
+        ValueError: If two scenarios share a name, or a name is not a plain
+                    file name, since it names the scenario's output files.
+    """
+    prepared = []
+    names = set()
+    for index, scenario in enumerate(scenarios):
+        scenario = dict(scenario)
+        name = str(scenario.pop("name", f"scenario-{index:03d}"))
+        if name in ("", ".", "..") or os.path.basename(name) != name or (os.altsep and os.altsep in name):
+            raise ValueError(f"Scenario names must be plain file names, not {name!r}")
+        if name in names:
+            raise ValueError(f"Two scenarios are named {name!r}")
+        names.add(name)
+        scenario_engine = scenario.pop("engine", engine)
+        prepared.append((name, scenario_engine, dict(DEFAULT_PARAMETERS, **scenario)))
+    return prepared
+
+# -----------------------------------------------------
+# Function: run_scenario
+# Runs one scenario and writes its counts.
+# -----------------------------------------------------
+def run_scenario(task):
+    """
+    Runs one scenario in a worker process and saves its results there, so
+    only a short summary is sent back. A scenario that fails does not stop
+    the others; its summary holds the error instead of a path.
+
+    Parameters:
+        task (tuple): (index, name, engine, parameters, seed, output_dir,
+                      output_format, plot). The seed seeds the random module
+                      unless the parameters hold a seed of their own.
+
+    Returns:
+        dict: The scenario's index, name, engine, population_size, steps,
+              seconds (simulation time), and either the path of the counts
+              file or the error that stopped it (the other one is None).
+    """
+    index, name, engine, parameters, seed, output_dir, output_format, plot = task
+    summary = {
+        "index": index,
+        "name": name,
+        "engine": engine,
+        "population_size": parameters.get("population_size", 0),
+        "steps": 0,
+        "seconds": 0.0,
+        "path": None,
+        "error": None
+    }
+    try:
+        random.seed(seed)
+        start = time.perf_counter()
+        results = run_simulation(parameters, engine=engine)
+        summary["seconds"] = time.perf_counter() - start
+
+        path = os.path.join(output_dir, name + FORMATS[output_format])
+        if output_format == "csv":
+            process_results(results).to_csv(path)
+        else:
+            np.save(path, results_to_array(results))
+        if plot:
+            visualize_data(process_results(results), output_path=os.path.join(output_dir, name + ".png"))
+    except Exception as error:
+        summary["error"] = "".join(traceback.format_exception_only(error)).strip()
+        return summary
+    summary["steps"] = len(results) - 1
+    summary["path"] = path
+    return summary
+
+# -----------------------------------------------------
+# Function: run_batch
+# Runs every scenario on a process pool.
+# -----------------------------------------------------
+def run_batch(scenarios, output_dir, output_format="csv", processes=None, seed=0, engine="python",
+              plot=False, log=print):
+    """
+    Runs the scenarios concurrently and writes one counts file per scenario.
+
+    Each scenario gets its own seed derived from seed, so the results do not
+    depend on the number of processes.
+
+    Parameters:
+        scenarios (list): Scenario dictionaries from load_scenarios.
+        output_dir (str): The directory for the counts files. It is created if needed.
+        output_format (str): "csv" or "npy".
+        processes (int): Number of worker processes. Defaults to all cores;
+                         1 runs everything in this process.
+        seed (int): Seed that the scenario seeds are derived from.
+        engine (str): The engine for scenarios that do not name one.
+        plot (bool): Also save a PNG chart of each scenario.
+        log (function): Called with a line of text as each scenario finishes.
+
+    Returns:
+        tuple: The summaries from run_scenario in scenario order, and the wall time in seconds.
+    """
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    if processes is None:
+        processes = os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [(index, name, scenario_engine, parameters, scenario_seed, output_dir, output_format, plot)
+             for index, ((name, scenario_engine, parameters), scenario_seed)
+             in enumerate(zip(prepare_scenarios(scenarios, engine), replicate_seeds(seed, len(scenarios))))]
+    pool_tasks = [task for task in tasks if task[2] not in PROCESS_ENGINES]
+    local_tasks = [task for task in tasks if task[2] in PROCESS_ENGINES]
+
+    summaries = [None] * len(tasks)
+    start = time.perf_counter()
+
+    def collect(task_summaries):
+        for summary in task_summaries:
+            summaries[summary["index"]] = summary
+            log(format_scenario(summary))
+
+    if processes == 1 or len(pool_tasks) <= 1:
+        collect(map(run_scenario, pool_tasks))
+    else:
+        with Pool(min(processes, len(pool_tasks))) as pool:
+            collect(pool.imap_unordered(run_scenario, pool_tasks))
+    collect(map(run_scenario, local_tasks))
+    return summaries, time.perf_counter() - start
+
+# -----------------------------------------------------
+# Function: format_scenario
+# Formats one finished scenario as a line of text.
+# -----------------------------------------------------
+def format_scenario(summary):
+    """
+    Parameters:
+        summary (dict): A summary from run_scenario.
+
+    Returns:
+        str: The scenario's name, engine, size, run time and steps per second,
+             or its error.
+    """
+    if summary.get("error"):
+        return f"{summary['name']:>20} {summary['engine']:>11} failed: {summary['error']}"
+    steps_per_second = summary["steps"] / summary["seconds"] if summary["seconds"] else float("inf")
+    return (f"{summary['name']:>20} {summary['engine']:>11} N={summary['population_size']:>9} "
+            f"{summary['steps']:>6} steps {summary['seconds']:8.3f} s {steps_per_second:10.1f} steps/s")
+
+# -----------------------------------------------------
+# Function: throughput_summary
+# Summarizes the throughput of a whole batch.
+# -----------------------------------------------------
+def throughput_summary(summaries, wall_time):
+    """
+    Parameters:
+        summaries (list): Summaries from run_scenario.
+        wall_time (float): The wall time of the batch in seconds.
+
+    Returns:
+        dict: "scenarios", "steps", "wall_time", "simulation_time" (summed over
+              scenarios), "scenarios_per_second", "steps_per_second" and
+              "individual_steps_per_second".
+    """
+    steps = sum(summary["steps"] for summary in summaries)
+    individual_steps = sum(summary["steps"] * summary["population_size"] for summary in summaries)
+    rate = 1 / wall_time if wall_time > 0 else float("inf")
+    return {
+        "scenarios": len(summaries),
+        "steps": steps,
+        "wall_time": wall_time,
+        "simulation_time": sum(summary["seconds"] for summary in summaries),
+        "scenarios_per_second": len(summaries) * rate,
+        "steps_per_second": steps * rate,
+        "individual_steps_per_second": individual_steps * rate
+    }
+
+# -----------------------------------------------------
+# Main function to run a batch of scenarios.
+# -----------------------------------------------------
+def main(argv=None):
+    """
+    Main function that:
+      1. Reads the command-line options and the scenario file.
+      2. Runs the scenarios on a process pool.
+      3. Prints a throughput summary.
+
+    Parameters:
+        argv (list): Optional command-line arguments. Defaults to sys.argv.
+
+    Returns:
+        int: The exit status, 1 if any scenario failed and 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Run disease spread scenarios without a window.")
+    parser.add_argument("scenarios", help="JSON or JSON-lines file of scenarios")
+    parser.add_argument("--output-dir", default="simulation_output", help="Directory for the result files")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv", help="File format of the counts")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--engine", choices=ENGINES, default="python",
+                        help="Engine for scenarios that do not name one")
+    parser.add_argument("--seed", type=int, default=0, help="Seed the scenario seeds are derived from")
+    parser.add_argument("--plot", action="store_true", help="Also save a PNG chart of each scenario")
+    args = parser.parse_args(argv)
+
+    scenarios = load_scenarios(args.scenarios)
+    summaries, wall_time = run_batch(scenarios, args.output_dir, args.format, args.workers, args.seed,
+                                     args.engine, args.plot)
+    summary = throughput_summary(summaries, wall_time)
+    print(f"Ran {summary['scenarios']} scenarios ({summary['steps']} steps) in {summary['wall_time']:.2f} s "
+          f"using {summary['simulation_time']:.2f} s of simulation time")
+    print(f"Throughput: {summary['scenarios_per_second']:.2f} scenarios/s, "
+          f"{summary['steps_per_second']:.1f} steps/s, "
+          f"{summary['individual_steps_per_second']:.3g} individual-steps/s")
+    print(f"Wrote results to {args.output_dir}")
+    failed = [summary for summary in summaries if summary["error"]]
+    if failed:
+        print(f"{len(failed)} of {len(summaries)} scenarios failed: "
+              + ", ".join(summary["name"] for summary in failed))
+        return 1
+    return 0
+
+# -----------------------------------------------------
+# Entry point of the program.
+# -----------------------------------------------------
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+Domain-Decomposed Disease Spread Simulation
+
+This module splits the grid into vertical strips and simulates each strip in
+its own worker process with the array engine from simulation_numpy.py. Each
+step, a worker only exchanges two things with the workers next to it:
+    - migrants: its individuals that moved across the strip boundary, and
+    - a halo: copies of its infected individuals within
+      infection_distance of the neighbouring strip.
+The parent process adds up the per-strip state counts of each step.
+
+Strips are at least movement_rate + infection_distance wide, so individuals
+only ever move into, and infect across, the boundary of an adjacent strip.
+Like the array engine, individuals infected during a step start spreading on
+the next step, so the results have the same statistics as engine="numpy".
+With parameters["seed"] set, individuals keep their ids as they move between
+strips and every draw comes from the counter-based streams, so the results
+are bit-identical to engine="numpy" for any number of workers.
+
+Select it with run_simulation(parameters, engine="distributed"), and set the
+number of worker processes with parameters["workers"] (default: all cores).
+"""
+
+# ---------------------------
+# Module Imports
+# ---------------------------
+import os
+import traceback
+import multiprocessing
+
+import numpy as np
+
+from simulation_numpy import (
+    STATES,
+    INFECTED,
+    PopulationArrays,
+    make_rng,
+    create_population_arrays,
+    move_population,
+    spread_infection,
+    update_infected,
+    count_states_arrays
+)
+from simulation_streams import make_streams
+
+# -----------------------------------------------------
+# Function: plan_strips
+# Chooses how many strips to use and how wide they are.
+# -----------------------------------------------------
+def plan_strips(parameters, workers):
+    """
+    Works out the strip width, reducing the number of strips if needed so that
+    each strip is at least movement_rate + infection_distance wide. Then only
+    the neighbouring strips hold individuals that can move within
+    infection_distance of a strip.
+
+    Parameters:
+        parameters (dict): Contains keys 'grid_size', 'movement_rate' and 'infection_distance'.
+        workers (int): The requested number of strips.
+
+    Returns:
+        tuple: (number of strips, strip width).
+    """
+    grid_size = parameters["grid_size"]
+    min_width = parameters["movement_rate"] + parameters["infection_distance"]
+    if min_width > 0:
+        workers = min(workers, int(grid_size // min_width))
+    workers = max(workers, 1)
+    return workers, grid_size / workers
+
+# -----------------------------------------------------
+# Function: strip_of
+# Finds the strip that each x-coordinate belongs to.
+# -----------------------------------------------------
+def strip_of(x, width, strips):
+    """
+    Parameters:
+        x (numpy.ndarray): x-coordinates.
+        width (float): The strip width.
+        strips (int): The number of strips.
+
+    Returns:
+        numpy.ndarray: The strip index of each coordinate.
+    """
+    return np.minimum((x // width).astype(np.int64), strips - 1)
+
+# -----------------------------------------------------
+# Function: take
+# Selects some individuals from population arrays.
+# -----------------------------------------------------
+def take(population, selection):
+    """
+    Parameters:
+        population (PopulationArrays): The population to select from.
+        selection (numpy.ndarray): A boolean mask or index array.
+
+    Returns:
+        PopulationArrays: A copy of the selected individuals.
+    """
+    ids = None if population.ids is None else population.ids[selection]
+    return PopulationArrays(population.x[selection], population.y[selection],
+                            population.state[selection], population.days_infected[selection], ids)
+
+# -----------------------------------------------------
+# Function: join
+# Concatenates several sets of population arrays.
+# -----------------------------------------------------
+def join(populations):
+    """
+    Parameters:
+        populations (list): PopulationArrays to concatenate.
+
+    Returns:
+        PopulationArrays: All individuals, in order.
+    """
+    ids = None
+    if all(part.ids is not None for part in populations):
+        ids = np.concatenate([part.ids for part in populations])
+    return PopulationArrays(np.concatenate([part.x for part in populations]),
+                            np.concatenate([part.y for part in populations]),
+                            np.concatenate([part.state for part in populations]),
+                            np.concatenate([part.days_infected for part in populations]),
+                            ids)
+
+# -----------------------------------------------------
+# Function: select_halo
+# Finds infected individuals close enough to infect across a boundary.
+# -----------------------------------------------------
+def select_halo(population, low, high, infection_distance, exclude=None):
+    """
+    Finds the infected individuals within infection_distance of the strip [low, high).
+
+    Parameters:
+        population (PopulationArrays): The individuals to search.
+        low (float): The left edge of the strip.
+        high (float): The right edge of the strip.
+        infection_distance (float): The halo width.
+        exclude (numpy.ndarray): Optional mask of individuals to leave out.
+
+    Returns:
+        PopulationArrays: A copy of the halo individuals.
+    """
+    mask = ((population.state == INFECTED)
+            & (population.x >= low - infection_distance)
+            & (population.x <= high + infection_distance))
+    if exclude is not None:
+        mask &= ~exclude
+    return take(population, mask)
+
+# -----------------------------------------------------
+# Function: receive
+# Waits for the message a neighbour sent for one step.
+# -----------------------------------------------------
+def receive(inbox, pending, step, source):
+    """
+    Returns the message from source for the given step, keeping any messages
+    that arrive early for later steps.
+
+    Parameters:
+        inbox (multiprocessing.Queue): The worker's inbox.
+        pending (dict): Messages received early, keyed by (step, source).
+        step (int): The step of the message wanted.
+        source (int): The strip that sent it.
+
+    Returns:
+        dict: The message.
+    """
+    while (step, source) not in pending:
+        message = inbox.get()
+        pending[(message["step"], message["source"])] = message
+    return pending.pop((step, source))
+
+# -----------------------------------------------------
+# Function: run_strip
+# The worker process that simulates one strip.
+# -----------------------------------------------------
+def run_strip(index, strips, width, local, parameters, inboxes, results, seed, streams=None):
+    """
+    Simulates one strip of the grid for every step, exchanging migrants and
+    halos with the neighbouring strips and reporting the strip's state counts.
+
+    Parameters:
+        index (int): The strip this worker owns.
+        strips (int): The number of strips.
+        width (float): The strip width.
+        local (PopulationArrays): The individuals that start in this strip.
+        parameters (dict): Simulation parameters.
+        inboxes (list): One multiprocessing.Queue per strip.
+        results (multiprocessing.Queue): Where (step, index, counts) are sent.
+        seed (numpy.random.SeedSequence): Seed for this worker's generator.
+        streams (CounterStreams): Optional counter-based streams to draw from
+                                  instead of the worker's generator.
+    """
+    try:
+        rng = np.random.default_rng(seed)
+        infection_distance = parameters["infection_distance"]
+        low, high = index * width, (index + 1) * width
+        neighbours = [other for other in (index - 1, index + 1) if 0 <= other < strips]
+        pending = {}
+
+        for step in range(parameters["simulation_steps"]):
+            if streams is not None:
+                streams.step += 1
+            move_population(local, parameters, rng, streams)
+            destination = strip_of(local.x, width, strips)
+
+            # Send each neighbour the individuals that moved into its strip,
+            # and the other infected individuals close enough to infect there
+            for other in neighbours:
+                moving = destination == other
+                halo = select_halo(local, other * width, (other + 1) * width,
+                                   infection_distance, exclude=moving)
+                inboxes[other].put({"step": step, "source": index,
+                                    "migrants": take(local, moving),
+                                    "halo": halo})
+
+            staying = destination == index
+            # Infected individuals that just left can still infect people here
+            halos = [select_halo(local, low, high, infection_distance, exclude=staying)]
+            parts = [take(local, staying)]
+            for other in neighbours:
+                message = receive(inboxes[index], pending, step, other)
+                parts.append(message["migrants"])
+                halos.append(message["halo"])
+            local = join(parts)
+
+            # Search for infections among this strip's individuals plus the halo
+            combined = join([local] + halos)
+            spread_infection(combined, parameters, rng, streams=streams)
+            local.state = combined.state[:len(local)]
+            local.days_infected = combined.days_infected[:len(local)]
+
+            update_infected(local, parameters, rng, streams=streams)
+            results.put((step, index, np.bincount(local.state, minlength=len(STATES))))
+    except Exception:
+        results.put(("error", index, traceback.format_exc()))
+
+# -----------------------------------------------------
+# Function: iter_simulation_distributed
+# Runs the strip workers and yields the combined counts.
+# -----------------------------------------------------
+def iter_simulation_distributed(parameters, workers=None, rng=None):
+    """
+    Runs the domain-decomposed simulation and yields the total state counts of
+    the initial state and of each step as soon as every strip has reported it.
+
+    Parameters:
+        parameters (dict): Simulation parameters.
+        workers (int): The number of strips and worker processes. Defaults to
+                       parameters["workers"], or the number of cores.
+        rng (numpy.random.Generator): Optional random generator for the initial
+                                      population and the worker seeds.
+
+    Yields:
+        dict: The state counts of each time step.
+
+    Raises:
+        ValueError: If parameters["scheduled_recovery"] is set, since the strips
+                    have no RecoveryScheduler to hand individuals over with.
+    """
+    if parameters.get("scheduled_recovery", False):
+        raise ValueError("The distributed engine does not support scheduled_recovery")
+    if workers is None:
+        workers = parameters.get("workers") or os.cpu_count() or 1
+    if rng is None:
+        rng = make_rng()
+    streams = make_streams(parameters)
+    population = create_population_arrays(parameters, rng, streams)
+    # Individuals keep their ids wherever they move, for the counter-based draws
+    population.ids = np.arange(len(population))
+    yield count_states_arrays(population)
+
+    strips, width = plan_strips(parameters, workers)
+    destination = strip_of(population.x, width, strips)
+    seeds = np.random.SeedSequence(int(rng.integers(2**63))).spawn(strips)
+    inboxes = [multiprocessing.Queue() for _ in range(strips)]
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_strip,
+                                         args=(index, strips, width, take(population, destination == index),
+                                               parameters, inboxes, results, seeds[index], streams),
+                                         daemon=True)
+                 for index in range(strips)]
+    for process in processes:
+        process.start()
+
+    try:
+        pending = {}
+        for step in range(parameters["simulation_steps"]):
+            while len(pending.get(step, [])) < strips:
+                report_step, index, counts = results.get()
+                if report_step == "error":
+                    raise RuntimeError(f"Strip worker {index} failed:\n{counts}")
+                pending.setdefault(report_step, []).append(counts)
+            total = np.sum(pending.pop(step), axis=0)
+            yield dict(zip(STATES, total.tolist()))
+        for process in processes:
+            process.join()
+    finally:
+        # Stop the workers if the caller stopped early or something failed
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+# -----------------------------------------------------
+# Function: run_simulation_distributed
+# Runs the domain-decomposed simulation to the end.
+# -----------------------------------------------------
+def run_simulation_distributed(parameters, workers=None, rng=None):
+    """
+    Runs the domain-decomposed simulation and records the state counts.
+
+    Parameters:
+        parameters (dict): Simulation parameters.
+        workers (int): The number of strips and worker processes.
+        rng (numpy.random.Generator): Optional random generator.
+
+    Returns:
+        list: A list of dictionaries, each representing the state counts at a time step.
+    """
+    return list(iter_simulation_distributed(parameters, workers, rng))
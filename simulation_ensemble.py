@@ -0,0 +1,192 @@
+"""
+Monte Carlo Ensembles for the Disease Spread Simulation
+
+A single run_simulation result is one random draw. This module runs many
+seeded replicates of the same parameters dictionary across a process pool and
+summarizes them as a mean with percentile bands. Each worker sends its state
+counts back as one compact integer array instead of a list of dictionaries.
+
+The summary DataFrame has the same "susceptible", "infected", "recovered"
+and "dead" columns as process_results (holding the ensemble mean), so it can
+be passed straight to visualize_data.
+"""
+
+# ---------------------------
+# Module Imports
+# ---------------------------
+import os
+import random
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from simulation_program import STATES, run_simulation, ResultsBuffer, PROCESS_ENGINES
+
+# -----------------------------------------------------
+# Function: results_to_array
+# Converts run_simulation results into an array.
+# -----------------------------------------------------
+def results_to_array(simulation_results):
+    """
+    Converts state counts from run_simulation into a (steps + 1) x 4 array.
+
+    Parameters:
+        simulation_results (ResultsBuffer or list): The output of run_simulation.
+
+    Returns:
+        numpy.ndarray: Counts with one column per state in STATES order. They
+                       are int64, or float64 if any count is a float, like the
+                       expected counts of the "ode" engine.
+    """
+    if isinstance(simulation_results, ResultsBuffer):
+        return simulation_results.to_array()
+    rows = [[record[state] for state in STATES] for record in simulation_results]
+    dtype = np.float64 if any(isinstance(count, float) for row in rows for count in row) else np.int64
+    return np.array(rows, dtype=dtype)
+
+# -----------------------------------------------------
+# Function: replicate_seeds
+# Derives independent seeds for each replicate.
+# -----------------------------------------------------
+def replicate_seeds(seed, replicates):
+    """
+    Derives one seed per replicate from a single ensemble seed.
+
+    Parameters:
+        seed (int): The ensemble seed.
+        replicates (int): The number of replicates.
+
+    Returns:
+        list: One integer seed per replicate.
+    """
+    return [int(value) for value in
+            np.random.SeedSequence(seed).generate_state(replicates, dtype=np.uint64)]
+
+# -----------------------------------------------------
+# Function: run_replicate
+# Runs one seeded replicate in a worker process.
+# -----------------------------------------------------
+def run_replicate(task):
+    """
+    Runs one replicate of the simulation.
+
+    The global random module is seeded for the run and put back in its
+    previous state afterwards, so replicates run in the calling process
+    leave the caller's random numbers alone.
+
+    Parameters:
+        task (tuple): (replicate number, parameters, engine, seed).
+
+    Returns:
+        tuple: The replicate number and its counts from results_to_array.
+    """
+    replicate, parameters, engine, seed = task
+    if parameters.get("seed") is not None:
+        # Seeded runs use counter-based streams, which need a seed per replicate
+        parameters = dict(parameters, seed=seed)
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        return replicate, results_to_array(run_simulation(parameters, engine=engine))
+    finally:
+        random.setstate(state)
+
+# -----------------------------------------------------
+# Function: run_replicates
+# Runs many replicates on a process pool.
+# -----------------------------------------------------
+def run_replicates(parameters, replicates, seed=0, processes=None, engine="python"):
+    """
+    Runs seeded replicates of one set of parameters across a process pool.
+
+    Replicates are collected as they finish, so the result only depends on the
+    seed and not on the number of processes.
+
+    Parameters:
+        parameters (dict): Simulation parameters.
+        replicates (int): The number of replicates to run.
+        seed (int): The ensemble seed that the replicate seeds are derived from.
+        processes (int): Number of worker processes. Defaults to all cores;
+                         1 runs everything in this process, as do the
+                         engines in PROCESS_ENGINES, which start their own.
+        engine (str): The run_simulation engine to use.
+
+    Returns:
+        numpy.ndarray: Counts shaped (replicates, steps + 1, 4), with the
+                       type of the runs' counts: float64 for the "ode"
+                       engine and int64 otherwise.
+
+    Raises:
+        ValueError: If replicates is less than 1.
+    """
+    if replicates < 1:
+        raise ValueError(f"replicates must be at least 1, not {replicates}")
+    if processes is None:
+        processes = os.cpu_count() or 1
+    runs = None
+    tasks = [(replicate, parameters, engine, replicate_seed)
+             for replicate, replicate_seed in enumerate(replicate_seeds(seed, replicates))]
+
+    def store(replicate, counts):
+        nonlocal runs
+        if runs is None:
+            runs = np.empty((replicates,) + counts.shape, dtype=counts.dtype)
+        runs[replicate] = counts
+
+    if processes == 1 or engine in PROCESS_ENGINES:
+        for task in tasks:
+            store(*run_replicate(task))
+    else:
+        with Pool(min(processes, replicates)) as pool:
+            for replicate, counts in pool.imap_unordered(run_replicate, tasks):
+                store(replicate, counts)
+    return runs
+
+# -----------------------------------------------------
+# Function: summarize_runs
+# Reduces replicate counts to a mean and percentile bands.
+# -----------------------------------------------------
+def summarize_runs(runs, percentiles=(5, 50, 95)):
+    """
+    Summarizes replicate counts as a DataFrame.
+
+    Parameters:
+        runs (numpy.ndarray): Counts shaped (replicates, steps + 1, 4).
+        percentiles (tuple): The percentiles to report for each state.
+
+    Returns:
+        pandas.DataFrame: The mean of each state in columns named like
+                          process_results, plus a "<state>_p<percentile>"
+                          column for each percentile, indexed by time step.
+    """
+    df = pd.DataFrame(runs.mean(axis=0), columns=STATES)
+    bands = np.percentile(runs, percentiles, axis=0)
+    for position, percentile in enumerate(percentiles):
+        for column, state in enumerate(STATES):
+            df[f"{state}_p{percentile:g}"] = bands[position, :, column]
+    df.index.name = "Time Step"
+    return df
+
+# -----------------------------------------------------
+# Function: run_ensemble
+# Runs an ensemble and summarizes it in one call.
+# -----------------------------------------------------
+def run_ensemble(parameters, replicates, seed=0, processes=None, engine="python",
+                 percentiles=(5, 50, 95)):
+    """
+    Runs seeded replicates of the simulation and reports their mean and percentile bands.
+
+    Parameters:
+        parameters (dict): Simulation parameters.
+        replicates (int): The number of replicates to run.
+        seed (int): The ensemble seed.
+        processes (int): Number of worker processes. Defaults to all cores.
+        engine (str): The run_simulation engine to use.
+        percentiles (tuple): The percentiles to report for each state.
+
+    Returns:
+        pandas.DataFrame: The summary from summarize_runs.
+    """
+    runs = run_replicates(parameters, replicates, seed, processes, engine)
+    return summarize_runs(runs, percentiles)
@@ -0,0 +1,248 @@
+"""
+Live Population View for the Disease Spread Simulation
+
+This module draws individuals as they move and change state, one frame per
+time step. Redrawing a whole figure each step is far too slow for large
+populations, so the view uses matplotlib blitting: the axes, labels and
+legend are drawn once and saved as a background, and each frame only
+restores that background and redraws the artists whose data changed.
+
+Up to density_threshold individuals are drawn as one marker artist per
+state. Above it, individuals are binned into a raster_bins x raster_bins
+image where each cell is coloured by the mix of states in it and shaded by
+how many individuals it holds, so the cost of a frame no longer depends on
+the population size.
+
+Watch the array engine with watch_simulation(parameters), or embed a
+LiveView in another window by passing it a matplotlib Figure.
+"""
+
+# ---------------------------
+# Module Imports
+# ---------------------------
+import numpy as np
+from matplotlib import colors
+from matplotlib.lines import Line2D
+
+from simulation_numpy import (
+    STATES,
+    DEAD,
+    RecoveryScheduler,
+    make_rng,
+    make_streams,
+    create_population_arrays,
+    simulate_step_arrays,
+    count_states_arrays
+)
+
+# ---------------------------------
+# Colour of each state, in STATES order.
+# ---------------------------------
+STATE_COLOURS = ("tab:blue", "tab:red", "tab:green", "black")
+
+# ---------------------------------
+# Define a class for the live view.
+# ---------------------------------
+class LiveView:
+    def __init__(self, grid_size, figure=None, density_threshold=20000, raster_bins=200):
+        """
+        Draws frames of the population on a matplotlib figure with blitting.
+
+        Parameters:
+            grid_size (float): The size of the grid.
+            figure (matplotlib.figure.Figure): The figure to draw on. Defaults
+                                               to a new pyplot figure.
+            density_threshold (int): Above this many individuals, a density
+                                     raster is drawn instead of markers.
+            raster_bins (int): The raster's number of cells along each side.
+        """
+        if figure is None:
+            import matplotlib.pyplot as plt
+            figure = plt.figure(figsize=(8, 8))
+        self.figure = figure
+        self.grid_size = grid_size
+        self.density_threshold = density_threshold
+        self.raster_bins = raster_bins
+        self.axes = figure.add_subplot()
+        self.axes.set_xlim(0, grid_size)
+        self.axes.set_ylim(0, grid_size)
+        self.axes.set_aspect("equal")
+        self.axes.set_title("Disease Spread Simulation")
+        self.artists = None
+        self.raster = None
+        self.background = None
+        self.last_counts = None
+        self.frames = 0
+        self.label = self.axes.text(0.01, 0.99, "", transform=self.axes.transAxes,
+                                    va="top", animated=True)
+        # The background must be saved again whenever the figure is fully redrawn
+        figure.canvas.mpl_connect("draw_event", self.save_background)
+
+    def save_background(self, event=None):
+        """
+        Saves the static parts of the figure and redraws the current frame over them.
+        """
+        canvas = self.figure.canvas
+        self.background = canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_artists()
+
+    def create_artists(self, population_size):
+        """
+        Creates the animated artists the first time a frame is drawn.
+
+        Parameters:
+            population_size (int): Chooses between markers and the density raster.
+        """
+        if population_size > self.density_threshold:
+            empty = np.zeros((self.raster_bins, self.raster_bins, 4))
+            self.raster = self.axes.imshow(empty, origin="lower", interpolation="nearest",
+                                           extent=(0, self.grid_size, 0, self.grid_size),
+                                           animated=True)
+            self.artists = []
+            handles = [Line2D([], [], marker="s", linestyle="", color=colour)
+                       for colour in STATE_COLOURS]
+        else:
+            markersize = 4 if population_size <= 2000 else 2
+            self.artists = [self.axes.plot([], [], marker=".", linestyle="", markersize=markersize,
+                                           color=colour, animated=True)[0]
+                            for colour in STATE_COLOURS]
+            handles = self.artists
+        self.axes.legend(handles, [state.capitalize() for state in STATES], loc="upper right")
+        self.figure.canvas.draw()
+
+    def draw_frame(self, step, x, y, state):
+        """
+        Draws one time step of the population.
+
+        Parameters:
+            step (int): The time step shown.
+            x (numpy.ndarray): x-coordinates of the individuals.
+            y (numpy.ndarray): y-coordinates of the individuals.
+            state (numpy.ndarray): State codes of the individuals (see STATES).
+        """
+        if self.artists is None:
+            self.create_artists(len(state))
+        counts = np.bincount(state, minlength=len(STATES))
+        if self.raster is not None:
+            self.raster.set_data(self.density_image(x, y, state))
+        else:
+            for code, artist in enumerate(self.artists):
+                # Dead individuals never move, so their markers only change with the count
+                if code == DEAD and self.last_counts is not None and counts[DEAD] == self.last_counts[DEAD]:
+                    continue
+                selected = state == code
+                artist.set_data(x[selected], y[selected])
+        self.last_counts = counts
+        self.label.set_text(f"Step {step}  " + "  ".join(
+            f"{name}: {count}" for name, count in zip(STATES, counts.tolist())))
+
+        canvas = self.figure.canvas
+        if self.background is None:
+            self.save_background()
+        else:
+            canvas.restore_region(self.background)
+            self.draw_artists()
+        canvas.blit(self.figure.bbox)
+        canvas.flush_events()
+        self.frames += 1
+
+    def draw_artists(self):
+        """
+        Draws the animated artists over the saved background.
+        """
+        if self.artists is None:
+            return
+        for artist in self.artists:
+            self.axes.draw_artist(artist)
+        if self.raster is not None:
+            self.axes.draw_artist(self.raster)
+        self.axes.draw_artist(self.label)
+
+    def density_image(self, x, y, state):
+        """
+        Bins the individuals into an RGBA image.
+
+        Each cell's colour is the average colour of the states in it, and its
+        opacity grows with the logarithm of how many individuals it holds.
+
+        Parameters:
+            x (numpy.ndarray): x-coordinates of the individuals.
+            y (numpy.ndarray): y-coordinates of the individuals.
+            state (numpy.ndarray): State codes of the individuals.
+
+        Returns:
+            numpy.ndarray: A (raster_bins, raster_bins, 4) image with rows along y.
+        """
+        bins = self.raster_bins
+        column = np.clip((x * (bins / self.grid_size)).astype(np.int64), 0, bins - 1)
+        row = np.clip((y * (bins / self.grid_size)).astype(np.int64), 0, bins - 1)
+        cell = state.astype(np.int64) * bins * bins + row * bins + column
+        counts = np.bincount(cell, minlength=len(STATES) * bins * bins).reshape(len(STATES), bins, bins)
+        total = counts.sum(axis=0)
+
+        palette = np.array([colors.to_rgb(colour) for colour in STATE_COLOURS])
+        image = np.zeros((bins, bins, 4))
+        occupied = total > 0
+        image[..., :3] = np.tensordot(counts, palette, axes=([0], [0]))
+        image[occupied, :3] /= total[occupied, None]
+        image[..., 3] = np.log1p(total) / np.log1p(max(total.max(), 1))
+        return image
+
+# -----------------------------------------------------
+# Function: frame_from_individuals
+# Converts a list of Individual objects into frame arrays.
+# -----------------------------------------------------
+def frame_from_individuals(population):
+    """
+    Parameters:
+        population (list): Individual objects with x, y and a state name.
+
+    Returns:
+        tuple: The x, y and state code arrays for LiveView.draw_frame.
+    """
+    codes = {name: code for code, name in enumerate(STATES)}
+    x = np.fromiter((individual.x for individual in population), dtype=np.float64, count=len(population))
+    y = np.fromiter((individual.y for individual in population), dtype=np.float64, count=len(population))
+    state = np.fromiter((codes[individual.state] for individual in population), dtype=np.int8,
+                        count=len(population))
+    return x, y, state
+
+# -----------------------------------------------------
+# Function: watch_simulation
+# Runs the array engine and draws every step.
+# -----------------------------------------------------
+def watch_simulation(parameters, rng=None, view=None, density_threshold=20000):
+    """
+    Runs the disease simulation with the array engine and draws a frame of the
+    population after every step. The run is the same as run_simulation with
+    the "numpy" engine, so a seeded live run shows the seeded results.
+
+    Parameters:
+        parameters (dict): Simulation parameters. With the key 'seed', draws come
+                           from counter-based streams and rng is not used.
+        rng (numpy.random.Generator): Optional random generator.
+        view (LiveView): Optional view to draw on. Defaults to a new pyplot window.
+        density_threshold (int): Passed to the new LiveView.
+
+    Returns:
+        list: A list of dictionaries, each representing the state counts at a time step.
+    """
+    if rng is None:
+        rng = make_rng()
+    if view is None:
+        import matplotlib.pyplot as plt
+        plt.ion()
+        view = LiveView(parameters["grid_size"], density_threshold=density_threshold)
+        plt.show(block=False)
+    streams = make_streams(parameters)
+    population = create_population_arrays(parameters, rng, streams)
+    scheduler = None
+    if parameters.get("scheduled_recovery", False):
+        scheduler = RecoveryScheduler(population, parameters)
+    results = [count_states_arrays(population)]
+    view.draw_frame(0, population.x, population.y, population.state)
+    for step in range(1, parameters["simulation_steps"] + 1):
+        simulate_step_arrays(population, parameters, rng, scheduler, streams=streams)
+        results.append(count_states_arrays(population))
+        view.draw_frame(step, population.x, population.y, population.state)
+    return results
@@ -0,0 +1,399 @@
+"""
+Out-of-Core Disease Spread Simulation
+
+This module runs the array engine from simulation_numpy.py on populations
+that do not fit in memory. The population arrays (x, y, state, days_infected
+and the individual ids) live in numpy.memmap files, and each step only holds
+a few tiles of them in memory at once.
+
+The grid is split into vertical bands, like the strips of
+simulation_distributed.py, and the files keep the individuals of each band
+together, sorted by cell within the band. A step sweeps the bands from left to
+right. Each band is read and moved once. Its new members are the individuals
+that moved into it from the bands on either side. They are searched for
+infections along with a halo of infected individuals from those bands, then
+updated and written to a second set of files. The two sets swap roles every
+step. Every band is read once and written once per step, and the bytes
+read and written are reported through StepStats.
+
+The number of bands is chosen so that a band of average density fits
+parameters["memory_budget"] bytes (default 256 MiB), but bands are never
+narrower than movement_rate + infection_distance. The files are kept in a
+temporary directory inside parameters["storage_dir"] (default: the system
+temporary directory) and deleted when the run ends. With parameters["seed"]
+set, the results are bit-identical to engine="numpy".
+
+Select it with run_simulation(parameters, engine="memmap").
+"""
+
+# ---------------------------
+# Module Imports
+# ---------------------------
+import os
+import math
+import time
+import tempfile
+
+import numpy as np
+
+from simulation_numpy import (
+    STATES,
+    SUSCEPTIBLE,
+    INFECTED,
+    DEAD,
+    PopulationArrays,
+    make_rng,
+    move_population,
+    spread_infection,
+    update_infected
+)
+from simulation_distributed import plan_strips, strip_of, take, join, select_halo
+from simulation_streams import PLACE_X, PLACE_Y, INITIAL_INFECTION, make_streams
+
+# ---------------------------------
+# Names and types of the stored population arrays.
+# ---------------------------------
+FIELDS = (("x", np.float64), ("y", np.float64), ("state", np.int8), ("days_infected", np.int32),
+          ("ids", np.int64))
+BYTES_PER_INDIVIDUAL = sum(np.dtype(dtype).itemsize for _, dtype in FIELDS)
+
+# ---------------------------------
+# Default memory budget, and roughly how many tiles a step holds at once
+# (three moved bands, the new members, the halo and temporary arrays).
+# ---------------------------------
+MEMORY_BUDGET = 256 * 2**20
+TILES_IN_MEMORY = 8
+
+# ---------------------------------
+# Define a class for population arrays stored in files.
+# ---------------------------------
+class MemmapPopulation:
+    def __init__(self, directory, name, size):
+        """
+        Creates memory-mapped files for a population and counts the bytes
+        copied in and out of them.
+
+        Parameters:
+            directory (str): The directory for the files.
+            name (str): The prefix of the file names.
+            size (int): The number of individuals.
+        """
+        self.size = size
+        self.arrays = {}
+        for field, dtype in FIELDS:
+            path = os.path.join(directory, f"{name}.{field}.dat")
+            # memmap cannot map an empty file, so always keep at least one element
+            self.arrays[field] = np.memmap(path, dtype=dtype, mode="w+", shape=(max(size, 1),))
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def read(self, start, end, fields=None):
+        """
+        Copies a range of individuals into memory.
+
+        Parameters:
+            start (int): The first individual.
+            end (int): One past the last individual.
+            fields (tuple): Optional names of the only fields to read.
+
+        Returns:
+            PopulationArrays: The individuals, with any fields not read set to None.
+        """
+        arrays = {}
+        for field, _ in FIELDS:
+            if fields is None or field in fields:
+                arrays[field] = np.array(self.arrays[field][start:end])
+                self.bytes_read += arrays[field].nbytes
+            else:
+                arrays[field] = None
+        return PopulationArrays(**arrays)
+
+    def write(self, start, population):
+        """
+        Copies individuals into the files.
+
+        Parameters:
+            start (int): The position of the first individual.
+            population (PopulationArrays): The individuals, with their ids.
+        """
+        end = start + len(population)
+        for field, _ in FIELDS:
+            values = getattr(population, field)
+            self.arrays[field][start:end] = values
+            self.bytes_written += values.nbytes
+
+    def close(self):
+        """
+        Writes any changes to the files and unmaps them.
+        """
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays = {}
+
+# -----------------------------------------------------
+# Function: plan_tiles
+# Chooses the tile size and bands for a memory budget.
+# -----------------------------------------------------
+def plan_tiles(parameters):
+    """
+    Parameters:
+        parameters (dict): Simulation parameters, optionally with 'memory_budget' in bytes.
+
+    Returns:
+        tuple: (individuals per tile, number of bands, band width).
+    """
+    budget = parameters.get("memory_budget") or MEMORY_BUDGET
+    tile_size = max(budget // (BYTES_PER_INDIVIDUAL * TILES_IN_MEMORY), 1)
+    bands, width = plan_strips(parameters, math.ceil(parameters["population_size"] / tile_size))
+    return tile_size, bands, width
+
+# -----------------------------------------------------
+# Function: choose_initial_infected
+# Picks the initially infected individuals one tile at a time.
+# -----------------------------------------------------
+def choose_initial_infected(parameters, rng, streams, tile_size):
+    """
+    Chooses the ids of the initially infected individuals without holding a
+    draw for every individual in memory.
+
+    Parameters:
+        parameters (dict): Contains keys 'population_size' and 'initial_infected'.
+        rng (numpy.random.Generator): The random generator.
+        streams (CounterStreams): Optional counter-based streams. They pick the
+                                  same individuals as create_population_arrays.
+        tile_size (int): Individuals to draw for at once.
+
+    Returns:
+        numpy.ndarray: The ids of the infected individuals.
+    """
+    pop_size = parameters["population_size"]
+    initial_infected = parameters["initial_infected"]
+    if streams is None:
+        return rng.choice(pop_size, initial_infected, replace=False)
+
+    # Keep the individuals with the smallest draws seen so far, ties going to the lower id
+    best_draws = np.empty(0)
+    best_ids = np.empty(0, dtype=np.int64)
+    for start in range(0, pop_size, tile_size):
+        ids = np.arange(start, min(start + tile_size, pop_size))
+        draws = np.concatenate([best_draws, streams.uniform(INITIAL_INFECTION, ids)])
+        ids = np.concatenate([best_ids, ids])
+        keep = np.lexsort((ids, draws))[:initial_infected]
+        best_draws, best_ids = draws[keep], ids[keep]
+    return best_ids
+
+# -----------------------------------------------------
+# Function: create_population_memmap
+# Creates the initial population in files, grouped by band.
+# -----------------------------------------------------
+def create_population_memmap(parameters, rng, streams, scratch, target, tile_size, bands, width):
+    """
+    Creates the initial population one tile at a time in the scratch files,
+    then sorts it by band into the target files.
+
+    Parameters:
+        parameters (dict): Contains keys 'population_size', 'initial_infected', and 'grid_size'.
+        rng (numpy.random.Generator): The random generator.
+        streams (CounterStreams): Optional counter-based streams to draw from instead of rng.
+        scratch (MemmapPopulation): Files to create the population in, in id order.
+        target (MemmapPopulation): Files to hold the population grouped by band.
+        tile_size (int): Individuals to handle at once.
+        bands (int): The number of bands.
+        width (float): The band width.
+
+    Returns:
+        tuple: The start of each band in the target files (bands + 1 offsets),
+               and the state counts of the population.
+    """
+    pop_size = parameters["population_size"]
+    grid_size = parameters["grid_size"]
+    tiles = [(start, min(start + tile_size, pop_size)) for start in range(0, pop_size, tile_size)]
+
+    for start, end in tiles:
+        ids = np.arange(start, end)
+        if streams is None:
+            x = rng.uniform(0, grid_size, end - start)
+            y = rng.uniform(0, grid_size, end - start)
+        else:
+            x = grid_size * streams.uniform(PLACE_X, ids)
+            y = grid_size * streams.uniform(PLACE_Y, ids)
+        scratch.write(start, PopulationArrays(x, y, np.full(end - start, SUSCEPTIBLE, dtype=np.int8),
+                                              np.zeros(end - start, dtype=np.int32), ids))
+    infected_ids = choose_initial_infected(parameters, rng, streams, tile_size)
+    scratch.arrays["state"][infected_ids] = INFECTED
+    scratch.bytes_written += len(infected_ids)
+
+    # Count the individuals of each band, then copy every tile's individuals
+    # to the next free positions of their bands
+    band_sizes = np.zeros(bands, dtype=np.int64)
+    for start, end in tiles:
+        band_sizes += np.bincount(strip_of(scratch.read(start, end, ("x",)).x, width, bands), minlength=bands)
+    offsets = np.concatenate([[0], np.cumsum(band_sizes)])
+    cursors = offsets[:-1].copy()
+    counts = np.zeros(len(STATES), dtype=np.int64)
+    for start, end in tiles:
+        tile = scratch.read(start, end)
+        band = strip_of(tile.x, width, bands)
+        order = np.argsort(band, kind="stable")
+        tile_band_sizes = np.bincount(band, minlength=bands)
+        position = 0
+        for number in np.flatnonzero(tile_band_sizes).tolist():
+            size = int(tile_band_sizes[number])
+            target.write(int(cursors[number]), take(tile, order[position:position + size]))
+            cursors[number] += size
+            position += size
+        counts += np.bincount(tile.state, minlength=len(STATES))
+    return offsets, dict(zip(STATES, counts.tolist()))
+
+# -----------------------------------------------------
+# Function: step_memmap
+# Simulates one time step band by band.
+# -----------------------------------------------------
+def step_memmap(parameters, rng, streams, source, target, offsets, bands, width, stats=None):
+    """
+    Moves, infects and updates every band of the source files and writes the
+    results to the target files, keeping at most three bands in memory.
+
+    Parameters:
+        parameters (dict): Simulation parameters.
+        rng (numpy.random.Generator): The random generator.
+        streams (CounterStreams): Optional counter-based streams to draw from instead of rng.
+        source (MemmapPopulation): The population at the start of the step.
+        target (MemmapPopulation): Receives the population at the end of the step.
+        offsets (numpy.ndarray): The start of each band in source.
+        bands (int): The number of bands.
+        width (float): The band width.
+        stats (StepStats): Optional collector for phase timings, counters and bytes moved.
+
+    Returns:
+        tuple: The start of each band in target, and the state counts.
+    """
+    infection_distance = parameters["infection_distance"]
+    cell_size = infection_distance if infection_distance > 0 else 1
+    timings = {"movement_time": 0.0, "infection_time": 0.0, "update_time": 0.0}
+    counters = {"distance_evaluations": 0, "random_draws": 0}
+    new_infections = recoveries = deaths = 0
+    bytes_read, bytes_written = source.bytes_read, target.bytes_written
+
+    def load_moved(number):
+        # Read one band and move its individuals, which may carry them into a neighbouring band
+        phase_start = time.perf_counter()
+        band = source.read(int(offsets[number]), int(offsets[number + 1]))
+        counters["random_draws"] += 2 * int(np.count_nonzero(band.state != DEAD))
+        move_population(band, parameters, rng, streams)
+        timings["movement_time"] += time.perf_counter() - phase_start
+        return band, strip_of(band.x, width, bands)
+
+    new_offsets = np.zeros(bands + 1, dtype=np.int64)
+    counts = np.zeros(len(STATES), dtype=np.int64)
+    window = {0: load_moved(0)}
+    for number in range(bands):
+        if number + 1 < bands:
+            window[number + 1] = load_moved(number + 1)
+        window.pop(number - 2, None)
+
+        # The bands around this one hold everyone who can now be in it or infect it
+        phase_start = time.perf_counter()
+        moved = join([band for band, _ in window.values()])
+        destination = np.concatenate([band_destination for _, band_destination in window.values()])
+        members = destination == number
+        local = take(moved, members)
+        halo = select_halo(moved, number * width, (number + 1) * width, infection_distance, exclude=members)
+
+        # Keep each band sorted by cell so that neighbours stay close together in the files
+        cell = ((local.x // cell_size).astype(np.int64) * (int(parameters["grid_size"] // cell_size) + 3)
+                + (local.y // cell_size).astype(np.int64))
+        local = take(local, np.argsort(cell, kind="stable"))
+
+        combined = join([local, halo])
+        newly_infected = spread_infection(combined, parameters, rng, counters, streams)
+        local.state = combined.state[:len(local)]
+        local.days_infected = combined.days_infected[:len(local)]
+        new_infections += len(newly_infected)
+        update_start = time.perf_counter()
+        timings["infection_time"] += update_start - phase_start
+
+        band_recoveries, band_deaths = update_infected(local, parameters, rng, streams=streams)
+        recoveries += band_recoveries
+        deaths += band_deaths
+        target.write(int(new_offsets[number]), local)
+        new_offsets[number + 1] = new_offsets[number] + len(local)
+        counts += np.bincount(local.state, minlength=len(STATES))
+        timings["update_time"] += time.perf_counter() - update_start
+
+    if stats is not None:
+        stats.record(dict(timings,
+                          distance_evaluations=counters["distance_evaluations"],
+                          random_draws=counters["random_draws"] + recoveries + deaths,
+                          new_infections=new_infections,
+                          recoveries=recoveries,
+                          deaths=deaths,
+                          bytes_read=source.bytes_read - bytes_read,
+                          bytes_written=target.bytes_written - bytes_written))
+    return new_offsets, dict(zip(STATES, counts.tolist()))
+
+# -----------------------------------------------------
+# Function: iter_simulation_memmap
+# Runs the out-of-core engine one time step at a time.
+# -----------------------------------------------------
+def iter_simulation_memmap(parameters, rng=None, stats=None):
+    """
+    Runs the disease simulation on memory-mapped files and yields the state
+    counts of the initial state and of each time step.
+
+    Parameters:
+        parameters (dict): Simulation parameters, optionally with 'memory_budget'
+                           (bytes) and 'storage_dir'.
+        rng (numpy.random.Generator): Optional random generator.
+        stats (StepStats): Optional collector for per-step timings and counters,
+                           including "bytes_read" and "bytes_written".
+
+    Yields:
+        dict: The state counts of each time step.
+
+    Raises:
+        ValueError: If parameters["scheduled_recovery"] is set, since a
+                    RecoveryScheduler would keep per-individual queues in memory.
+    """
+    if parameters.get("scheduled_recovery", False):
+        raise ValueError("The memmap engine does not support scheduled_recovery")
+    if rng is None:
+        rng = make_rng()
+    streams = make_streams(parameters)
+    tile_size, bands, width = plan_tiles(parameters)
+    pop_size = parameters["population_size"]
+
+    with tempfile.TemporaryDirectory(prefix="simulation-", dir=parameters.get("storage_dir")) as directory:
+        files = [MemmapPopulation(directory, name, pop_size) for name in ("a", "b")]
+        try:
+            offsets, counts = create_population_memmap(parameters, rng, streams, files[1], files[0],
+                                                       tile_size, bands, width)
+            yield counts
+            for step in range(parameters["simulation_steps"]):
+                if streams is not None:
+                    streams.step += 1
+                offsets, counts = step_memmap(parameters, rng, streams, files[0], files[1],
+                                              offsets, bands, width, stats)
+                files.reverse()
+                yield counts
+        finally:
+            for population in files:
+                population.close()
+
+# -----------------------------------------------------
+# Function: run_simulation_memmap
+# Runs the out-of-core engine to the end.
+# -----------------------------------------------------
+def run_simulation_memmap(parameters, rng=None, stats=None):
+    """
+    Runs the disease simulation on memory-mapped files and records the state counts.
+
+    Parameters:
+        parameters (dict): Simulation parameters.
+        rng (numpy.random.Generator): Optional random generator.
+        stats (StepStats): Optional collector for per-step timings and counters.
+
+    Returns:
+        list: A list of dictionaries, each representing the state counts at a time step.
+    """
+    return list(iter_simulation_memmap(parameters, rng, stats))
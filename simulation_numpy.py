@@ -0,0 +1,716 @@
+"""
+NumPy Disease Spread Simulation
+
+This module runs the same disease model as simulation_program.py, but stores
+the population as a struct of arrays instead of a list of Individual objects.
+Positions, state codes and days infected live in contiguous NumPy arrays, so
+each phase of a time step is a handful of batched array operations and
+populations of a million individuals or more fit comfortably in memory.
+
+The engine accepts the same parameters dictionary as run_simulation and is
+selected with run_simulation(parameters, engine="numpy"). When
+parameters["seed"] is set, every draw comes from the counter-based streams in
+simulation_streams.py instead of a sequential generator, so the shared and
+distributed engines give bit-identical results for the same seed.
+"""
+
+# ---------------------------
+# Module Imports
+# ---------------------------
+import pickle
+import random
+import time
+import numpy as np
+
+from simulation_program import (
+    STATES,
+    ResultsBuffer,
+    write_atomically,
+    load_checkpoint,
+    convergence_history,
+    resume_steady_state
+)
+from simulation_streams import (
+    PLACE_X,
+    PLACE_Y,
+    INITIAL_INFECTION,
+    MOVE_X,
+    MOVE_Y,
+    TRANSMISSION,
+    EXPOSURE,
+    DEATH,
+    make_streams
+)
+
+# ---------------------------------
+# State codes stored in the state array, in STATES order.
+# ---------------------------------
+SUSCEPTIBLE, INFECTED, RECOVERED, DEAD = range(len(STATES))
+
+# ---------------------------------
+# Define a class for the population arrays.
+# ---------------------------------
+class PopulationArrays:
+    def __init__(self, x, y, state, days_infected, ids=None):
+        """
+        Holds the whole population as parallel arrays.
+
+        Parameters:
+            x (numpy.ndarray): float64 x-coordinates.
+            y (numpy.ndarray): float64 y-coordinates.
+            state (numpy.ndarray): int8 state codes (see STATES).
+            days_infected (numpy.ndarray): int32 time steps spent infected.
+            ids (numpy.ndarray): Optional int64 individual ids, for populations
+                                 that are not in creation order. Defaults to
+                                 the array index of each individual.
+        """
+        self.x = x
+        self.y = y
+        self.state = state
+        self.days_infected = days_infected
+        self.ids = ids
+
+    def __len__(self):
+        return len(self.state)
+
+    def id_of(self, indices):
+        """
+        Parameters:
+            indices (numpy.ndarray): Array indices of individuals.
+
+        Returns:
+            numpy.ndarray: Their individual ids.
+        """
+        return indices if self.ids is None else self.ids[indices]
+
+# ---------------------------------
+# Define a class for scheduling when infections end.
+# ---------------------------------
+class RecoveryScheduler:
+    def __init__(self, population, parameters):
+        """
+        Queues infected individuals in a timer wheel by the step their infection ends.
+
+        The wheel is a ring of infection_duration buckets of index arrays, so each
+        step only touches the individuals that recover or die in it.
+
+        Parameters:
+            population (PopulationArrays): Individuals that are already infected
+                                           are scheduled from their days_infected.
+            parameters (dict): Contains the key 'infection_duration'.
+        """
+        self.infection_duration = parameters["infection_duration"]
+        self.wheel = [[] for _ in range(max(self.infection_duration, 1))]
+        self.step = 0  # The step that the next call to pop_due resolves
+        infected = np.flatnonzero(population.state == INFECTED)
+        steps_left = np.maximum(self.infection_duration - population.days_infected[infected], 1)
+        for offset in np.unique(steps_left):
+            self.schedule(infected[steps_left == offset], self.infection_duration - offset)
+
+    def schedule(self, indices, days_infected=0):
+        """
+        Adds newly infected individuals to the bucket of the step their infection ends in.
+
+        Parameters:
+            indices (numpy.ndarray): Population indices that share days_infected.
+            days_infected (int): Time steps they have already been infected.
+        """
+        if len(indices) == 0:
+            return
+        steps_left = max(self.infection_duration - days_infected, 1)
+        self.wheel[(self.step + steps_left - 1) % len(self.wheel)].append(indices)
+
+    def pop_due(self):
+        """
+        Removes and returns the individuals whose infection ends in the current step,
+        then moves the scheduler on to the next step.
+
+        Returns:
+            numpy.ndarray: Population indices in ascending order.
+        """
+        slot = self.step % len(self.wheel)
+        due = self.wheel[slot]
+        self.wheel[slot] = []
+        self.step += 1
+        if not due:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(due))
+
+# -----------------------------------------------------
+# Function: make_rng
+# Creates the NumPy generator used by the array engine.
+# -----------------------------------------------------
+def make_rng(seed=None):
+    """
+    Creates a NumPy random generator.
+
+    When no seed is given, the seed is drawn from the random module so that
+    random.seed() makes the array engine reproducible as well.
+
+    Parameters:
+        seed (int): Optional seed for the generator.
+
+    Returns:
+        numpy.random.Generator: The random generator.
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    return np.random.default_rng(seed)
+
+# -----------------------------------------------------
+# Function: create_population_arrays
+# Creates the initial population as arrays.
+# -----------------------------------------------------
+def create_population_arrays(parameters, rng, streams=None):
+    """
+    Creates the initial population with random positions and a few infected individuals.
+
+    Parameters:
+        parameters (dict): Contains keys 'population_size', 'initial_infected', and 'grid_size'.
+        rng (numpy.random.Generator): The random generator.
+        streams (CounterStreams): Optional counter-based streams to draw from instead of rng.
+
+    Returns:
+        PopulationArrays: The new population.
+    """
+    pop_size = parameters["population_size"]
+    grid_size = parameters["grid_size"]
+    initial_infected = parameters["initial_infected"]
+
+    if streams is None:
+        x = rng.uniform(0, grid_size, pop_size)
+        y = rng.uniform(0, grid_size, pop_size)
+    else:
+        ids = np.arange(pop_size)
+        x = grid_size * streams.uniform(PLACE_X, ids)
+        y = grid_size * streams.uniform(PLACE_Y, ids)
+    state = np.full(pop_size, SUSCEPTIBLE, dtype=np.int8)
+    days_infected = np.zeros(pop_size, dtype=np.int32)
+
+    # Infect a random subset of individuals
+    if streams is None:
+        infected_indices = rng.choice(pop_size, initial_infected, replace=False)
+    else:
+        # The individuals with the smallest draws, which is a uniform random subset
+        order = np.argsort(streams.uniform(INITIAL_INFECTION, ids), kind="stable")
+        infected_indices = order[:initial_infected]
+    state[infected_indices] = INFECTED
+
+    return PopulationArrays(x, y, state, days_infected)
+
+# -----------------------------------------------------
+# Function: move_population
+# Moves every living individual in one batched operation.
+# -----------------------------------------------------
+def move_population(population, parameters, rng, streams=None):
+    """
+    Moves all living individuals randomly and clips them to the grid.
+
+    Parameters:
+        population (PopulationArrays): The population to move in place.
+        parameters (dict): Contains keys 'movement_rate' and 'grid_size'.
+        rng (numpy.random.Generator): The random generator.
+        streams (CounterStreams): Optional counter-based streams to draw from instead of rng.
+    """
+    movement_rate = parameters["movement_rate"]
+    grid_size = parameters["grid_size"]
+
+    alive = np.flatnonzero(population.state != DEAD)
+    if streams is None:
+        dx = rng.uniform(-movement_rate, movement_rate, len(alive))
+        dy = rng.uniform(-movement_rate, movement_rate, len(alive))
+    else:
+        alive_ids = population.id_of(alive)
+        dx = movement_rate * (2 * streams.uniform(MOVE_X, alive_ids) - 1)
+        dy = movement_rate * (2 * streams.uniform(MOVE_Y, alive_ids) - 1)
+    population.x[alive] = np.clip(population.x[alive] + dx, 0, grid_size)
+    population.y[alive] = np.clip(population.y[alive] + dy, 0, grid_size)
+
+# -----------------------------------------------------
+# Function: cell_rows
+# Counts the rows of the infection grid.
+# -----------------------------------------------------
+def cell_rows(parameters):
+    """
+    Parameters:
+        parameters (dict): Contains keys 'infection_distance' and 'grid_size'.
+
+    Returns:
+        int: The number of cells of size infection_distance in a column of
+             the grid, plus an empty cell at each end.
+    """
+    infection_distance = parameters["infection_distance"]
+    cell_size = infection_distance if infection_distance > 0 else 1
+    return int(parameters["grid_size"] // cell_size) + 3
+
+# -----------------------------------------------------
+# Function: cell_keys
+# Numbers the cells that individuals are in.
+# -----------------------------------------------------
+def cell_keys(population, parameters, indices):
+    """
+    Numbers the cells of a uniform grid of size infection_distance, leaving a
+    border of empty cells around it, so that neighbouring cells differ by one
+    within a column and by cell_rows between columns.
+
+    Parameters:
+        population (PopulationArrays): The population the indices belong to.
+        parameters (dict): Contains keys 'infection_distance' and 'grid_size'.
+        indices (numpy.ndarray): The individuals to number.
+
+    Returns:
+        numpy.ndarray: The cell number of each individual.
+    """
+    infection_distance = parameters["infection_distance"]
+    cell_size = infection_distance if infection_distance > 0 else 1
+    column = (population.x[indices] // cell_size).astype(np.int64) + 1
+    row = (population.y[indices] // cell_size).astype(np.int64) + 1
+    return column * cell_rows(parameters) + row
+
+# -----------------------------------------------------
+# Function: sort_by_cell
+# Sorts individuals by their cell of the infection grid.
+# -----------------------------------------------------
+def sort_by_cell(population, parameters, indices):
+    """
+    Sorts indices by the number of their cell (see cell_keys), so that the
+    members of a cell can be found with a binary search.
+
+    Parameters:
+        population (PopulationArrays): The population the indices belong to.
+        parameters (dict): Contains keys 'infection_distance' and 'grid_size'.
+        indices (numpy.ndarray): The individuals to sort.
+
+    Returns:
+        tuple: The indices in cell order, and their cell numbers.
+    """
+    keys = cell_keys(population, parameters, indices)
+    order = np.argsort(keys, kind="stable")
+    return indices[order], keys[order]
+
+# -----------------------------------------------------
+# Function: find_infection_pairs
+# Finds every (susceptible, infected) pair within infection_distance.
+# -----------------------------------------------------
+def find_infection_pairs(population, parameters, counters=None, susceptible=None, infected_index=None):
+    """
+    Finds all susceptible/infected pairs that are close enough for transmission.
+
+    The larger of the two groups is sorted by the cell of a uniform grid of
+    size infection_distance, and each member of the smaller group looks up the
+    index ranges of its own and neighbouring cells with a binary search.
+
+    Parameters:
+        population (PopulationArrays): The population to search.
+        parameters (dict): Contains keys 'infection_distance' and 'grid_size'.
+        counters (dict): Optional counters; "distance_evaluations" is increased
+                         by the number of candidate pairs measured.
+        susceptible (numpy.ndarray): Optional ascending indices of the susceptible
+                                     individuals to search. Defaults to all of them.
+        infected_index (tuple): Optional infected individuals already sorted with
+                                sort_by_cell. The susceptible individuals are then
+                                always looked up in it, so it can be built once and
+                                shared by searches of several ranges.
+
+    Returns:
+        tuple: Two equal-length index arrays (susceptible, infected).
+    """
+    infection_distance = parameters["infection_distance"]
+    x, y, state = population.x, population.y, population.state
+
+    if susceptible is None:
+        susceptible = np.flatnonzero(state == SUSCEPTIBLE)
+    infected = np.flatnonzero(state == INFECTED) if infected_index is None else infected_index[0]
+    if len(susceptible) == 0 or len(infected) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    # Sort the larger group by cell and look up the cells around the smaller group
+    if infected_index is None:
+        search_infected = len(infected) <= len(susceptible)
+        queries, table = (infected, susceptible) if search_infected else (susceptible, infected)
+        table, table_keys = sort_by_cell(population, parameters, table)
+    else:
+        search_infected = False
+        queries = susceptible
+        table, table_keys = infected_index
+    query_keys = cell_keys(population, parameters, queries)
+    rows = cell_rows(parameters)
+
+    pair_queries = []
+    pair_table = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            target = query_keys + dx * rows + dy
+            start = np.searchsorted(table_keys, target, side="left")
+            end = np.searchsorted(table_keys, target, side="right")
+            counts = end - start
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            # Expand each query into one entry per individual in the cell
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            pair_queries.append(np.repeat(queries, counts))
+            pair_table.append(table[np.repeat(start, counts) + offsets])
+
+    pair_susceptible, pair_infected = (pair_table, pair_queries) if search_infected else (pair_queries, pair_table)
+    if not pair_susceptible:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    pair_susceptible = np.concatenate(pair_susceptible)
+    pair_infected = np.concatenate(pair_infected)
+    if counters is not None:
+        counters["distance_evaluations"] += len(pair_susceptible)
+
+    distance = np.sqrt((x[pair_susceptible] - x[pair_infected])**2
+                       + (y[pair_susceptible] - y[pair_infected])**2)
+    close = distance <= infection_distance
+    return pair_susceptible[close], pair_infected[close]
+
+# -----------------------------------------------------
+# Function: spread_infection
+# Infects susceptible individuals near infected ones.
+# -----------------------------------------------------
+def spread_infection(population, parameters, rng, counters=None, streams=None):
+    """
+    Gives each in-range (susceptible, infected) pair a chance to transmit.
+
+    All pairs are tested against the infected set from the start of the phase,
+    so individuals infected during this step start spreading on the next step.
+    When parameters["aggregate_draws"] is True, each susceptible with k pairs
+    gets a single draw with probability 1 - (1 - p_transmission)**k.
+
+    Parameters:
+        population (PopulationArrays): The population to update in place.
+        parameters (dict): Contains keys 'p_transmission', 'infection_distance',
+                           and optionally 'aggregate_draws'.
+        rng (numpy.random.Generator): The random generator.
+        counters (dict): Optional "distance_evaluations" and "random_draws" counters.
+        streams (CounterStreams): Optional counter-based streams to draw from instead of rng.
+
+    Returns:
+        numpy.ndarray: Indices of the newly infected individuals.
+    """
+    pair_susceptible, pair_infected = find_infection_pairs(population, parameters, counters)
+    newly_infected = draw_infections(pair_susceptible, parameters, rng, counters,
+                                     pair_infected, streams, population.ids)
+    population.state[newly_infected] = INFECTED
+    population.days_infected[newly_infected] = 0
+    return newly_infected
+
+# -----------------------------------------------------
+# Function: draw_infections
+# Decides which exposed susceptible individuals are infected.
+# -----------------------------------------------------
+def draw_infections(pair_susceptible, parameters, rng, counters=None, pair_infected=None, streams=None,
+                    ids=None):
+    """
+    Draws the transmissions for the susceptible side of in-range pairs.
+
+    With counter-based streams each pair's draw depends only on the two
+    individuals and the step, not on the order the pairs were found in.
+
+    Parameters:
+        pair_susceptible (numpy.ndarray): The susceptible index of each pair.
+        parameters (dict): Contains key 'p_transmission' and optionally 'aggregate_draws'.
+        rng (numpy.random.Generator): The random generator.
+        counters (dict): Optional counters; "random_draws" is increased by the draws made.
+        pair_infected (numpy.ndarray): The infected index of each pair. Required with streams.
+        streams (CounterStreams): Optional counter-based streams to draw from instead of rng.
+        ids (numpy.ndarray): Optional individual id of each index (see PopulationArrays).
+
+    Returns:
+        numpy.ndarray: Ascending indices of the newly infected individuals.
+    """
+    def id_of(indices):
+        return indices if ids is None else ids[indices]
+
+    p_transmission = parameters["p_transmission"]
+    if parameters.get("aggregate_draws", False):
+        # One draw per exposed susceptible, using all of its exposures at once
+        exposed, exposures = np.unique(pair_susceptible, return_counts=True)
+        probability = 1 - (1 - p_transmission)**exposures
+        if streams is None:
+            draws = rng.random(len(exposed))
+        else:
+            draws = streams.uniform(EXPOSURE, id_of(exposed))
+        newly_infected = exposed[draws < probability]
+    else:
+        if streams is None:
+            draws = rng.random(len(pair_susceptible))
+        else:
+            draws = streams.uniform(TRANSMISSION, id_of(pair_susceptible), id_of(pair_infected))
+        newly_infected = np.unique(pair_susceptible[draws < p_transmission])
+    if counters is not None:
+        counters["random_draws"] += len(draws)
+    return newly_infected
+
+# -----------------------------------------------------
+# Function: update_infected
+# Advances infections and resolves the finished ones.
+# -----------------------------------------------------
+def update_infected(population, parameters, rng, scheduler=None, streams=None):
+    """
+    Increases days_infected for infected individuals and decides recovery or death.
+
+    With a RecoveryScheduler only the individuals whose infection ends in this
+    step are visited, and their days_infected is set when it ends.
+
+    Parameters:
+        population (PopulationArrays): The population to update in place.
+        parameters (dict): Contains keys 'infection_duration' and 'p_death'.
+        rng (numpy.random.Generator): The random generator.
+        scheduler (RecoveryScheduler): Optional timer wheel of infection end steps.
+        streams (CounterStreams): Optional counter-based streams to draw from instead of rng.
+
+    Returns:
+        tuple: The number of recoveries and deaths in this step.
+    """
+    if scheduler is not None:
+        finished = scheduler.pop_due()
+        population.days_infected[finished] = max(parameters["infection_duration"], 1)
+    else:
+        infected = population.state == INFECTED
+        population.days_infected[infected] += 1
+        finished = np.flatnonzero(infected & (population.days_infected >= parameters["infection_duration"]))
+    if streams is None:
+        draws = rng.random(len(finished))
+    else:
+        draws = streams.uniform(DEATH, population.id_of(finished))
+    dies = draws < parameters["p_death"]
+    population.state[finished] = np.where(dies, DEAD, RECOVERED)
+    deaths = int(np.count_nonzero(dies))
+    return len(finished) - deaths, deaths
+
+# -----------------------------------------------------
+# Function: simulate_step_arrays
+# Simulates one time step on the population arrays.
+# -----------------------------------------------------
+def simulate_step_arrays(population, parameters, rng, scheduler=None, stats=None, streams=None):
+    """
+    Performs a single simulation time step:
+      1. Moves all living individuals.
+      2. Infects susceptible individuals near infected individuals.
+      3. Updates infected individuals and resolves recovery or death.
+
+    Parameters:
+        population (PopulationArrays): The population to update in place.
+        parameters (dict): Dictionary of simulation parameters.
+        rng (numpy.random.Generator): The random generator.
+        scheduler (RecoveryScheduler): Optional timer wheel of infection end steps.
+        stats (StepStats): Optional collector for phase timings and counters.
+        streams (CounterStreams): Optional counter-based streams to draw from
+                                  instead of rng. They are moved on to the next step.
+
+    Returns:
+        PopulationArrays: The updated population.
+    """
+    if streams is not None:
+        streams.step += 1
+    if stats is None:
+        move_population(population, parameters, rng, streams)
+        newly_infected = spread_infection(population, parameters, rng, streams=streams)
+        if scheduler is not None:
+            scheduler.schedule(newly_infected)
+        update_infected(population, parameters, rng, scheduler, streams)
+        return population
+
+    phase_start = time.perf_counter()
+    moved = int(np.count_nonzero(population.state != DEAD))
+    move_population(population, parameters, rng, streams)
+    movement_end = time.perf_counter()
+    counters = {"distance_evaluations": 0, "random_draws": 2 * moved}
+    newly_infected = spread_infection(population, parameters, rng, counters, streams)
+    if scheduler is not None:
+        scheduler.schedule(newly_infected)
+    infection_end = time.perf_counter()
+    recoveries, deaths = update_infected(population, parameters, rng, scheduler, streams)
+    update_end = time.perf_counter()
+    stats.record({
+        "movement_time": movement_end - phase_start,
+        "infection_time": infection_end - movement_end,
+        "update_time": update_end - infection_end,
+        "distance_evaluations": counters["distance_evaluations"],
+        "random_draws": counters["random_draws"] + recoveries + deaths,
+        "new_infections": len(newly_infected),
+        "recoveries": recoveries,
+        "deaths": deaths
+    })
+    return population
+
+# -----------------------------------------------------
+# Function: count_states_arrays
+# Counts the number of individuals in each state.
+# -----------------------------------------------------
+def count_states_arrays(population):
+    """
+    Counts how many individuals are in each state.
+
+    Parameters:
+        population (PopulationArrays): The population to count.
+
+    Returns:
+        dict: A dictionary with keys "susceptible", "infected", "recovered", "dead"
+              and their corresponding counts.
+    """
+    counts = np.bincount(population.state, minlength=len(STATES))
+    return dict(zip(STATES, counts.tolist()))
+
+# -----------------------------------------------------
+# Function: iter_simulation_arrays
+# Runs the array engine one time step at a time.
+# -----------------------------------------------------
+def iter_simulation_arrays(parameters, rng=None, checkpoint_path=None, checkpoint_every=None,
+                           stats=None):
+    """
+    Runs the disease simulation with the array engine and yields the state
+    counts of the initial state and of each time step as it is computed.
+
+    Parameters:
+        parameters (dict): Simulation parameters. With the key 'seed', draws come
+                           from counter-based streams and rng is not used.
+        rng (numpy.random.Generator): Optional random generator.
+        checkpoint_path (str): Optional file to save checkpoints to.
+        checkpoint_every (int): Save a checkpoint after every this many steps.
+        stats (StepStats): Optional collector for per-step timings and counters.
+
+    Yields:
+        dict: The state counts of each time step.
+    """
+    if rng is None:
+        rng = make_rng()
+    streams = make_streams(parameters)
+    population = create_population_arrays(parameters, rng, streams)
+    scheduler = None
+    if parameters.get("scheduled_recovery", False):
+        scheduler = RecoveryScheduler(population, parameters)
+    counts = count_states_arrays(population)
+    yield counts
+    # Checkpoints need every count so far, otherwise nothing is kept
+    results = None
+    if checkpoint_path:
+        results = ResultsBuffer(parameters["simulation_steps"])
+        results.append(counts)
+    yield from iter_steps_arrays(parameters, population, rng, 0, results, scheduler,
+                                 checkpoint_path, checkpoint_every, stats, streams)
+
+# -----------------------------------------------------
+# Function: iter_steps_arrays
+# Runs the remaining steps of an array simulation.
+# -----------------------------------------------------
+def iter_steps_arrays(parameters, population, rng, start_step, results=None, scheduler=None,
+                      checkpoint_path=None, checkpoint_every=None, stats=None, streams=None):
+    """
+    Runs the array engine from start_step until simulation_steps and yields the
+    counts after each step, saving checkpoints along the way if asked to.
+
+    Parameters:
+        parameters (dict): Simulation parameters.
+        population (PopulationArrays): The population to update in place.
+        rng (numpy.random.Generator): The random generator.
+        start_step (int): The number of steps that have already run.
+        results (ResultsBuffer): The state counts recorded so far, which new
+                                 counts are appended to. Required when saving checkpoints.
+        scheduler (RecoveryScheduler): Optional timer wheel of infection end steps.
+        checkpoint_path (str): Optional file to save checkpoints to.
+        checkpoint_every (int): Save a checkpoint after every this many steps.
+        stats (StepStats): Optional collector for per-step timings and counters.
+        streams (CounterStreams): Optional counter-based streams to draw from instead of rng.
+
+    Yields:
+        dict: The state counts after each step.
+    """
+    for step in range(start_step, parameters["simulation_steps"]):
+        simulate_step_arrays(population, parameters, rng, scheduler, stats, streams)
+        counts = count_states_arrays(population)
+        if results is not None:
+            results.append(counts)
+        if checkpoint_path and checkpoint_every and (step + 1) % checkpoint_every == 0:
+            save_checkpoint_arrays(checkpoint_path, parameters, population, rng, results, scheduler,
+                                   streams)
+        yield counts
+
+# -----------------------------------------------------
+# Function: run_simulation_arrays
+# Runs the array engine for a set number of time steps.
+# -----------------------------------------------------
+def run_simulation_arrays(parameters, rng=None, checkpoint_path=None, checkpoint_every=None):
+    """
+    Runs the disease simulation with the array engine and records the state counts.
+
+    Parameters:
+        parameters (dict): Simulation parameters.
+        rng (numpy.random.Generator): Optional random generator.
+        checkpoint_path (str): Optional file to save checkpoints to.
+        checkpoint_every (int): Save a checkpoint after every this many steps.
+
+    Returns:
+        list: A list of dictionaries, each representing the state counts at a time step.
+    """
+    return list(iter_simulation_arrays(parameters, rng, checkpoint_path, checkpoint_every))
+
+# -----------------------------------------------------
+# Function: save_checkpoint_arrays
+# Saves everything needed to continue an array simulation.
+# -----------------------------------------------------
+def save_checkpoint_arrays(path, parameters, population, rng, results, scheduler=None, streams=None):
+    """
+    Saves the population arrays, step index, generator state and results to a binary file.
+
+    Parameters:
+        path (str): The checkpoint file.
+        parameters (dict): Simulation parameters.
+        population (PopulationArrays): The population.
+        rng (numpy.random.Generator): The random generator.
+        results (ResultsBuffer): The state counts recorded so far.
+        scheduler (RecoveryScheduler): Optional timer wheel of infection end steps.
+        streams (CounterStreams): Optional counter-based streams of the run.
+    """
+    checkpoint = {
+        "engine": "numpy",
+        "parameters": parameters,
+        "step": len(results) - 1,
+        "x": population.x,
+        "y": population.y,
+        "state": population.state,
+        "days_infected": population.days_infected,
+        "random_state": rng.bit_generator.state,
+        "results": results.to_array(),
+        "convergence_history": convergence_history(results, parameters),
+        "scheduler": scheduler,
+        "streams": streams
+    }
+    write_atomically(path, pickle.dumps(checkpoint, protocol=pickle.HIGHEST_PROTOCOL))
+
+# -----------------------------------------------------
+# Function: resume_simulation_arrays
+# Continues an array simulation from a checkpoint.
+# -----------------------------------------------------
+def resume_simulation_arrays(checkpoint, checkpoint_path=None, checkpoint_every=None):
+    """
+    Continues an array simulation exactly as if it had never stopped.
+
+    Parameters:
+        checkpoint (dict or str): A checkpoint from load_checkpoint, or its file name.
+        checkpoint_path (str): Optional file to save new checkpoints to.
+        checkpoint_every (int): Save a checkpoint after every this many steps.
+
+    Returns:
+        ResultsBuffer: The state counts at each time step, including the steps
+                       that ran before the checkpoint.
+    """
+    if isinstance(checkpoint, str):
+        checkpoint = load_checkpoint(checkpoint)
+    population = PopulationArrays(checkpoint["x"], checkpoint["y"],
+                                  checkpoint["state"], checkpoint["days_infected"])
+    random_state = checkpoint["random_state"]
+    rng = np.random.Generator(getattr(np.random, random_state["bit_generator"])())
+    rng.bit_generator.state = random_state
+    results = ResultsBuffer(checkpoint["parameters"]["simulation_steps"])
+    for counts in checkpoint["results"]:
+        results.append(counts)
+    steps = iter_steps_arrays(checkpoint["parameters"], population, rng, checkpoint["step"],
+                              results, checkpoint["scheduler"], checkpoint_path, checkpoint_every,
+                              streams=checkpoint.get("streams"))
+    resume_steady_state(steps, checkpoint, results)
+    return results
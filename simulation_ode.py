@@ -0,0 +1,145 @@
+"""
+Mean-Field Disease Spread Model
+
+This module is a deterministic compartmental (SIRD) companion to the
+agent-based simulation. Its rates come from the same parameters dictionary:
+    - Individuals are spread uniformly over the grid, so a susceptible
+      individual has on average I * a / grid_size**2 infected individuals
+      within infection_distance, where a is the mean area of a circle of that
+      radius that falls inside the grid.
+    - Each of them transmits with probability p_transmission, so with a
+      Poisson number of contacts a susceptible individual is infected with
+      probability 1 - exp(-p_transmission * I * a / grid_size**2) per step.
+    - Infections last exactly infection_duration steps, tracked as one cohort
+      per day of infection, and then end in death with probability p_death.
+
+The model is stepped in discrete time like the agent-based engines, and many
+parameter sets are solved at once as rows of NumPy arrays. It costs the same
+for any population size, so it suits quick what-if estimates and sweeps.
+Select it with run_simulation(parameters, engine="ode"), or solve a batch
+with solve_mean_field. Counts are fractional expected numbers of individuals.
+"""
+
+# ---------------------------
+# Module Imports
+# ---------------------------
+import math
+
+import numpy as np
+
+from simulation_program import STATES, process_results
+
+# -----------------------------------------------------
+# Function: contact_area
+# Computes the mean area around an individual that lies inside the grid.
+# -----------------------------------------------------
+def contact_area(infection_distance, grid_size):
+    """
+    Computes the mean area of a circle of radius infection_distance, centred
+    at a uniformly random point of the grid, that lies inside the grid. The
+    formula is exact up to a radius of grid_size, and larger radii are capped there.
+
+    Parameters:
+        infection_distance (numpy.ndarray): The contact radius.
+        grid_size (numpy.ndarray): The size of the square grid.
+
+    Returns:
+        numpy.ndarray: The mean contact area.
+    """
+    radius = np.minimum(infection_distance, grid_size)
+    area = math.pi * radius**2 - 8 / 3 * radius**3 / grid_size + radius**4 / (2 * grid_size**2)
+    return np.minimum(area, grid_size**2)
+
+# -----------------------------------------------------
+# Function: solve_mean_field
+# Steps the mean-field model for a batch of parameter sets.
+# -----------------------------------------------------
+def solve_mean_field(parameter_sets):
+    """
+    Solves the mean-field model for every parameter set at once.
+
+    Parameters:
+        parameter_sets (list): Simulation parameter dictionaries.
+
+    Returns:
+        numpy.ndarray: float64 counts shaped (parameter sets, steps + 1, 4)
+                       in STATES order, where steps is the largest
+                       simulation_steps. Shorter runs repeat their last counts.
+    """
+    def column(key, dtype=np.float64):
+        return np.array([parameters[key] for parameters in parameter_sets], dtype=dtype)
+
+    population_size = column("population_size")
+    initial_infected = column("initial_infected")
+    grid_size = column("grid_size")
+    p_transmission = column("p_transmission")
+    p_death = column("p_death")
+    duration = np.maximum(column("infection_duration", np.int64), 1)
+    steps = column("simulation_steps", np.int64)
+    rows = np.arange(len(parameter_sets))
+
+    # Expected infectious contacts per susceptible individual per infected individual
+    contact_rate = p_transmission * contact_area(column("infection_distance"), grid_size) / grid_size**2
+
+    # cohorts[:, k] holds the infected individuals that have been infected for k steps
+    cohorts = np.zeros((len(parameter_sets), int(duration.max())))
+    cohorts[:, 0] = initial_infected
+    susceptible = population_size - initial_infected
+    recovered = np.zeros(len(parameter_sets))
+    dead = np.zeros(len(parameter_sets))
+
+    counts = np.empty((len(parameter_sets), int(steps.max()) + 1, len(STATES)))
+    counts[:, 0] = np.column_stack([susceptible, initial_infected, recovered, dead])
+    for step in range(1, counts.shape[1]):
+        infected = cohorts.sum(axis=1)
+        new_infections = susceptible * -np.expm1(-contact_rate * infected)
+        susceptible = susceptible - new_infections
+        cohorts[:, 0] += new_infections
+
+        # Every infection ages one step, and the ones reaching infection_duration end
+        finished = cohorts[rows, duration - 1]
+        cohorts[rows, duration - 1] = 0
+        cohorts[:, 1:] = cohorts[:, :-1].copy()
+        cohorts[:, 0] = 0
+        dead = dead + finished * p_death
+        recovered = recovered + finished * (1 - p_death)
+
+        step_counts = np.column_stack([susceptible, cohorts.sum(axis=1), recovered, dead])
+        # Runs that have already finished keep their last counts
+        counts[:, step] = np.where((step <= steps)[:, None], step_counts, counts[:, step - 1])
+    return counts
+
+# -----------------------------------------------------
+# Function: mean_field_results
+# Solves a batch of parameter sets into DataFrames.
+# -----------------------------------------------------
+def mean_field_results(parameter_sets):
+    """
+    Solves the mean-field model for every parameter set.
+
+    Parameters:
+        parameter_sets (list): Simulation parameter dictionaries.
+
+    Returns:
+        list: One DataFrame per parameter set, shaped like the output of process_results.
+    """
+    counts = solve_mean_field(parameter_sets)
+    return [process_results([dict(zip(STATES, row)) for row in run[:parameters["simulation_steps"] + 1].tolist()])
+            for parameters, run in zip(parameter_sets, counts)]
+
+# -----------------------------------------------------
+# Function: iter_simulation_ode
+# Yields the mean-field counts one time step at a time.
+# -----------------------------------------------------
+def iter_simulation_ode(parameters):
+    """
+    Solves the mean-field model for one parameter set and yields its counts.
+
+    Parameters:
+        parameters (dict): Simulation parameters.
+
+    Yields:
+        dict: The expected state counts of each time step.
+    """
+    for row in solve_mean_field([parameters])[0].tolist():
+        yield dict(zip(STATES, row))
@@ -1,7 +1,47 @@
 import random
 import math
+import bisect
+import os
+import pickle
+import time
+import importlib
+from array import array
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+
+# The health states, in the order used by checkpoint files and count arrays.
+STATES = ("susceptible", "infected", "recovered", "dead")
+
+# The engines iter_simulation can run, and those of them that start worker
+# processes of their own. Pool workers are not allowed to have children, so
+# runs on these engines are made in the main process, one after another.
+ENGINES = ("python", "numpy", "shared", "distributed", "memmap", "ode")
+PROCESS_ENGINES = ("shared", "distributed")
+
+# visualize_data keeps at most this many points per series, and only draws
+# markers when a series has no more than MARKER_LIMIT points.
+PLOT_MAX_POINTS = 2000
+MARKER_LIMIT = 100
+
+# ---------------------------------
+# Define a class for a module that is imported when it is first used.
+# ---------------------------------
+class LazyModule:
+    def __init__(self, name):
+        """
+        Stands in for a module until one of its attributes is used, so that
+        importing this file does not load matplotlib.pyplot, and with it a GUI
+        toolkit, in programs that never plot.
+
+        Parameters:
+            name (str): The full name of the module, such as "matplotlib.pyplot".
+        """
+        self.name = name
+
+    def __getattr__(self, attribute):
+        return getattr(importlib.import_module(self.name), attribute)
+
+plt = LazyModule("matplotlib.pyplot")
 
 # ---------------------------------
 # Define a class for individuals.
@@ -22,6 +62,442 @@ class Individual:
         self.state = state
         self.days_infected = 0  # Counts how many time steps the individual has been infected
 
+# ---------------------------------
+# Define a class for scheduling when infections end.
+# ---------------------------------
+class RecoveryScheduler:
+    def __init__(self, population, parameters):
+        """
+        Queues infected individuals by the step in which their infection ends.
+
+        The queue is a timer wheel: a ring of infection_duration buckets, where
+        each bucket holds the population indices whose infection resolves in a
+        step with that position in the ring. Each step only the due bucket is
+        visited, so the work is proportional to the number of recoveries and
+        deaths rather than to the population size.
+
+        Parameters:
+            population (list): List of Individual objects. Individuals that are
+                               already infected are scheduled from their days_infected.
+            parameters (dict): Contains the key 'infection_duration'.
+        """
+        self.infection_duration = parameters["infection_duration"]
+        self.wheel = [[] for _ in range(max(self.infection_duration, 1))]
+        self.step = 0  # The step that the next call to pop_due resolves
+        for index, individual in enumerate(population):
+            if individual.state == "infected":
+                self.schedule(index, individual.days_infected)
+
+    def schedule(self, index, days_infected=0):
+        """
+        Adds an infected individual to the bucket of the step its infection ends in.
+
+        Parameters:
+            index (int): The population index of the individual.
+            days_infected (int): Time steps the individual has already been infected.
+        """
+        steps_left = max(self.infection_duration - days_infected, 1)
+        slot = (self.step + steps_left - 1) % len(self.wheel)
+        self.wheel[slot].append(index)
+
+    def pop_due(self):
+        """
+        Removes and returns the individuals whose infection ends in the current step,
+        then moves the scheduler on to the next step.
+
+        Returns:
+            list: Population indices in ascending order.
+        """
+        slot = self.step % len(self.wheel)
+        due = self.wheel[slot]
+        self.wheel[slot] = []
+        self.step += 1
+        # Resolve in population order so random draws match a full scan
+        due.sort()
+        return due
+
+# ---------------------------------
+# Define a class for Verlet neighbour lists.
+# ---------------------------------
+class NeighbourList:
+    def __init__(self, parameters, skin=None):
+        """
+        Keeps, for each susceptible individual, the infected individuals within
+        infection_distance + skin, and reuses those lists across steps.
+
+        Two individuals close enough for infection now were within the list
+        cutoff at the last rebuild as long as neither has moved more than half
+        the skin since then. update measures how far everyone has actually
+        moved and rebuilds the lists only when someone has gone further.
+
+        Parameters:
+            parameters (dict): Contains keys 'infection_distance', 'movement_rate',
+                               and optionally 'verlet_skin'.
+            skin (float): Extra search distance. Defaults to parameters["verlet_skin"],
+                          or to 8 * movement_rate capped at 2 * infection_distance
+                          when that is not set. The lists only beat a fresh spatial
+                          hash when movement_rate is small next to infection_distance.
+        """
+        infection_distance = parameters["infection_distance"]
+        if skin is None:
+            # Past twice the infection distance, longer lists cost more than the rebuilds they save
+            skin = parameters.get("verlet_skin", min(8 * parameters["movement_rate"], 2 * infection_distance))
+        self.skin = skin
+        self.cutoff = infection_distance + skin
+        self.cell_size = self.cutoff if self.cutoff > 0 else 1
+        self.neighbours = {}
+        # Positions at the last rebuild, and the susceptible individuals hashed by them
+        self.positions = None
+        self.susceptible_hash = {}
+        self.steps = 0
+        self.rebuilds = 0
+
+    def update(self, population):
+        """
+        Rebuilds the lists if anyone has moved more than half the skin since the
+        last rebuild. Called once per step, after everyone has moved.
+
+        Parameters:
+            population (list): List of Individual objects.
+        """
+        self.steps += 1
+        if self.positions is not None:
+            limit = (self.skin / 2) ** 2
+            for individual, (x, y) in zip(population, self.positions):
+                if (individual.x - x) ** 2 + (individual.y - y) ** 2 > limit:
+                    break
+            else:
+                return
+        self.rebuild(population)
+
+    def rebuild(self, population):
+        """
+        Builds the neighbour lists from the current positions.
+
+        Only susceptible individuals get a list, since only they can be infected,
+        and the lists only hold infected individuals, since nobody else can infect
+        them. Individuals infected later are added by add_infected.
+
+        Parameters:
+            population (list): List of Individual objects.
+        """
+        self.positions = [(individual.x, individual.y) for individual in population]
+        self.susceptible_hash = build_spatial_hash(population, self.cell_size, state="susceptible")
+        self.neighbours = {index: [] for index, individual in enumerate(population)
+                           if individual.state == "susceptible"}
+        # Infected individuals are far fewer, so search around them instead
+        for index, individual in enumerate(population):
+            if individual.state == "infected":
+                self.add_infected(index)
+        self.rebuilds += 1
+
+    def add_infected(self, index):
+        """
+        Adds a newly infected individual to the lists of the susceptible
+        individuals that were within the cutoff of it at the last rebuild.
+
+        Parameters:
+            index (int): Population index of the newly infected individual.
+        """
+        self.neighbours.pop(index, None)
+        x, y = self.positions[index]
+        column, row = int(x // self.cell_size), int(y // self.cell_size)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for other_index in self.susceptible_hash.get((column + dx, row + dy), ()):
+                    neighbours = self.neighbours.get(other_index)
+                    if neighbours is None:
+                        continue
+                    other_x, other_y = self.positions[other_index]
+                    if math.sqrt((x - other_x)**2 + (y - other_y)**2) <= self.cutoff:
+                        # Keep population order so random draws match a full scan
+                        bisect.insort(neighbours, index)
+
+    def rebuild_rate(self):
+        """
+        Returns:
+            float: The fraction of steps in which the lists were rebuilt.
+        """
+        return self.rebuilds / self.steps if self.steps else 0.0
+
+# ---------------------------------
+# Define a class for collecting per-step statistics.
+# ---------------------------------
+class StepStats:
+    def __init__(self):
+        """
+        Collects the wall time of each phase of simulate_step and counters of
+        the work it did, one record per time step.
+
+        Each record has "movement_time", "infection_time" and "update_time" in
+        seconds, plus "distance_evaluations", "random_draws", "new_infections",
+        "recoveries" and "deaths". Simulations only measure anything when a
+        StepStats is passed in, so leaving it out costs nothing.
+        """
+        self.records = []
+
+    def record(self, step_record):
+        """
+        Adds the statistics of one time step.
+
+        Parameters:
+            step_record (dict): The timings and counters of the step.
+        """
+        self.records.append(step_record)
+
+    def to_dataframe(self, simulation_results=None):
+        """
+        Converts the records into a DataFrame indexed by time step.
+
+        Parameters:
+            simulation_results (list): Optional state counts from run_simulation
+                                       to add as columns. Step 0 has no statistics.
+
+        Returns:
+            pandas.DataFrame: One row per time step.
+        """
+        df = pd.DataFrame(self.records, index=range(1, len(self.records) + 1))
+        df["transitions"] = df["new_infections"] + df["recoveries"] + df["deaths"]
+        df.index.name = "Time Step"
+        if simulation_results is not None:
+            df = process_results(simulation_results).join(df)
+        return df
+
+    def summary(self):
+        """
+        Summarizes the records over the whole run.
+
+        Returns:
+            dict: Total time and share of time per phase, and the total and
+                  per-step mean of each counter.
+        """
+        df = self.to_dataframe()
+        total_time = float(df[["movement_time", "infection_time", "update_time"]].sum().sum())
+        summary = {"steps": len(df), "total_time": total_time}
+        for phase in ("movement", "infection", "update"):
+            phase_time = float(df[f"{phase}_time"].sum())
+            summary[f"{phase}_time"] = phase_time
+            summary[f"{phase}_share"] = phase_time / total_time if total_time else 0.0
+        for counter in ("distance_evaluations", "random_draws", "transitions"):
+            summary[counter] = int(df[counter].sum())
+            summary[f"{counter}_per_step"] = float(df[counter].mean())
+        return summary
+
+# ---------------------------------
+# Define a class for recorded state counts.
+# ---------------------------------
+class ResultsBuffer:
+    def __init__(self, simulation_steps, dtype=np.int64):
+        """
+        Stores the state counts of a run in a preallocated integer array with
+        one row per time step and one column per state in STATES order.
+
+        It behaves like the list of count dictionaries that run_simulation used
+        to return: it has a length, can be indexed and iterated, and compares
+        equal to a list with the same counts. process_results wraps the array
+        in a DataFrame without copying it.
+
+        Parameters:
+            simulation_steps (int): The number of steps; rows are allocated for
+                                    them and the initial state.
+            dtype (numpy.dtype): The type of the counts, float64 for the
+                                 expected counts of the mean-field model.
+        """
+        self.counts = np.zeros((simulation_steps + 1, len(STATES)), dtype=dtype)
+        self.length = 0
+
+    def append(self, counts):
+        """
+        Records the counts of the next time step.
+
+        Parameters:
+            counts (dict or list): Counts by state name, or in STATES order.
+        """
+        if self.length == len(self.counts):
+            self.counts = np.concatenate([self.counts, np.zeros_like(self.counts)])
+        if isinstance(counts, dict):
+            counts = [counts[state] for state in STATES]
+        self.counts[self.length] = counts
+        self.length += 1
+
+    def to_array(self):
+        """
+        Returns:
+            numpy.ndarray: A view of the recorded rows, without the unused ones.
+        """
+        return self.counts[:self.length]
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[row] for row in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("ResultsBuffer index out of range")
+        return dict(zip(STATES, self.counts[index].tolist()))
+
+    def __iter__(self):
+        for row in self.to_array().tolist():
+            yield dict(zip(STATES, row))
+
+    def __eq__(self, other):
+        if isinstance(other, ResultsBuffer):
+            return np.array_equal(self.to_array(), other.to_array())
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+# ---------------------------------
+# Define a class for recording who infected whom.
+# ---------------------------------
+class TransmissionRecorder:
+    # Records are added in chunks of this many when the arrays are full
+    CHUNK_SIZE = 4096
+
+    def __init__(self, capacity=0):
+        """
+        Records each infection as (infectee, infector, step) in three parallel
+        integer arrays. Initially infected individuals have infector -1 and
+        step 0, and infections in the first simulated step have step 1.
+
+        Simulations only record anything when a TransmissionRecorder is passed
+        in, so leaving it out costs nothing.
+
+        Parameters:
+            capacity (int): The number of records to allocate up front, such as
+                            the population size (nobody is infected twice).
+        """
+        self.infectee = array("l", [0]) * capacity
+        self.infector = array("l", [0]) * capacity
+        self.step_infected = array("l", [0]) * capacity
+        self.length = 0
+        self.step = 0  # The step that infections are currently recorded in
+
+    def record(self, infectee, infector):
+        """
+        Adds one infection in the current step.
+
+        Parameters:
+            infectee (int): Population index of the newly infected individual.
+            infector (int): Population index of the individual who infected them, or -1.
+        """
+        if self.length == len(self.infectee):
+            chunk = array("l", [0]) * self.CHUNK_SIZE
+            self.infectee.extend(chunk)
+            self.infector.extend(chunk)
+            self.step_infected.extend(chunk)
+        self.infectee[self.length] = infectee
+        self.infector[self.length] = infector
+        self.step_infected[self.length] = self.step
+        self.length += 1
+
+    def record_initial(self, population):
+        """
+        Adds the individuals who are infected at the start of a run.
+
+        Parameters:
+            population (list): List of Individual objects.
+        """
+        for index, individual in enumerate(population):
+            if individual.state == "infected":
+                self.record(index, -1)
+
+    def __len__(self):
+        return self.length
+
+    def to_arrays(self):
+        """
+        Returns:
+            tuple: int64 NumPy arrays (infectee, infector, step) of the recorded infections.
+        """
+        return tuple(np.array(values[:self.length], dtype=np.int64)
+                     for values in (self.infectee, self.infector, self.step_infected))
+
+    def save(self, path):
+        """
+        Writes the records to a CSV file if path ends in ".csv", and otherwise
+        to a binary NumPy .npz file with one array per column.
+
+        Parameters:
+            path (str): The file to write.
+        """
+        infectee, infector, step = self.to_arrays()
+        if path.endswith(".csv"):
+            np.savetxt(path, np.column_stack([infectee, infector, step]), fmt="%d",
+                       delimiter=",", header="infectee,infector,step", comments="")
+        else:
+            with open(path, "wb") as file:
+                np.savez(file, infectee=infectee, infector=infector, step=step)
+
+    def generation_intervals(self):
+        """
+        Computes the number of steps between each infector's infection and the
+        infections they caused.
+
+        Returns:
+            numpy.ndarray: One interval per infection that has a known infector.
+        """
+        infectee, infector, step = self.to_arrays()
+        if len(infectee) == 0:
+            return np.empty(0, dtype=np.int64)
+        infected_at = np.full(int(max(infectee.max(), infector.max())) + 1, -1, dtype=np.int64)
+        infected_at[infectee] = step
+        known = infector >= 0
+        return step[known] - infected_at[infector[known]]
+
+    def reproduction_numbers(self, simulation_steps=None):
+        """
+        Computes the effective reproduction number R_t for each step: the mean
+        number of infections caused by the individuals infected in step t.
+
+        Individuals infected near the end of a run have not finished infecting
+        others, so the last values are underestimates.
+
+        Parameters:
+            simulation_steps (int): Optional number of steps, so that the result
+                                    has one value for each of steps 0 to simulation_steps.
+
+        Returns:
+            numpy.ndarray: R_t for each step, or NaN where nobody was infected.
+        """
+        infectee, infector, step = self.to_arrays()
+        steps = simulation_steps + 1 if simulation_steps is not None else int(step.max(initial=-1)) + 1
+        if len(infectee) == 0:
+            return np.full(steps, np.nan)
+        infected_at = np.full(int(max(infectee.max(), infector.max())) + 1, -1, dtype=np.int64)
+        infected_at[infectee] = step
+        cases = np.bincount(step, minlength=steps)[:steps]
+        known = infector >= 0
+        secondary = np.bincount(infected_at[infector[known]], minlength=steps)[:steps]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(cases > 0, secondary / cases, np.nan)
+
+# -----------------------------------------------------
+# Function: load_transmissions
+# Reads records saved by TransmissionRecorder.save.
+# -----------------------------------------------------
+def load_transmissions(path):
+    """
+    Parameters:
+        path (str): A CSV or .npz file written by TransmissionRecorder.save.
+
+    Returns:
+        TransmissionRecorder: A recorder holding the saved infections.
+    """
+    if path.endswith(".csv"):
+        columns = np.loadtxt(path, dtype=np.int64, delimiter=",", skiprows=1, ndmin=2).T
+    else:
+        with np.load(path) as data:
+            columns = [data["infectee"], data["infector"], data["step"]]
+    recorder = TransmissionRecorder()
+    recorder.infectee, recorder.infector, recorder.step_infected = (
+        array("l", column.tolist()) for column in columns)
+    recorder.length = len(recorder.infectee)
+    return recorder
+
 # -----------------------------------------------------
 # Function: create_population
 # Creates an initial population with random positions,
@@ -100,20 +576,147 @@ def calculate_distance(ind1, ind2):
     """
     return math.sqrt((ind1.x - ind2.x)**2 + (ind1.y - ind2.y)**2)
 
+# -----------------------------------------------------
+# Function: get_cell
+# Returns the spatial hash cell that contains an individual.
+# -----------------------------------------------------
+def get_cell(individual, cell_size):
+    """
+    Finds the grid cell that an individual falls into.
+
+    Parameters:
+        individual (Individual): The individual to locate.
+        cell_size (float): The width and height of each cell.
+
+    Returns:
+        tuple: The (column, row) of the cell.
+    """
+    return (int(individual.x // cell_size), int(individual.y // cell_size))
+
+# -----------------------------------------------------
+# Function: build_spatial_hash
+# Buckets individuals in one state into square cells.
+# -----------------------------------------------------
+def build_spatial_hash(population, cell_size, state="infected"):
+    """
+    Builds a uniform spatial hash of the individuals in a given state.
+
+    Parameters:
+        population (list): List of Individual objects.
+        cell_size (float): The width and height of each cell.
+        state (str): Only individuals in this state are added to the hash.
+
+    Returns:
+        dict: Maps (column, row) cells to lists of population indices.
+    """
+    spatial_hash = {}
+    for index, individual in enumerate(population):
+        if individual.state == state:
+            spatial_hash.setdefault(get_cell(individual, cell_size), []).append(index)
+    return spatial_hash
+
+# -----------------------------------------------------
+# Function: find_nearby_indices
+# Looks up candidates in an individual's cell and the eight cells around it.
+# -----------------------------------------------------
+def find_nearby_indices(individual, spatial_hash, cell_size):
+    """
+    Collects the indices stored in the cell of an individual and its neighbouring cells.
+
+    When cell_size is at least the infection distance, every individual within that
+    distance is guaranteed to be among the returned candidates.
+
+    Parameters:
+        individual (Individual): The individual at the centre of the search.
+        spatial_hash (dict): A hash created by build_spatial_hash.
+        cell_size (float): The cell size the hash was built with.
+
+    Returns:
+        list: Candidate population indices in ascending order.
+    """
+    column, row = get_cell(individual, cell_size)
+    candidates = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            cell = spatial_hash.get((column + dx, row + dy))
+            if cell:
+                candidates.extend(cell)
+    # Keep population order so random draws happen in the same order as a full scan
+    candidates.sort()
+    return candidates
+
+# -----------------------------------------------------
+# Function: infection_probability
+# Combines several independent exposures into one probability.
+# -----------------------------------------------------
+def infection_probability(exposures, p_transmission):
+    """
+    Calculates the chance that at least one of several exposures transmits the disease.
+
+    Parameters:
+        exposures (int): The number of infected individuals in range.
+        p_transmission (float): The probability that a single exposure transmits.
+
+    Returns:
+        float: The probability 1 - (1 - p_transmission)**exposures.
+    """
+    return 1 - (1 - p_transmission)**exposures
+
+# -----------------------------------------------------
+# Function: first_transmission
+# Picks which exposure caused an aggregated infection.
+# -----------------------------------------------------
+def first_transmission(draw, exposures, p_transmission):
+    """
+    Finds the first of several exposures that transmitted, given the single
+    draw that decided an infection with probability infection_probability.
+
+    A draw below 1 - (1 - p)**k is uniform over that range, so inverting the
+    geometric distribution of the first success reuses it instead of drawing again.
+
+    Parameters:
+        draw (float): The random draw, which was below infection_probability(exposures, p_transmission).
+        exposures (int): The number of infected individuals in range.
+        p_transmission (float): The probability of transmission per exposure.
+
+    Returns:
+        int: The position of the transmitting exposure, from 0 to exposures - 1.
+    """
+    if p_transmission >= 1:
+        return 0
+    position = int(math.log1p(-draw) / math.log1p(-p_transmission))
+    return min(position, exposures - 1)
+
 # -----------------------------------------------------
 # Function: simulate_step
 # Simulates one time step of the disease spread.
 # -----------------------------------------------------
-def simulate_step(population, parameters):
+def simulate_step(population, parameters, scheduler=None, neighbour_list=None, stats=None, counts=None,
+                  recorder=None):
     """
     Simulates one time step:
       1. Moves all individuals.
       2. Checks for infections: if a susceptible is close to an infected, they may become infected.
       3. Updates infected individuals: increases days_infected and changes state to recovered or dead when appropriate.
 
+    When parameters["aggregate_draws"] is True, each susceptible with k infected
+    individuals in range is infected by one draw with probability
+    1 - (1 - p_transmission)**k instead of one draw per infected neighbour.
+
+    When a NeighbourList is given, step 2 scans its lists instead of building a
+    spatial hash. When a RecoveryScheduler is given, step 3 only visits the
+    individuals whose infection ends now, and days_infected is brought up to
+    date when it ends.
+
     Parameters:
         population (list): List of Individual objects.
         parameters (dict): Dictionary of simulation parameters.
+        scheduler (RecoveryScheduler): Optional timer wheel of infection end steps.
+        neighbour_list (NeighbourList): Optional Verlet neighbour lists.
+        stats (StepStats): Optional collector for phase timings and counters.
+        counts (list): Optional state counts in STATES order, updated in place
+                       from this step's transitions instead of being recounted.
+        recorder (TransmissionRecorder): Optional record of who infected whom.
 
     Returns:
         list: The updated population after one time step.
@@ -122,35 +725,130 @@ def simulate_step(population, parameters):
     infection_distance = parameters["infection_distance"]
     infection_duration = parameters["infection_duration"]
     p_death = parameters["p_death"]
+    aggregate_draws = parameters.get("aggregate_draws", False)
+    if stats is not None:
+        phase_start = time.perf_counter()
+    # The work counters are only kept up when stats is given
+    distance_evaluations = 0
+    infection_draws = 0
+    new_infections = 0
+    deaths = 0
+    recoveries = 0
+    if recorder is not None:
+        recorder.step += 1
 
     # 1. Move all individuals
     for individual in population:
         move_individual(individual, parameters)
+    if stats is not None:
+        movement_end = time.perf_counter()
 
-    # 2. Check for new infections
-    for individual in population:
+    # 2. Check for new infections, only looking at infected individuals nearby
+    if neighbour_list is not None:
+        neighbour_list.update(population)
+    else:
+        cell_size = infection_distance if infection_distance > 0 else 1
+        infected_hash = build_spatial_hash(population, cell_size)
+    for index, individual in enumerate(population):
         if individual.state == "susceptible":
-            # Check all infected individuals for proximity
-            for other in population:
-                if other.state == "infected":
+            if neighbour_list is not None:
+                nearby = [other_index for other_index in neighbour_list.neighbours[index]
+                          if population[other_index].state == "infected"]
+            else:
+                nearby = find_nearby_indices(individual, infected_hash, cell_size)
+            if aggregate_draws:
+                # Count the infected in range and make a single draw for all of them
+                in_range = 0
+                for other_index in nearby:
+                    if calculate_distance(individual, population[other_index]) <= infection_distance:
+                        in_range += 1
+                becomes_infected = False
+                if in_range > 0:
+                    draw = random.random()
+                    becomes_infected = draw < infection_probability(in_range, p_transmission)
+                    if becomes_infected and recorder is not None:
+                        sources = [other_index for other_index in nearby
+                                   if calculate_distance(individual, population[other_index]) <= infection_distance]
+                        other_index = sources[first_transmission(draw, in_range, p_transmission)]
+                if stats is not None:
+                    distance_evaluations += len(nearby)
+                    if in_range > 0:
+                        infection_draws += 1
+            else:
+                becomes_infected = False
+                # Check the nearby infected individuals for proximity
+                for checked, other_index in enumerate(nearby, 1):
+                    other = population[other_index]
                     if calculate_distance(individual, other) <= infection_distance:
                         # Infect with probability p_transmission
+                        if stats is not None:
+                            infection_draws += 1
                         if random.random() < p_transmission:
-                            individual.state = "infected"
-                            individual.days_infected = 0
+                            becomes_infected = True
                             break  # No need to check other infected individuals
+                if stats is not None:
+                    distance_evaluations += checked if becomes_infected else len(nearby)
+            if becomes_infected:
+                individual.state = "infected"
+                individual.days_infected = 0
+                new_infections += 1
+                if recorder is not None:
+                    recorder.record(index, other_index)
+                # Newly infected individuals can infect others in this same step
+                if neighbour_list is None:
+                    infected_hash.setdefault(get_cell(individual, cell_size), []).append(index)
+                else:
+                    neighbour_list.add_infected(index)
+                if scheduler is not None:
+                    scheduler.schedule(index)
+    if stats is not None:
+        infection_end = time.perf_counter()
 
     # 3. Update the state of infected individuals
-    for individual in population:
-        if individual.state == "infected":
-            individual.days_infected += 1
-            # After the infection duration, determine outcome
-            if individual.days_infected >= infection_duration:
-                if random.random() < p_death:
-                    individual.state = "dead"
-                else:
-                    individual.state = "recovered"
+    if scheduler is not None:
+        # Only visit the individuals whose infection ends in this step
+        for index in scheduler.pop_due():
+            individual = population[index]
+            individual.days_infected = max(infection_duration, 1)
+            if random.random() < p_death:
+                individual.state = "dead"
+                deaths += 1
+            else:
+                individual.state = "recovered"
+                recoveries += 1
+    else:
+        for individual in population:
+            if individual.state == "infected":
+                individual.days_infected += 1
+                # After the infection duration, determine outcome
+                if individual.days_infected >= infection_duration:
+                    if random.random() < p_death:
+                        individual.state = "dead"
+                        deaths += 1
+                    else:
+                        individual.state = "recovered"
+                        recoveries += 1
 
+    if stats is not None:
+        update_end = time.perf_counter()
+        # Everyone alive at the start of the step moved with two draws.
+        # This needs a scan, so it is only counted when instrumented.
+        moved = deaths + sum(1 for individual in population if individual.state != "dead")
+        stats.record({
+            "movement_time": movement_end - phase_start,
+            "infection_time": infection_end - movement_end,
+            "update_time": update_end - infection_end,
+            "distance_evaluations": distance_evaluations,
+            "random_draws": 2 * moved + infection_draws + deaths + recoveries,
+            "new_infections": new_infections,
+            "recoveries": recoveries,
+            "deaths": deaths
+        })
+    if counts is not None:
+        counts[0] -= new_infections
+        counts[1] += new_infections - recoveries - deaths
+        counts[2] += recoveries
+        counts[3] += deaths
     return population
 
 # -----------------------------------------------------
@@ -173,32 +871,431 @@ def count_states(population):
         counts[individual.state] += 1
     return counts
 
+# -----------------------------------------------------
+# Function: iter_simulation
+# Runs the simulation one time step at a time.
+# -----------------------------------------------------
+def iter_simulation(parameters, engine="python", neighbour_list=None,
+                    checkpoint_path=None, checkpoint_every=None, callback=None, stats=None,
+                    recorder=None):
+    """
+    Runs the disease simulation and yields the state counts of each time step
+    as soon as it is computed, starting with the initial state.
+
+    Nothing but the current population is kept in memory, unless checkpoints
+    are saved (they include every count so far). Stop iterating to end the run
+    early. Once the run reaches a steady state, the remaining steps are filled
+    in without simulating them (see pad_steady_state).
+
+    Setting parameters["scheduled_recovery"] to True resolves infections with a
+    RecoveryScheduler instead of scanning every individual each step; the
+    distributed and memmap engines raise a ValueError for it. Setting
+    parameters["verlet_skin"] searches for infections with a NeighbourList.
+
+    Parameters:
+        parameters (dict): Simulation parameters.
+        engine (str): "python" to simulate a list of Individual objects,
+                      "numpy" to use the array engine in simulation_numpy.py,
+                      "shared" to run its infection phase on a pool of workers
+                      with simulation_shared.py, "distributed" to split the
+                      grid across worker processes with simulation_distributed.py,
+                      "memmap" to keep the population in files with simulation_memmap.py,
+                      or "ode" for the deterministic mean-field model in simulation_ode.py.
+        neighbour_list (NeighbourList): Optional neighbour lists to use with the
+                                        python engine. Pass one in to read its
+                                        rebuild counts after the run.
+        checkpoint_path (str): Optional file to save checkpoints to.
+        checkpoint_every (int): Save a checkpoint after every this many steps.
+                                Required with checkpoint_path, and only allowed with it.
+        callback (function): Optional function called as callback(step, counts)
+                             for every time step. If it returns True, the run
+                             stops after that step.
+        stats (StepStats): Optional collector for per-step timings and counters.
+        recorder (TransmissionRecorder): Optional record of who infected whom,
+                                         for the python engine.
+
+    Yields:
+        dict: The counts of "susceptible", "infected", "recovered" and "dead".
+    """
+    if recorder is not None and engine != "python":
+        raise ValueError(f"The {engine} engine does not record transmissions")
+    if (checkpoint_path is None) != (checkpoint_every is None):
+        raise ValueError("checkpoint_path and checkpoint_every must be given together")
+    if checkpoint_every is not None and checkpoint_every < 1:
+        raise ValueError(f"checkpoint_every must be at least 1, not {checkpoint_every}")
+    if engine == "numpy":
+        from simulation_numpy import iter_simulation_arrays
+        steps = iter_simulation_arrays(parameters, checkpoint_path=checkpoint_path,
+                                       checkpoint_every=checkpoint_every, stats=stats)
+    elif engine in PROCESS_ENGINES:
+        if checkpoint_path is not None or stats is not None:
+            raise ValueError(f"The {engine} engine does not support checkpoints or stats")
+        if engine == "shared":
+            from simulation_shared import iter_simulation_shared
+            steps = iter_simulation_shared(parameters)
+        else:
+            from simulation_distributed import iter_simulation_distributed
+            steps = iter_simulation_distributed(parameters)
+    elif engine == "memmap":
+        if checkpoint_path is not None:
+            raise ValueError("The memmap engine does not support checkpoints")
+        from simulation_memmap import iter_simulation_memmap
+        steps = iter_simulation_memmap(parameters, stats=stats)
+    elif engine == "ode":
+        if checkpoint_path is not None or stats is not None:
+            raise ValueError("The ode engine does not support checkpoints or stats")
+        from simulation_ode import iter_simulation_ode
+        steps = iter_simulation_ode(parameters)
+    elif engine == "python":
+        steps = iter_simulation_python(parameters, neighbour_list, checkpoint_path, checkpoint_every,
+                                       stats, recorder)
+    else:
+        raise ValueError(f"Unknown simulation engine: {engine}")
+
+    padded_steps = pad_steady_state(steps, parameters)
+    for step, counts in enumerate(padded_steps):
+        yield counts
+        if callback is not None and callback(step, counts):
+            padded_steps.close()
+            return
+
+# -----------------------------------------------------
+# Function: pad_steady_state
+# Stops simulating once the counts can no longer change.
+# -----------------------------------------------------
+def pad_steady_state(steps, parameters, history=None, first_record=0):
+    """
+    Passes the counts from steps through until the run reaches a steady state,
+    then stops the simulation and repeats the last counts for the remaining steps.
+
+    Once nobody is infected the counts can never change again, so the rest of
+    the run is filled in without moving anyone or searching for infections.
+    This is on unless parameters["stop_when_extinct"] is False. Setting
+    parameters["convergence_window"] also stops the run once no count has
+    changed by more than parameters["convergence_tolerance"] (default 0)
+    over that many steps; unlike extinction, this is an approximation.
+
+    Parameters:
+        steps (generator): Yields the counts of the initial state and each step.
+        parameters (dict): Simulation parameters.
+        history (list): When resuming, the counts of the records before the
+                        first one steps yields, as saved by convergence_history.
+        first_record (int): The time step of the first counts steps yields.
+
+    Yields:
+        dict: The state counts of each time step.
+    """
+    total_records = parameters["simulation_steps"] + 1
+    stop_when_extinct = parameters.get("stop_when_extinct", True)
+    window = parameters.get("convergence_window")
+    tolerance = parameters.get("convergence_tolerance", 0)
+    recent = []
+
+    def is_steady(counts):
+        if stop_when_extinct and counts["infected"] == 0:
+            return True
+        return bool(window) and len(recent) == window + 1 and all(
+            max(past[state] for past in recent) - min(past[state] for past in recent) <= tolerance
+            for state in STATES)
+
+    if history:
+        recent = list(history[-(window + 1):]) if window else []
+        # The run may have become steady on the very step the checkpoint was saved
+        if is_steady(history[-1]) and first_record < total_records:
+            steps.close()
+            for padded_record in range(first_record, total_records):
+                yield dict(history[-1])
+            return
+
+    for record, counts in enumerate(steps, first_record):
+        yield counts
+        if window:
+            recent.append(counts)
+            if len(recent) > window + 1:
+                recent.pop(0)
+        if is_steady(counts) and record + 1 < total_records:
+            steps.close()
+            for padded_record in range(record + 1, total_records):
+                yield dict(counts)
+            return
+
+# -----------------------------------------------------
+# Function: convergence_history
+# Picks the counts that pad_steady_state needs to resume.
+# -----------------------------------------------------
+def convergence_history(results, parameters):
+    """
+    Returns the counts that decide whether a run resumed after the last of
+    results is in a steady state: the last one, or the last
+    convergence_window + 1 when parameters["convergence_window"] is set.
+
+    Parameters:
+        results (ResultsBuffer): The state counts recorded so far.
+        parameters (dict): Simulation parameters.
+
+    Returns:
+        list: Dictionaries of state counts, oldest first.
+    """
+    window = parameters.get("convergence_window") or 0
+    return results[-(window + 1):]
+
+# -----------------------------------------------------
+# Function: iter_simulation_python
+# Sets up the python engine and yields its counts.
+# -----------------------------------------------------
+def iter_simulation_python(parameters, neighbour_list=None, checkpoint_path=None, checkpoint_every=None,
+                           stats=None, recorder=None):
+    """
+    Creates a population of Individual objects and yields its state counts
+    for the initial state and every time step.
+
+    The python engine updates individuals one after another, so it cannot use
+    the counter-based streams of the array engines; parameters["seed"] seeds
+    the random module instead.
+
+    Parameters:
+        parameters (dict): Simulation parameters.
+        neighbour_list (NeighbourList): Optional Verlet neighbour lists.
+        checkpoint_path (str): Optional file to save checkpoints to.
+        checkpoint_every (int): Save a checkpoint after every this many steps.
+        stats (StepStats): Optional collector for per-step timings and counters.
+        recorder (TransmissionRecorder): Optional record of who infected whom.
+
+    Yields:
+        dict: The state counts of each time step.
+    """
+    if parameters.get("seed") is not None:
+        random.seed(parameters["seed"])
+    population = create_population(parameters)
+    if recorder is not None:
+        recorder.record_initial(population)
+    scheduler = None
+    if parameters.get("scheduled_recovery", False):
+        scheduler = RecoveryScheduler(population, parameters)
+    if neighbour_list is None and "verlet_skin" in parameters:
+        neighbour_list = NeighbourList(parameters)
+
+    # Record the initial state
+    counts = count_states(population)
+    yield counts
+    # Checkpoints need every count so far, otherwise nothing is kept
+    results = None
+    if checkpoint_path:
+        results = ResultsBuffer(parameters["simulation_steps"])
+        results.append(counts)
+    yield from iter_simulation_steps(parameters, population, 0, results, scheduler, neighbour_list,
+                                     checkpoint_path, checkpoint_every, stats, recorder)
+
+# -----------------------------------------------------
+# Function: iter_simulation_steps
+# Runs the remaining steps of a simulation that has already started.
+# -----------------------------------------------------
+def iter_simulation_steps(parameters, population, start_step, results=None, scheduler=None,
+                          neighbour_list=None, checkpoint_path=None, checkpoint_every=None,
+                          stats=None, recorder=None):
+    """
+    Runs the simulation from start_step until simulation_steps and yields the
+    counts after each step, saving checkpoints along the way if asked to.
+
+    Parameters:
+        parameters (dict): Simulation parameters.
+        population (list): List of Individual objects.
+        start_step (int): The number of steps that have already run.
+        results (ResultsBuffer): The state counts recorded so far, which new
+                                 counts are appended to. Required when saving checkpoints.
+        scheduler (RecoveryScheduler): Optional timer wheel of infection end steps.
+        neighbour_list (NeighbourList): Optional Verlet neighbour lists.
+        checkpoint_path (str): Optional file to save checkpoints to.
+        checkpoint_every (int): Save a checkpoint after every this many steps.
+        stats (StepStats): Optional collector for per-step timings and counters.
+        recorder (TransmissionRecorder): Optional record of who infected whom.
+
+    Yields:
+        dict: The state counts after each step.
+    """
+    simulation_steps = parameters["simulation_steps"]
+    # Count once, then keep the counts up to date from each step's transitions
+    counts = count_states(population)
+    counts = [counts[state] for state in STATES]
+    # Run the simulation for the remaining steps
+    for step in range(start_step, simulation_steps):
+        population = simulate_step(population, parameters, scheduler, neighbour_list, stats, counts,
+                                   recorder)
+        if results is not None:
+            results.append(counts)
+        if checkpoint_path and checkpoint_every and (step + 1) % checkpoint_every == 0:
+            save_checkpoint(checkpoint_path, parameters, population, results,
+                            scheduler, neighbour_list)
+        yield dict(zip(STATES, counts))
+
 # -----------------------------------------------------
 # Function: run_simulation
 # Runs the simulation for a set number of time steps.
 # -----------------------------------------------------
-def run_simulation(parameters):
+def run_simulation(parameters, engine="python", neighbour_list=None,
+                   checkpoint_path=None, checkpoint_every=None, callback=None, stats=None,
+                   recorder=None):
     """
     Runs the disease simulation over a number of time steps and records the state counts.
 
+    This collects everything iter_simulation yields into a ResultsBuffer; see
+    iter_simulation for the options.
+
     Parameters:
         parameters (dict): Simulation parameters.
+        engine (str): "python", "numpy", "shared", "distributed" or "ode".
+        neighbour_list (NeighbourList): Optional neighbour lists for the python engine.
+        checkpoint_path (str): Optional file to save checkpoints to.
+        checkpoint_every (int): Save a checkpoint after every this many steps.
+        callback (function): Optional function called as callback(step, counts).
+        stats (StepStats): Optional collector for per-step timings and counters.
+        recorder (TransmissionRecorder): Optional record of who infected whom.
 
     Returns:
-        list: A list of dictionaries, each representing the state counts at a time step.
+        ResultsBuffer: The state counts at each time step. They are floats for
+                       the "ode" engine and integers otherwise.
     """
-    population = create_population(parameters)
-    simulation_steps = parameters["simulation_steps"]
-    results = []
+    results = ResultsBuffer(parameters["simulation_steps"], np.float64 if engine == "ode" else np.int64)
+    for counts in iter_simulation(parameters, engine, neighbour_list,
+                                  checkpoint_path, checkpoint_every, callback, stats, recorder):
+        results.append(counts)
+    return results
 
-    # Record the initial state
-    results.append(count_states(population))
-    # Run the simulation for the defined number of steps
-    for step in range(simulation_steps):
-        population = simulate_step(population, parameters)
-        results.append(count_states(population))
+# -----------------------------------------------------
+# Function: write_atomically
+# Replaces a file without ever leaving it half written.
+# -----------------------------------------------------
+def write_atomically(path, data):
+    """
+    Writes data to a temporary file next to path and renames it over path,
+    so a crash mid-write leaves the previous file intact.
+
+    Parameters:
+        path (str): The file to write.
+        data (bytes): The new contents.
+    """
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_path, path)
+
+# -----------------------------------------------------
+# Function: save_checkpoint
+# Saves everything needed to continue a simulation.
+# -----------------------------------------------------
+def save_checkpoint(path, parameters, population, results, scheduler=None, neighbour_list=None):
+    """
+    Saves the population, step index, random state and results to a binary file.
+
+    Positions, states and counts are stored as packed arrays rather than as
+    Individual objects and dictionaries, to keep the file small.
+
+    Parameters:
+        path (str): The checkpoint file.
+        parameters (dict): Simulation parameters.
+        population (list): List of Individual objects.
+        results (ResultsBuffer): The state counts recorded so far.
+        scheduler (RecoveryScheduler): Optional timer wheel of infection end steps.
+        neighbour_list (NeighbourList): Optional Verlet neighbour lists.
+    """
+    state_codes = {state: code for code, state in enumerate(STATES)}
+    checkpoint = {
+        "engine": "python",
+        "parameters": parameters,
+        "step": len(results) - 1,
+        "x": array("d", (individual.x for individual in population)),
+        "y": array("d", (individual.y for individual in population)),
+        "state": bytes(state_codes[individual.state] for individual in population),
+        "days_infected": array("l", (individual.days_infected for individual in population)),
+        "random_state": random.getstate(),
+        "results": array("l", results.to_array().ravel().tolist()),
+        "convergence_history": convergence_history(results, parameters),
+        "scheduler": scheduler,
+        "neighbour_list": neighbour_list
+    }
+    write_atomically(path, pickle.dumps(checkpoint, protocol=pickle.HIGHEST_PROTOCOL))
+
+# -----------------------------------------------------
+# Function: load_checkpoint
+# Reads a checkpoint file.
+# -----------------------------------------------------
+def load_checkpoint(path):
+    """
+    Reads a checkpoint saved by save_checkpoint or the array engine.
+
+    Parameters:
+        path (str): The checkpoint file.
+
+    Returns:
+        dict: The saved simulation state.
+    """
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+# -----------------------------------------------------
+# Function: resume_simulation
+# Continues a simulation from its last checkpoint.
+# -----------------------------------------------------
+def resume_simulation(checkpoint_path, checkpoint_every=None):
+    """
+    Continues a checkpointed simulation exactly as if it had never stopped.
+
+    Parameters:
+        checkpoint_path (str): The checkpoint file to resume from. New
+                               checkpoints are saved to the same file.
+        checkpoint_every (int): Save a checkpoint after every this many steps.
+
+    Returns:
+        ResultsBuffer: The state counts at each time step, including the steps
+                       that ran before the checkpoint.
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint["engine"] == "numpy":
+        from simulation_numpy import resume_simulation_arrays
+        return resume_simulation_arrays(checkpoint, checkpoint_path, checkpoint_every)
+
+    population = []
+    for x, y, code, days_infected in zip(checkpoint["x"], checkpoint["y"],
+                                         checkpoint["state"], checkpoint["days_infected"]):
+        individual = Individual(x, y, STATES[code])
+        individual.days_infected = days_infected
+        population.append(individual)
+    counts = checkpoint["results"]
+    results = ResultsBuffer(checkpoint["parameters"]["simulation_steps"])
+    for start in range(0, len(counts), len(STATES)):
+        results.append(counts[start:start + len(STATES)])
+    random.setstate(checkpoint["random_state"])
+    steps = iter_simulation_steps(checkpoint["parameters"], population, checkpoint["step"],
+                                  results, checkpoint["scheduler"], checkpoint["neighbour_list"],
+                                  checkpoint_path, checkpoint_every)
+    resume_steady_state(steps, checkpoint, results)
     return results
 
+# -----------------------------------------------------
+# Function: resume_steady_state
+# Runs the resumed steps through pad_steady_state.
+# -----------------------------------------------------
+def resume_steady_state(steps, checkpoint, results):
+    """
+    Runs the steps of a resumed simulation through pad_steady_state, so that
+    it stops at the same steady state as the run it continues, and appends
+    the padded counts that were not simulated to results.
+
+    Parameters:
+        steps (generator): Yields the counts after each resumed step and
+                           appends them to results.
+        checkpoint (dict): The checkpoint the run was resumed from.
+        results (ResultsBuffer): The state counts recorded so far.
+    """
+    first_record = checkpoint["step"] + 1
+    for record, counts in enumerate(pad_steady_state(steps, checkpoint["parameters"],
+                                                     checkpoint["convergence_history"], first_record),
+                                    first_record):
+        if record == len(results):
+            results.append(counts)
+
 # -----------------------------------------------------
 # Function: process_results
 # Converts the simulation results into a pandas DataFrame.
@@ -207,41 +1304,90 @@ def process_results(simulation_results):
     """
     Processes the simulation results into a pandas DataFrame for analysis and visualization.
 
+    A ResultsBuffer is wrapped without copying its counts.
+
     Parameters:
-        simulation_results (list): List of state count dictionaries for each time step.
+        simulation_results (ResultsBuffer or list): State counts for each time step.
 
     Returns:
         pandas.DataFrame: A DataFrame with time steps as the index and state counts as columns.
     """
-    df = pd.DataFrame(simulation_results)
+    if isinstance(simulation_results, ResultsBuffer):
+        df = pd.DataFrame(simulation_results.to_array(), columns=list(STATES), copy=False)
+    else:
+        df = pd.DataFrame(simulation_results)
     df.index.name = "Time Step"
     return df
 
+# -----------------------------------------------------
+# Function: downsample_indices
+# Picks the points of a long series that keep its shape.
+# -----------------------------------------------------
+def downsample_indices(values, buckets):
+    """
+    Splits a series into equal buckets and keeps the minimum and maximum of
+    each one, plus the first and last points, so that peaks and troughs
+    survive however long the series is.
+
+    Parameters:
+        values (numpy.ndarray): The series to downsample.
+        buckets (int): The number of buckets, for example one per pixel of plot width.
+
+    Returns:
+        numpy.ndarray: Ascending indices of the points to keep, at most 2 * buckets + 2.
+    """
+    count = len(values)
+    if count <= 2 * buckets:
+        return np.arange(count)
+    bucket = np.arange(count) * buckets // count
+    # Within each bucket, the first index in this order is the minimum and the last is the maximum
+    order = np.lexsort((values, bucket))
+    starts = np.flatnonzero(np.diff(bucket[order], prepend=-1))
+    ends = np.append(starts[1:], count) - 1
+    return np.unique(np.concatenate([[0, count - 1], order[starts], order[ends]]))
+
 # -----------------------------------------------------
 # Function: visualize_data
 # Uses matplotlib to create a line chart of the simulation results.
 # -----------------------------------------------------
-def visualize_data(df):
+def visualize_data(df, output_path=None, max_points=PLOT_MAX_POINTS):
     """
     Visualizes the simulation data using matplotlib.
 
+    Long runs are downsampled with downsample_indices before plotting, and
+    markers are left out when there are many points.
+
     Parameters:
         df (pandas.DataFrame): DataFrame containing state counts over time.
+        output_path (str): Optional image file, such as a PNG, to save the chart
+                           to instead of opening a window.
+        max_points (int): The most points to plot per state.
 
     Creates a line chart for each state (susceptible, infected, recovered, dead).
     """
-    plt.figure(figsize=(12, 8))
-    plt.plot(df.index, df["susceptible"], label="Susceptible", marker="o")
-    plt.plot(df.index, df["infected"], label="Infected", marker="o")
-    plt.plot(df.index, df["recovered"], label="Recovered", marker="o")
-    plt.plot(df.index, df["dead"], label="Dead", marker="o")
-    plt.xlabel("Time Step")
-    plt.ylabel("Number of Individuals")
-    plt.title("Disease Spread Simulation Over Time")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.show()
+    if output_path is None:
+        figure = plt.figure(figsize=(12, 8))
+    else:
+        # Drawing without pyplot never opens a window, so it works without a display
+        from matplotlib.figure import Figure
+        figure = Figure(figsize=(12, 8))
+    axes = figure.add_subplot()
+    steps = df.index.to_numpy()
+    for state in STATES:
+        values = df[state].to_numpy()
+        keep = downsample_indices(values, max_points // 2)
+        marker = "o" if len(keep) <= MARKER_LIMIT else None
+        axes.plot(steps[keep], values[keep], label=state.capitalize(), marker=marker)
+    axes.set_xlabel("Time Step")
+    axes.set_ylabel("Number of Individuals")
+    axes.set_title("Disease Spread Simulation Over Time")
+    axes.legend()
+    axes.grid(True)
+    figure.tight_layout()
+    if output_path is None:
+        plt.show()
+    else:
+        figure.savefig(output_path)
 
 # -----------------------------------------------------
 # Main function to run the complete simulation.
@@ -13,12 +13,19 @@ visualized with matplotlib, and optionally controlled via a tkinter GUI.
 # ---------------------------
 import random
 import math
+import time
+import queue
+import threading
 import pandas as pd
 import matplotlib.pyplot as plt
 
 # For the GUI
 import tkinter as tk
 from tkinter import ttk, messagebox
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from simulation_live import LiveView, frame_from_individuals
+from simulation_ode import iter_simulation_ode
 
 # ---------------------------
 # Simulation Classes and Functions
@@ -105,6 +112,63 @@ def calculate_distance(ind1, ind2):
     return math.sqrt((ind1.x - ind2.x)**2 + (ind1.y - ind2.y)**2)
 
 
+def get_cell(individual, cell_size):
+    """
+    Finds the grid cell that an individual falls into.
+    
+    Parameters:
+        individual (Individual): The individual to locate.
+        cell_size (float): The width and height of each cell.
+    
+    Returns:
+        tuple: The (column, row) of the cell.
+    """
+    return (int(individual.x // cell_size), int(individual.y // cell_size))
+
+
+def build_spatial_hash(population, cell_size, state="infected"):
+    """
+    Builds a uniform spatial hash of the individuals in a given state.
+    
+    Parameters:
+        population (list): List of Individual objects.
+        cell_size (float): The width and height of each cell.
+        state (str): Only individuals in this state are added to the hash.
+    
+    Returns:
+        dict: Maps (column, row) cells to lists of population indices.
+    """
+    spatial_hash = {}
+    for index, individual in enumerate(population):
+        if individual.state == state:
+            spatial_hash.setdefault(get_cell(individual, cell_size), []).append(index)
+    return spatial_hash
+
+
+def find_nearby_indices(individual, spatial_hash, cell_size):
+    """
+    Collects the indices stored in the cell of an individual and its eight neighbouring cells.
+    
+    Parameters:
+        individual (Individual): The individual at the centre of the search.
+        spatial_hash (dict): A hash created by build_spatial_hash.
+        cell_size (float): The cell size the hash was built with.
+    
+    Returns:
+        list: Candidate population indices in ascending order.
+    """
+    column, row = get_cell(individual, cell_size)
+    candidates = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            cell = spatial_hash.get((column + dx, row + dy))
+            if cell:
+                candidates.extend(cell)
+    # Keep population order so random draws match a full scan.
+    candidates.sort()
+    return candidates
+
+
 def simulate_step(population, parameters):
     """
     Performs a single simulation time step:
@@ -129,16 +193,20 @@ def simulate_step(population, parameters):
     for individual in population:
         move_individual(individual, parameters)
 
-    # 2. For each susceptible individual, check for nearby infected individuals.
-    for individual in population:
+    # 2. For each susceptible individual, check infected individuals in nearby cells.
+    cell_size = infection_distance if infection_distance > 0 else 1
+    infected_hash = build_spatial_hash(population, cell_size)
+    for index, individual in enumerate(population):
         if individual.state == "susceptible":
-            for other in population:
-                if other.state == "infected":
-                    if calculate_distance(individual, other) <= infection_distance:
-                        if random.random() < p_transmission:
-                            individual.state = "infected"
-                            individual.days_infected = 0
-                            break  # No need to check further once infected.
+            for other_index in find_nearby_indices(individual, infected_hash, cell_size):
+                other = population[other_index]
+                if calculate_distance(individual, other) <= infection_distance:
+                    if random.random() < p_transmission:
+                        individual.state = "infected"
+                        individual.days_infected = 0
+                        # Newly infected individuals can infect others in this same step.
+                        infected_hash.setdefault(get_cell(individual, cell_size), []).append(index)
+                        break  # No need to check further once infected.
 
     # 3. Update infected individuals.
     for individual in population:
@@ -169,26 +237,91 @@ def count_states(population):
     return counts
 
 
-def run_simulation(parameters):
+def iter_population(parameters):
     """
-    Runs the entire simulation for a set number of time steps.
+    Runs the simulation one time step at a time.
     
     Parameters:
         parameters (dict): Simulation parameters including "simulation_steps".
     
-    Returns:
-        list: A list of dictionaries recording the state counts at each time step.
+    Yields:
+        list: The population in its initial state and then after each time step.
+              The same list is updated in place between steps.
     """
     population = create_population(parameters)
     simulation_steps = parameters["simulation_steps"]
-    results = []
 
-    # Record the initial state.
-    results.append(count_states(population))
+    # Yield the initial state.
+    yield population
     for step in range(simulation_steps):
         population = simulate_step(population, parameters)
-        results.append(count_states(population))
-    return results
+        yield population
+
+
+def iter_simulation(parameters):
+    """
+    Runs the simulation one time step at a time.
+    
+    Parameters:
+        parameters (dict): Simulation parameters including "simulation_steps".
+    
+    Yields:
+        dict: The state counts of the initial state and then of each time step.
+    """
+    for population in iter_population(parameters):
+        yield count_states(population)
+
+
+def run_simulation(parameters):
+    """
+    Runs the entire simulation for a set number of time steps.
+    
+    Parameters:
+        parameters (dict): Simulation parameters including "simulation_steps".
+    
+    Returns:
+        list: A list of dictionaries recording the state counts at each time step.
+    """
+    return list(iter_simulation(parameters))
+
+
+def run_in_background(parameters, progress_queue, cancel_event, send_frames=False, mean_field=False):
+    """
+    Runs the simulation and reports its progress through a queue, so it can
+    run on a worker thread while the GUI keeps handling events.
+    
+    The messages put on the queue are:
+        ("frame", step, (x, y, state)) before each step message if send_frames is True,
+        ("step", step, counts) after each time step,
+        ("done", results) when the run finishes,
+        ("cancelled", results) when cancel_event was set, and
+        ("error", message) if the simulation raised an exception.
+    
+    Parameters:
+        parameters (dict): Simulation parameters including "simulation_steps".
+        progress_queue (queue.Queue): Where progress messages are put.
+        cancel_event (threading.Event): Stops the run at the next step boundary when set.
+        send_frames (bool): Also send the positions and states for a live view.
+        mean_field (bool): Run the mean-field model from simulation_ode instead of
+                           the individuals. It has no positions, so no frames are sent.
+    """
+    try:
+        results = []
+        if mean_field:
+            steps = ((None, counts) for counts in iter_simulation_ode(parameters))
+        else:
+            steps = ((population, count_states(population)) for population in iter_population(parameters))
+        for step, (population, counts) in enumerate(steps):
+            results.append(counts)
+            if send_frames and population is not None:
+                progress_queue.put(("frame", step, frame_from_individuals(population)))
+            progress_queue.put(("step", step, counts))
+            if cancel_event.is_set():
+                progress_queue.put(("cancelled", results))
+                return
+        progress_queue.put(("done", results))
+    except Exception as e:
+        progress_queue.put(("error", str(e)))
 
 
 def process_results(simulation_results):
@@ -265,39 +398,123 @@ def build_gui():
         - Initial Infected
         - Simulation Steps
     
-    When the 'Run Simulation' button is clicked, the simulation is executed,
-    the final state counts are displayed, and the simulation is visualized.
+    When the 'Run Simulation' button is clicked, the simulation runs on a
+    background thread while a progress bar shows the step and steps per second.
+    With 'Live View' checked, a second window animates the individuals as they
+    move. With 'Mean-Field Estimate' checked, the quick deterministic model from
+    simulation_ode runs instead of the individuals. The 'Cancel' button stops the run at the next step. When the run
+    finishes, the final state counts are displayed and the simulation is visualized.
     """
+    progress_queue = queue.Queue()
+    cancel_event = threading.Event()
+    run_state = {"start_time": 0.0, "steps": 0, "view": None}
+
     def run_simulation_gui():
         try:
             # Retrieve values from the GUI input fields.
             population_size = int(population_entry.get())
             initial_infected = int(infected_entry.get())
             simulation_steps = int(steps_entry.get())
-            
-            # Define parameters (some values are fixed for simplicity).
-            parameters = {
-                "population_size": population_size,
-                "initial_infected": initial_infected,
-                "grid_size": 100,
-                "movement_rate": 5,
-                "infection_distance": 5,
-                "p_transmission": 0.3,
-                "infection_duration": 10,
-                "p_death": 0.02,
-                "simulation_steps": simulation_steps
-            }
-            # Run the simulation and process the results.
-            simulation_results = run_simulation(parameters)
-            df_results = process_results(simulation_results)
-            # Display final state counts in a message box.
-            messagebox.showinfo("Simulation Complete",
-                                f"Simulation ran for {simulation_steps} steps.\n"
-                                f"Final state counts:\n{df_results.iloc[-1].to_dict()}")
-            # Visualize the simulation results.
-            visualize_data(df_results)
         except Exception as e:
             messagebox.showerror("Error", f"An error occurred: {e}")
+            return
+
+        # Define parameters (some values are fixed for simplicity).
+        parameters = {
+            "population_size": population_size,
+            "initial_infected": initial_infected,
+            "grid_size": 100,
+            "movement_rate": 5,
+            "infection_distance": 5,
+            "p_transmission": 0.3,
+            "infection_duration": 10,
+            "p_death": 0.02,
+            "simulation_steps": simulation_steps
+        }
+        # Run the simulation on a worker thread so the window stays responsive.
+        cancel_event.clear()
+        run_state["start_time"] = time.perf_counter()
+        run_state["steps"] = simulation_steps
+        progress_bar["maximum"] = max(simulation_steps, 1)
+        progress_bar["value"] = 0
+        status_label["text"] = "Starting..."
+        run_button["state"] = "disabled"
+        cancel_button["state"] = "normal"
+        use_mean_field = mean_field.get()
+        run_state["view"] = None
+        if live_view.get() and not use_mean_field:
+            run_state["view"] = open_live_view(parameters["grid_size"])
+        worker = threading.Thread(target=run_in_background,
+                                  args=(parameters, progress_queue, cancel_event,
+                                        run_state["view"] is not None, use_mean_field),
+                                  daemon=True)
+        worker.start()
+        root.after(50, poll_progress)
+
+    def open_live_view(grid_size):
+        window = tk.Toplevel(root)
+        window.title("Live View")
+        figure = Figure(figsize=(6, 6))
+        canvas = FigureCanvasTkAgg(figure, master=window)
+        canvas.get_tk_widget().pack(fill="both", expand=True)
+        view = LiveView(grid_size, figure=figure)
+        # Stop drawing frames if the window is closed during a run.
+        def close_view():
+            run_state["view"] = None
+            window.destroy()
+        window.protocol("WM_DELETE_WINDOW", close_view)
+        return view
+
+    def cancel_simulation():
+        cancel_event.set()
+        status_label["text"] = "Cancelling..."
+
+    def finish_run(status):
+        run_button["state"] = "normal"
+        cancel_button["state"] = "disabled"
+        status_label["text"] = status
+
+    def poll_progress():
+        # Handle every message the worker thread has sent since the last poll,
+        # drawing only the newest frame so the view keeps up with the run.
+        latest_frame = None
+        while True:
+            try:
+                message = progress_queue.get_nowait()
+            except queue.Empty:
+                break
+            kind = message[0]
+            if kind == "frame":
+                latest_frame = message
+            elif kind == "step":
+                step = message[1]
+                elapsed = time.perf_counter() - run_state["start_time"]
+                rate = step / elapsed if elapsed > 0 else 0.0
+                progress_bar["value"] = step
+                status_label["text"] = f"Step {step} of {run_state['steps']} ({rate:.1f} steps/s)"
+            elif kind == "error":
+                finish_run("Failed")
+                messagebox.showerror("Error", f"An error occurred: {message[1]}")
+                return
+            else:
+                if latest_frame is not None and run_state["view"] is not None:
+                    run_state["view"].draw_frame(latest_frame[1], *latest_frame[2])
+                df_results = process_results(message[1])
+                completed = len(df_results) - 1
+                if kind == "cancelled":
+                    finish_run(f"Cancelled after {completed} steps")
+                    return
+                finish_run(f"Finished {completed} steps")
+                # Display final state counts in a message box.
+                messagebox.showinfo("Simulation Complete",
+                                    f"Simulation ran for {completed} steps.\n"
+                                    f"Final state counts:\n{df_results.iloc[-1].to_dict()}")
+                # Visualize the simulation results.
+                visualize_data(df_results)
+                return
+        if latest_frame is not None and run_state["view"] is not None:
+            run_state["view"].draw_frame(latest_frame[1], *latest_frame[2])
+        root.after(50, poll_progress)
 
     # Create the main window.
     root = tk.Tk()
@@ -319,9 +536,27 @@ def build_gui():
     steps_entry.grid(row=2, column=1, padx=5, pady=5)
     steps_entry.insert(0, "50")
 
-    # Button to run the simulation.
+    # Buttons to run and cancel the simulation.
     run_button = ttk.Button(root, text="Run Simulation", command=run_simulation_gui)
-    run_button.grid(row=3, column=0, columnspan=2, padx=5, pady=10)
+    run_button.grid(row=3, column=0, padx=5, pady=10)
+    cancel_button = ttk.Button(root, text="Cancel", command=cancel_simulation, state="disabled")
+    cancel_button.grid(row=3, column=1, padx=5, pady=10)
+
+    # Progress bar and status line for the running simulation.
+    progress_bar = ttk.Progressbar(root, orient="horizontal", length=250, mode="determinate")
+    progress_bar.grid(row=4, column=0, columnspan=2, padx=5, pady=5)
+    status_label = ttk.Label(root, text="Ready")
+    status_label.grid(row=5, column=0, columnspan=2, padx=5, pady=5)
+
+    # Option to animate the individuals in a separate window.
+    live_view = tk.BooleanVar(value=False)
+    ttk.Checkbutton(root, text="Live View", variable=live_view).grid(row=6, column=0, columnspan=2,
+                                                                     padx=5, pady=5)
+
+    # Option to run the quick mean-field model instead of the individuals.
+    mean_field = tk.BooleanVar(value=False)
+    ttk.Checkbutton(root, text="Mean-Field Estimate", variable=mean_field).grid(row=7, column=0, columnspan=2,
+                                                                                padx=5, pady=5)
 
     # Start the GUI event loop.
     root.mainloop()
@@ -0,0 +1,595 @@
+"""
+Local Job Service for the Disease Spread Simulation
+
+This program serves simulation jobs over HTTP on the local machine, so that
+several people sharing one computer can queue their runs on one bounded
+process pool instead of each starting their own processes. It only uses the
+standard library (http.server) and the simulation modules.
+
+Endpoints:
+    POST /jobs               Submits {"parameters": {...}, "replicates": 4,
+                             "engine": "python", "seed": 0}. Parameters left
+                             out are taken from DEFAULT_PARAMETERS. An
+                             identical job that is still queued or running
+                             is shared instead of run again.
+    GET  /jobs/<id>          The job's status, progress and, once done, the
+                             counts of every replicate and their mean.
+    GET  /jobs/<id>/events   Server-sent events: one "step" event per time
+                             step of each replicate as it is computed, then
+                             "done" or "error". Earlier events are replayed
+                             first, so clients may connect at any time.
+                             When one replicate fails, the job fails and its
+                             other replicates are cancelled.
+    GET  /metrics            Queue depth, running replicates, job totals and
+                             steps per second.
+
+Finished jobs are kept for --finished-ttl seconds, and at most --max-finished
+of them, after which their ids are no longer found.
+
+Run it from the command line:
+    python simulation_service.py --port 8765 --workers 4
+"""
+
+# ---------------------------
+# Module Imports
+# ---------------------------
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Manager, Pool, Queue
+
+import numpy as np
+
+from simulation_program import iter_simulation, STATES, ENGINES as SIMULATION_ENGINES, PROCESS_ENGINES
+from simulation_ensemble import replicate_seeds
+from simulation_cli import DEFAULT_PARAMETERS
+
+# ---------------------------------
+# Engines the service runs. The shared and distributed engines start worker
+# processes of their own, which pool workers are not allowed to do.
+# ---------------------------------
+ENGINES = tuple(engine for engine in SIMULATION_ENGINES if engine not in PROCESS_ENGINES)
+
+# ---------------------------------
+# Steps per second are measured over this many recent seconds.
+# ---------------------------------
+METRICS_WINDOW = 10.0
+
+# ---------------------------------
+# The progress queue each pool worker reports to, and the shared
+# dictionary whose keys are the ids of cancelled jobs.
+# ---------------------------------
+_progress = None
+_cancelled = None
+
+# -----------------------------------------------------
+# Function: attach_progress
+# Pool initializer that gives a worker the progress queue.
+# -----------------------------------------------------
+def attach_progress(progress, cancelled):
+    """
+    Parameters:
+        progress (multiprocessing.Queue): Where workers report their progress.
+        cancelled (dict): A managed dictionary keyed by the ids of cancelled jobs.
+    """
+    global _progress, _cancelled
+    _progress = progress
+    _cancelled = cancelled
+
+# -----------------------------------------------------
+# Function: run_job_replicate
+# Runs one replicate of a job and reports every step.
+# -----------------------------------------------------
+def run_job_replicate(task):
+    """
+    Runs one replicate in a pool worker, putting ("start", ...), one
+    ("step", ...) per time step and then ("done", ...), ("error", ...) or
+    ("cancelled", ...) on the progress queue. They arrive in order, because
+    they share one queue.
+
+    The replicate stops as soon as its job is cancelled. A failing replicate
+    cancels its job itself, so that the job's queued replicates are skipped
+    even before the service has seen the error.
+
+    Parameters:
+        task (tuple): (job id, replicate number, parameters, engine, seed).
+    """
+    job_id, replicate, parameters, engine, seed = task
+    _progress.put(("start", job_id, replicate))
+    try:
+        random.seed(seed)
+        if parameters.get("seed") is not None:
+            # Seeded runs use counter-based streams, which need a seed per replicate
+            parameters = dict(parameters, seed=seed)
+        for step, counts in enumerate(iter_simulation(parameters, engine=engine)):
+            if job_id in _cancelled:
+                _progress.put(("cancelled", job_id, replicate))
+                return
+            _progress.put(("step", job_id, replicate, step, [counts[state] for state in STATES]))
+        _progress.put(("done", job_id, replicate))
+    except Exception:
+        _cancelled[job_id] = True
+        _progress.put(("error", job_id, replicate, traceback.format_exc()))
+
+# -----------------------------------------------------
+# Function: job_key
+# Hashes a job request so identical jobs can be shared.
+# -----------------------------------------------------
+def job_key(parameters, replicates, engine, seed):
+    """
+    Parameters:
+        parameters (dict): The full simulation parameters.
+        replicates (int): The number of replicates.
+        engine (str): The run_simulation engine.
+        seed (int): The seed the replicate seeds are derived from.
+
+    Returns:
+        str: A hexadecimal SHA-256 digest.
+    """
+    content = json.dumps({"parameters": parameters, "replicates": replicates,
+                          "engine": engine, "seed": seed}, sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+# ---------------------------------
+# Define a class for one submitted job.
+# ---------------------------------
+class SimulationJob:
+    def __init__(self, job_id, key, parameters, replicates, engine, seed):
+        """
+        Holds a job's request, progress and the events streamed to clients.
+
+        Parameters:
+            job_id (str): The job's id.
+            key (str): The job_key of the request.
+            parameters (dict): The full simulation parameters.
+            replicates (int): The number of replicates.
+            engine (str): The run_simulation engine.
+            seed (int): The seed the replicate seeds are derived from.
+        """
+        self.job_id = job_id
+        self.key = key
+        self.parameters = parameters
+        self.replicates = replicates
+        self.engine = engine
+        self.seed = seed
+        self.status = "queued"
+        self.error = None
+        self.counts = [[] for _ in range(replicates)]
+        self.finished = 0
+        self.ended = 0
+        self.events = []
+        self.submitted = time.time()
+        self.condition = threading.Condition()
+
+    def add_event(self, name, data):
+        """
+        Adds an event and wakes the clients streaming this job.
+
+        Parameters:
+            name (str): The event name, such as "step".
+            data (dict): The event data.
+        """
+        with self.condition:
+            self.events.append((name, data))
+            self.condition.notify_all()
+
+    def wait_events(self, start, timeout=1.0):
+        """
+        Waits until there are events after the first start events.
+
+        Parameters:
+            start (int): The number of events the caller already has.
+            timeout (float): The most seconds to wait.
+
+        Returns:
+            list: The new (name, data) events, which may be empty after a timeout.
+        """
+        with self.condition:
+            if len(self.events) <= start:
+                self.condition.wait(timeout)
+            return self.events[start:]
+
+    def describe(self):
+        """
+        Returns:
+            dict: The job's status and progress, with the counts of every
+                  replicate and their mean once the job is done.
+        """
+        description = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "engine": self.engine,
+            "replicates": self.replicates,
+            "seed": self.seed,
+            "parameters": self.parameters,
+            "steps_done": [max(len(counts) - 1, 0) for counts in self.counts]
+        }
+        if self.status == "done":
+            description["results"] = self.counts
+            description["mean"] = np.mean(np.array(self.counts, dtype=np.float64), axis=0).tolist()
+        if self.error is not None:
+            description["error"] = self.error
+        return description
+
+# ---------------------------------
+# Define a class for the job queue and worker pool.
+# ---------------------------------
+class SimulationService:
+    def __init__(self, processes=None, max_queued=64, max_finished=256, finished_ttl=3600.0):
+        """
+        Runs submitted jobs on a bounded process pool and collects their progress.
+
+        Parameters:
+            processes (int): Number of worker processes. Defaults to all cores.
+            max_queued (int): The most replicates that may wait for a worker;
+                              jobs that would exceed it are refused.
+            max_finished (int): The most finished jobs to keep; older ones are
+                                forgotten first.
+            finished_ttl (float): Seconds a finished job is kept for.
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.finished_ttl = finished_ttl
+        self.jobs = {}
+        self.in_flight = {}
+        self.retired = deque()
+        self.lock = threading.Lock()
+        self.queued_replicates = 0
+        self.running_replicates = 0
+        self.totals = {"submitted": 0, "deduplicated": 0, "rejected": 0, "done": 0, "failed": 0,
+                       "evicted": 0, "replicates_done": 0, "replicates_cancelled": 0, "steps": 0,
+                       "dispatch_errors": 0}
+        self.recent_steps = deque()
+        self.started = time.time()
+        self.closed = False
+        self.progress = Queue()
+        self.manager = Manager()
+        self.cancelled = self.manager.dict()
+        self.pool = Pool(self.processes, initializer=attach_progress, initargs=(self.progress, self.cancelled))
+        self.dispatcher = threading.Thread(target=self.dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def submit(self, request):
+        """
+        Queues a job, or returns the identical job that is already queued or running.
+
+        Parameters:
+            request (dict): "parameters" (dict), and optionally "replicates"
+                            (default 1), "engine" (default "python") and
+                            "seed" (default 0).
+
+        Returns:
+            tuple: The SimulationJob, and True if it was shared with an earlier request.
+
+        Raises:
+            ValueError: If the request is malformed.
+            OverflowError: If the queue has no room for the job's replicates.
+        """
+        parameters = request.get("parameters", {})
+        replicates = request.get("replicates", 1)
+        engine = request.get("engine", "python")
+        seed = request.get("seed", 0)
+        if not isinstance(parameters, dict):
+            raise ValueError("parameters must be a JSON object")
+        if not isinstance(replicates, int) or replicates < 1:
+            raise ValueError("replicates must be a positive integer")
+        if engine not in ENGINES:
+            raise ValueError(f"The service runs the engines {', '.join(ENGINES)}, not {engine}")
+        if not isinstance(seed, int):
+            raise ValueError("seed must be an integer")
+        parameters = dict(DEFAULT_PARAMETERS, **parameters)
+        key = job_key(parameters, replicates, engine, seed)
+
+        with self.lock:
+            self.evict()
+            if key in self.in_flight:
+                self.totals["deduplicated"] += 1
+                return self.jobs[self.in_flight[key]], True
+            if self.queued_replicates + replicates > self.max_queued:
+                self.totals["rejected"] += 1
+                raise OverflowError(f"The queue is full ({self.queued_replicates} replicates waiting)")
+            job = SimulationJob(uuid.uuid4().hex, key, parameters, replicates, engine, seed)
+            self.jobs[job.job_id] = job
+            self.in_flight[key] = job.job_id
+            self.queued_replicates += replicates
+            self.totals["submitted"] += 1
+        for replicate, replicate_seed in enumerate(replicate_seeds(seed, replicates)):
+            self.pool.apply_async(run_job_replicate, ((job.job_id, replicate, parameters, engine, replicate_seed),))
+        return job, False
+
+    def dispatch(self):
+        """
+        Applies the progress reported by the workers to the jobs, until close
+        puts None on the queue. A message that cannot be applied is logged to
+        standard error and counted, and dispatching carries on.
+        """
+        while True:
+            message = self.progress.get()
+            if message is None:
+                return
+            try:
+                self.apply(message)
+            except Exception:
+                traceback.print_exc()
+                with self.lock:
+                    self.totals["dispatch_errors"] += 1
+
+    def apply(self, message):
+        """
+        Applies one progress message from run_job_replicate.
+
+        Parameters:
+            message (tuple): (kind, job id, replicate number, ...).
+        """
+        kind, job_id, replicate = message[:3]
+        with self.lock:
+            if kind == "start":
+                self.queued_replicates -= 1
+                self.running_replicates += 1
+            elif kind == "step":
+                self.totals["steps"] += 1
+                now = time.time()
+                self.recent_steps.append(now)
+                while self.recent_steps and self.recent_steps[0] < now - METRICS_WINDOW:
+                    self.recent_steps.popleft()
+            else:
+                self.running_replicates -= 1
+                if kind == "cancelled":
+                    self.totals["replicates_cancelled"] += 1
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            if kind == "start" and job.status == "queued":
+                job.status = "running"
+
+        if kind == "step" and job.status != "failed":
+            step, counts = message[3:]
+            job.counts[replicate].append(counts)
+            job.add_event("step", {"replicate": replicate, "step": step,
+                                   "counts": dict(zip(STATES, counts))})
+        elif kind == "done" and job.status != "failed":
+            job.finished += 1
+            with self.lock:
+                self.totals["replicates_done"] += 1
+            if job.finished == job.replicates:
+                self.finish(job, "done")
+                job.add_event("done", {"job_id": job.job_id,
+                                       "mean": job.describe()["mean"]})
+        elif kind == "error" and job.status != "failed":
+            # Skip the job's queued replicates and stop its running ones
+            self.cancelled[job_id] = True
+            job.error = message[3]
+            self.finish(job, "failed")
+            job.add_event("error", {"job_id": job.job_id, "error": job.error})
+
+        if kind in ("done", "error", "cancelled"):
+            job.ended += 1
+            if job.ended == job.replicates:
+                self.retire(job)
+
+    def finish(self, job, status):
+        """
+        Marks a job as finished, so that an identical request starts a new job.
+
+        Parameters:
+            job (SimulationJob): The job.
+            status (str): "done" or "failed".
+        """
+        with self.lock:
+            job.status = status
+            self.totals[status] += 1
+            if self.in_flight.get(job.key) == job.job_id:
+                del self.in_flight[job.key]
+
+    def retire(self, job):
+        """
+        Queues a finished job whose replicates have all stopped for eviction.
+
+        Parameters:
+            job (SimulationJob): The job.
+        """
+        self.cancelled.pop(job.job_id, None)
+        with self.lock:
+            self.retired.append((time.time(), job.job_id))
+            self.evict()
+
+    def evict(self):
+        """
+        Forgets the oldest finished jobs beyond max_finished and those older
+        than finished_ttl. The caller must hold the lock.
+        """
+        expired = time.time() - self.finished_ttl
+        while self.retired and (len(self.retired) > self.max_finished or self.retired[0][0] < expired):
+            _, job_id = self.retired.popleft()
+            del self.jobs[job_id]
+            self.totals["evicted"] += 1
+
+    def metrics(self):
+        """
+        Returns:
+            dict: "queue_depth" (replicates waiting for a worker), "queued_jobs",
+                  "running_replicates", "workers", the job and step totals,
+                  "steps_per_second" over the last METRICS_WINDOW seconds and
+                  "uptime" in seconds.
+        """
+        with self.lock:
+            now = time.time()
+            while self.recent_steps and self.recent_steps[0] < now - METRICS_WINDOW:
+                self.recent_steps.popleft()
+            uptime = now - self.started
+            return dict(self.totals,
+                        queue_depth=self.queued_replicates,
+                        queued_jobs=sum(1 for job in self.jobs.values() if job.status == "queued"),
+                        running_replicates=self.running_replicates,
+                        workers=self.processes,
+                        steps_per_second=len(self.recent_steps) / min(METRICS_WINDOW, max(uptime, 1e-9)),
+                        uptime=uptime)
+
+    def close(self):
+        """
+        Stops the workers and the dispatcher.
+        """
+        self.closed = True
+        self.pool.terminate()
+        self.pool.join()
+        self.progress.put(None)
+        self.dispatcher.join()
+        self.manager.shutdown()
+
+# ---------------------------------
+# Define a class for handling HTTP requests.
+# ---------------------------------
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    Serves the endpoints of the SimulationService stored on the server.
+    """
+
+    def send_json(self, status, body):
+        """
+        Sends a JSON response.
+
+        Parameters:
+            status (int): The HTTP status code.
+            body (dict): The response body.
+        """
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        service = self.server.service
+        if self.path.rstrip("/") != "/jobs":
+            self.send_json(404, {"error": f"No such endpoint: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(request, dict):
+                raise ValueError("The request must be a JSON object")
+            job, deduplicated = service.submit(request)
+        except (ValueError, json.JSONDecodeError) as error:
+            self.send_json(400, {"error": str(error)})
+            return
+        except OverflowError as error:
+            self.send_json(503, {"error": str(error)})
+            return
+        self.send_json(200 if deduplicated else 202,
+                       {"job_id": job.job_id, "status": job.status, "deduplicated": deduplicated,
+                        "events": f"/jobs/{job.job_id}/events"})
+
+    def do_GET(self):
+        service = self.server.service
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        if parts == ["metrics"]:
+            self.send_json(200, service.metrics())
+            return
+        job = service.jobs.get(parts[1]) if len(parts) in (2, 3) and parts[0] == "jobs" else None
+        if job is not None:
+            if len(parts) == 2:
+                self.send_json(200, job.describe())
+                return
+            if parts[2] == "events":
+                self.stream_events(job)
+                return
+        self.send_json(404, {"error": f"No such endpoint or job: {self.path}"})
+
+    def stream_events(self, job):
+        """
+        Streams a job's events as server-sent events until it is done or fails.
+
+        Parameters:
+            job (SimulationJob): The job to stream.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        sent = 0
+        while not self.server.service.closed:
+            events = job.wait_events(sent)
+            if events:
+                self.wfile.write("".join(f"event: {name}\ndata: {json.dumps(data)}\n\n"
+                                         for name, data in events).encode("utf-8"))
+                self.wfile.flush()
+                sent += len(events)
+                if events[-1][0] in ("done", "error"):
+                    return
+
+    def log_message(self, format, *args):
+        # Keep request logs out of the output unless the server asks for them
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+# -----------------------------------------------------
+# Function: make_server
+# Creates an HTTP server for a SimulationService.
+# -----------------------------------------------------
+def make_server(service, host="127.0.0.1", port=0, verbose=False):
+    """
+    Parameters:
+        service (SimulationService): The service to expose.
+        host (str): The address to listen on. Defaults to this machine only.
+        port (int): The port, or 0 to pick a free one (see server.server_address).
+        verbose (bool): Log every request.
+
+    Returns:
+        ThreadingHTTPServer: The server; call serve_forever to start it.
+    """
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+# -----------------------------------------------------
+# Main function to run the service.
+# -----------------------------------------------------
+def main(argv=None):
+    """
+    Main function that:
+      1. Reads the command-line options.
+      2. Starts the worker pool and the HTTP server.
+      3. Serves jobs until interrupted.
+
+    Parameters:
+        argv (list): Optional command-line arguments. Defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Serve disease spread simulation jobs on this machine.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--max-queued", type=int, default=64, help="Most replicates waiting for a worker")
+    parser.add_argument("--max-finished", type=int, default=256, help="Most finished jobs to keep")
+    parser.add_argument("--finished-ttl", type=float, default=3600.0, help="Seconds to keep a finished job")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args(argv)
+
+    service = SimulationService(args.workers, args.max_queued, args.max_finished, args.finished_ttl)
+    server = make_server(service, args.host, args.port, args.verbose)
+    host, port = server.server_address[:2]
+    print(f"Serving simulation jobs on http://{host}:{port} with {service.processes} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+# -----------------------------------------------------
+# Entry point of the program.
+# -----------------------------------------------------
+if __name__ == "__main__":
+    main()
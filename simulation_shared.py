@@ -0,0 +1,272 @@
+"""
+Shared-Memory Disease Spread Simulation
+
+This module runs the array engine from simulation_numpy.py with the infection
+phase split across a pool of worker processes. The population arrays live in
+multiprocessing.shared_memory blocks that every worker attaches to once, when
+the pool starts. Each step, the parent sorts the infected individuals by cell
+once and writes that index to shared memory too. A worker then looks up the
+susceptible individuals of one range of the population in the index and sends
+back only the indices of the ones it infected, so positions are never pickled
+between processes. Movement and recovery stay in the parent process.
+
+Like the array engine, the infection phase tests every pair against the
+infected set from the start of the phase, so the results have the same
+statistics as engine="numpy". With parameters["seed"] set they are
+bit-identical to it, whatever the number of workers.
+
+Select it with run_simulation(parameters, engine="shared"), and set the number
+of worker processes with parameters["workers"] (default: all cores).
+"""
+
+# ---------------------------
+# Module Imports
+# ---------------------------
+import os
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from simulation_numpy import (
+    SUSCEPTIBLE,
+    INFECTED,
+    PopulationArrays,
+    RecoveryScheduler,
+    make_rng,
+    create_population_arrays,
+    move_population,
+    sort_by_cell,
+    find_infection_pairs,
+    draw_infections,
+    update_infected,
+    count_states_arrays
+)
+from simulation_streams import make_streams
+
+# ---------------------------------
+# Names and types of the shared population arrays.
+# ---------------------------------
+FIELDS = (("x", np.float64), ("y", np.float64), ("state", np.int8), ("days_infected", np.int32))
+
+# ---------------------------------
+# Names and types of the shared index of infected individuals by cell.
+# ---------------------------------
+INDEX_FIELDS = (("infected", np.int64), ("infected_cells", np.int64))
+
+# ---------------------------------
+# Define a class for population arrays in shared memory.
+# ---------------------------------
+class SharedPopulation:
+    def __init__(self, population=None, layout=None):
+        """
+        Holds PopulationArrays whose memory is shared between processes, and
+        room for the infected individuals sorted by cell (see sort_by_cell).
+
+        Pass a population to copy it into new shared memory blocks, or the
+        layout of an existing SharedPopulation to attach to its blocks.
+
+        Parameters:
+            population (PopulationArrays): The population to copy into shared memory.
+            layout (dict): Maps each field to its block name and length.
+        """
+        self.owner = layout is None
+        self.blocks = {}
+        arrays = {}
+        for field, dtype in FIELDS + INDEX_FIELDS:
+            if self.owner:
+                source = getattr(population, field, None)
+                if source is None:
+                    source = np.zeros(len(population), dtype=dtype)
+                block = SharedMemory(create=True, size=max(source.nbytes, 1))
+                length = len(source)
+            else:
+                name, length = layout[field]
+                block = SharedMemory(name=name)
+            arrays[field] = np.ndarray(length, dtype=dtype, buffer=block.buf)
+            if self.owner:
+                arrays[field][:] = source
+            self.blocks[field] = block
+        self.arrays = PopulationArrays(**{field: arrays[field] for field, _ in FIELDS})
+        self.infected = arrays["infected"]
+        self.infected_cells = arrays["infected_cells"]
+
+    def index_infected(self, parameters):
+        """
+        Sorts the infected individuals by cell into the shared index.
+
+        Parameters:
+            parameters (dict): Contains keys 'infection_distance' and 'grid_size'.
+
+        Returns:
+            int: The number of infected individuals, which is the length of the index.
+        """
+        population = self.arrays
+        infected, cells = sort_by_cell(population, parameters, np.flatnonzero(population.state == INFECTED))
+        self.infected[:len(infected)] = infected
+        self.infected_cells[:len(infected)] = cells
+        return len(infected)
+
+    def infected_index(self, count):
+        """
+        Parameters:
+            count (int): The length of the index, from index_infected.
+
+        Returns:
+            tuple: The infected individuals in cell order, and their cell numbers.
+        """
+        return self.infected[:count], self.infected_cells[:count]
+
+    def layout(self):
+        """
+        Returns:
+            dict: The block name and length of each field, for attaching in another process.
+        """
+        return {field: (self.blocks[field].name, len(self.arrays)) for field, _ in FIELDS + INDEX_FIELDS}
+
+    def close(self):
+        """
+        Detaches from the shared memory, and frees it if this object created it.
+        """
+        self.arrays = self.infected = self.infected_cells = None
+        for block in self.blocks.values():
+            block.close()
+            if self.owner:
+                block.unlink()
+        self.blocks = {}
+
+# ---------------------------------
+# The population each pool worker has attached to.
+# ---------------------------------
+_worker_population = None
+
+# -----------------------------------------------------
+# Function: attach_worker
+# Pool initializer that attaches a worker to the shared population.
+# -----------------------------------------------------
+def attach_worker(layout):
+    """
+    Parameters:
+        layout (dict): The layout from SharedPopulation.layout.
+    """
+    global _worker_population
+    _worker_population = SharedPopulation(layout=layout)
+
+# -----------------------------------------------------
+# Function: infect_range
+# Runs the infection phase for one range of the population.
+# -----------------------------------------------------
+def infect_range(task):
+    """
+    Finds and draws the infections of the susceptible individuals in one index range.
+
+    The shared arrays are only read here; the parent sorts the infected
+    individuals into the shared index before, and applies the infections
+    once every range has been searched.
+
+    Parameters:
+        task (tuple): (start, end, parameters, seed, streams, infected_count)
+                      for the range [start, end), where streams are the run's
+                      CounterStreams or None to draw from a generator seeded
+                      with seed, and infected_count is the length of the index.
+
+    Returns:
+        numpy.ndarray: Ascending indices of the newly infected individuals.
+    """
+    start, end, parameters, seed, streams, infected_count = task
+    population = _worker_population.arrays
+    susceptible = start + np.flatnonzero(population.state[start:end] == SUSCEPTIBLE)
+    pair_susceptible, pair_infected = find_infection_pairs(
+        population, parameters, susceptible=susceptible,
+        infected_index=_worker_population.infected_index(infected_count))
+    return draw_infections(pair_susceptible, parameters, np.random.default_rng(seed),
+                           pair_infected=pair_infected, streams=streams)
+
+# -----------------------------------------------------
+# Function: split_ranges
+# Divides the population indices into contiguous ranges.
+# -----------------------------------------------------
+def split_ranges(size, parts):
+    """
+    Parameters:
+        size (int): The population size.
+        parts (int): The number of ranges.
+
+    Returns:
+        list: (start, end) tuples covering range(size) in order.
+    """
+    bounds = np.linspace(0, size, parts + 1).astype(int).tolist()
+    return list(zip(bounds[:-1], bounds[1:]))
+
+# -----------------------------------------------------
+# Function: iter_simulation_shared
+# Runs the shared-memory engine one time step at a time.
+# -----------------------------------------------------
+def iter_simulation_shared(parameters, processes=None, rng=None):
+    """
+    Runs the disease simulation with a parallel infection phase and yields the
+    state counts of the initial state and of each time step.
+
+    The pool and the shared memory are kept for the whole run and released
+    when it ends or the generator is closed.
+
+    Parameters:
+        parameters (dict): Simulation parameters.
+        processes (int): The number of worker processes. Defaults to
+                         parameters["workers"], or the number of cores.
+        rng (numpy.random.Generator): Optional random generator.
+
+    Yields:
+        dict: The state counts of each time step.
+    """
+    if processes is None:
+        processes = parameters.get("workers") or os.cpu_count() or 1
+    if rng is None:
+        rng = make_rng()
+    streams = make_streams(parameters)
+    shared = SharedPopulation(create_population_arrays(parameters, rng, streams))
+    population = shared.arrays
+    scheduler = None
+    if parameters.get("scheduled_recovery", False):
+        scheduler = RecoveryScheduler(population, parameters)
+    ranges = split_ranges(len(population), processes)
+
+    try:
+        yield count_states_arrays(population)
+        with Pool(processes, initializer=attach_worker, initargs=(shared.layout(),)) as pool:
+            for step in range(parameters["simulation_steps"]):
+                if streams is not None:
+                    streams.step += 1
+                move_population(population, parameters, rng, streams)
+                seeds = rng.integers(2**63, size=len(ranges))
+                infected_count = shared.index_infected(parameters)
+                tasks = [(start, end, parameters, int(seed), streams, infected_count)
+                         for (start, end), seed in zip(ranges, seeds)]
+                newly_infected = np.concatenate(pool.map(infect_range, tasks))
+                population.state[newly_infected] = INFECTED
+                population.days_infected[newly_infected] = 0
+                if scheduler is not None:
+                    scheduler.schedule(newly_infected)
+                update_infected(population, parameters, rng, scheduler, streams)
+                yield count_states_arrays(population)
+    finally:
+        population = None
+        shared.close()
+
+# -----------------------------------------------------
+# Function: run_simulation_shared
+# Runs the shared-memory engine to the end.
+# -----------------------------------------------------
+def run_simulation_shared(parameters, processes=None, rng=None):
+    """
+    Runs the disease simulation with a parallel infection phase and records the state counts.
+
+    Parameters:
+        parameters (dict): Simulation parameters.
+        processes (int): The number of worker processes.
+        rng (numpy.random.Generator): Optional random generator.
+
+    Returns:
+        list: A list of dictionaries, each representing the state counts at a time step.
+    """
+    return list(iter_simulation_shared(parameters, processes, rng))
@@ -0,0 +1,116 @@
+"""
+Counter-Based Random Streams for the Disease Spread Simulation
+
+The random module and NumPy generators hand out numbers in the order they are
+asked for, so a run's results depend on how its work is ordered and split up.
+This module instead computes each random number from what it is for: the run
+seed, the time step, the purpose of the draw and the individual (or pair of
+individuals) it belongs to. The numbers come from the Philox4x32-10
+counter-based generator, which turns a 128-bit counter and a 64-bit key into
+random bits, and is evaluated here for whole arrays of counters at once.
+
+Because a draw no longer depends on which process makes it or on what was
+drawn before it, the array engines give bit-identical results with any number
+of workers whenever parameters["seed"] is set.
+"""
+
+# ---------------------------
+# Module Imports
+# ---------------------------
+import numpy as np
+
+# ---------------------------------
+# The purpose of each draw, which is part of its counter.
+# ---------------------------------
+PLACE_X, PLACE_Y, INITIAL_INFECTION, MOVE_X, MOVE_Y, TRANSMISSION, EXPOSURE, DEATH = range(8)
+
+# ---------------------------------
+# Philox4x32 multipliers and key increments.
+# ---------------------------------
+PHILOX_M0 = np.uint64(0xD2511F53)
+PHILOX_M1 = np.uint64(0xCD9E8D57)
+PHILOX_W0 = 0x9E3779B9
+PHILOX_W1 = 0xBB67AE85
+PHILOX_ROUNDS = 10
+MASK32 = np.uint64(0xFFFFFFFF)
+
+# -----------------------------------------------------
+# Function: philox4x32
+# Computes Philox4x32-10 random words for arrays of counters.
+# -----------------------------------------------------
+def philox4x32(counter, key):
+    """
+    Parameters:
+        counter (tuple): Four arrays (or integers) of 32-bit counter words.
+        key (tuple): Two 32-bit key words.
+
+    Returns:
+        tuple: Four uint64 arrays holding the 32-bit output words.
+    """
+    c0, c1, c2, c3 = (np.asarray(word, dtype=np.uint64) & MASK32 for word in counter)
+    k0, k1 = int(key[0]), int(key[1])
+    for _ in range(PHILOX_ROUNDS):
+        product0 = c0 * PHILOX_M0
+        product1 = c2 * PHILOX_M1
+        c0, c1, c2, c3 = ((product1 >> np.uint64(32)) ^ c1 ^ np.uint64(k0),
+                          product1 & MASK32,
+                          (product0 >> np.uint64(32)) ^ c3 ^ np.uint64(k1),
+                          product0 & MASK32)
+        k0 = (k0 + PHILOX_W0) & 0xFFFFFFFF
+        k1 = (k1 + PHILOX_W1) & 0xFFFFFFFF
+    return c0, c1, c2, c3
+
+# ---------------------------------
+# Define a class for the random streams of one run.
+# ---------------------------------
+class CounterStreams:
+    def __init__(self, seed, step=0):
+        """
+        Computes the random numbers of a run from its seed.
+
+        Parameters:
+            seed (int): The run seed.
+            step (int): The current time step. Draws made while setting up the
+                        population use step 0, and simulate_step_arrays moves
+                        this on before each step.
+        """
+        self.seed = seed
+        self.key = tuple(int(word) for word in np.random.SeedSequence(seed).generate_state(2, np.uint32))
+        self.step = step
+
+    def uniform(self, purpose, ids, others=0):
+        """
+        Computes one uniform number in [0, 1) for each individual in the current step.
+
+        Parameters:
+            purpose (int): What the numbers are for, such as MOVE_X.
+            ids (numpy.ndarray): The individuals the numbers belong to.
+            others (numpy.ndarray): Optional second individual of each number,
+                                    such as the infected side of a pair.
+
+        Returns:
+            numpy.ndarray: float64 numbers with 53 random bits each.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        words = philox4x32((ids, np.full(ids.shape, self.step), np.full(ids.shape, purpose),
+                            np.broadcast_to(np.asarray(others, dtype=np.int64), ids.shape)), self.key)
+        high = words[0] >> np.uint64(5)
+        low = words[1] >> np.uint64(6)
+        return (high * np.uint64(1 << 26) + low).astype(np.float64) / float(1 << 53)
+
+# -----------------------------------------------------
+# Function: make_streams
+# Creates the random streams a run's parameters ask for.
+# -----------------------------------------------------
+def make_streams(parameters):
+    """
+    Parameters:
+        parameters (dict): Simulation parameters, optionally with the key 'seed'.
+
+    Returns:
+        CounterStreams: Streams for parameters["seed"], or None when no seed is set.
+    """
+    seed = parameters.get("seed")
+    if seed is None:
+        return None
+    return CounterStreams(seed)
@@ -0,0 +1,224 @@
+"""
+Parameter Sweeps for the Disease Spread Simulation
+
+This module runs run_simulation over grids or Latin hypercube samples of any
+keys of the parameters dictionary. Runs are scheduled on a process pool and
+each (parameters, seed) result is stored in a content-addressed cache
+directory, so re-running or extending a sweep only computes the missing
+points. All results are gathered into one tidy DataFrame indexed by the swept
+parameters, the seed and the time step.
+"""
+
+# ---------------------------
+# Module Imports
+# ---------------------------
+import hashlib
+import itertools
+import json
+import os
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from simulation_program import STATES, PROCESS_ENGINES
+from simulation_ensemble import run_replicate
+
+# -----------------------------------------------------
+# Function: grid_points
+# Builds every combination of the given parameter values.
+# -----------------------------------------------------
+def grid_points(ranges):
+    """
+    Builds a full grid of parameter values.
+
+    Parameters:
+        ranges (dict): Maps parameter names to lists of values.
+
+    Returns:
+        list: One dictionary of swept values per grid point.
+    """
+    keys = list(ranges)
+    return [dict(zip(keys, values)) for values in itertools.product(*(ranges[key] for key in keys))]
+
+# -----------------------------------------------------
+# Function: latin_hypercube
+# Draws a Latin hypercube sample of parameter values.
+# -----------------------------------------------------
+def latin_hypercube(bounds, samples, seed=0):
+    """
+    Draws a Latin hypercube sample within the given bounds.
+
+    Each parameter's range is split into equal strata and every stratum is
+    used exactly once. Parameters whose bounds are both integers are rounded
+    to integers.
+
+    Parameters:
+        bounds (dict): Maps parameter names to (low, high) tuples.
+        samples (int): The number of points to draw.
+        seed (int): Seed for the sample.
+
+    Returns:
+        list: One dictionary of swept values per sample.
+    """
+    rng = np.random.default_rng(seed)
+    points = [{} for _ in range(samples)]
+    for key, (low, high) in bounds.items():
+        strata = (rng.permutation(samples) + rng.random(samples)) / samples
+        values = low + strata * (high - low)
+        if isinstance(low, int) and isinstance(high, int):
+            values = np.rint(values).astype(int)
+        for point, value in zip(points, values.tolist()):
+            point[key] = value
+    return points
+
+# -----------------------------------------------------
+# Function: cache_key
+# Hashes a run's parameters and seed into a cache file name.
+# -----------------------------------------------------
+def cache_key(parameters, seed, engine="python"):
+    """
+    Builds the content address of one simulation run.
+
+    Parameters:
+        parameters (dict): The full simulation parameters.
+        seed (int): The seed of the run.
+        engine (str): The run_simulation engine.
+
+    Returns:
+        str: A hexadecimal SHA-256 digest.
+    """
+    content = json.dumps({"parameters": parameters, "seed": seed, "engine": engine}, sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+# -----------------------------------------------------
+# Function: cache_path
+# Returns where a cached result is stored.
+# -----------------------------------------------------
+def cache_path(cache_dir, key):
+    """
+    Parameters:
+        cache_dir (str): The cache directory.
+        key (str): A key from cache_key.
+
+    Returns:
+        str: The path of the .npy file for the key.
+    """
+    return os.path.join(cache_dir, key[:2], key + ".npy")
+
+# -----------------------------------------------------
+# Function: load_cached
+# Reads a cached result if it exists.
+# -----------------------------------------------------
+def load_cached(cache_dir, key):
+    """
+    Parameters:
+        cache_dir (str): The cache directory, or None for no cache.
+        key (str): A key from cache_key.
+
+    Returns:
+        numpy.ndarray: The cached counts, or None if they are not cached.
+    """
+    if cache_dir is None:
+        return None
+    path = cache_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    return np.load(path)
+
+# -----------------------------------------------------
+# Function: save_cached
+# Writes a result to the cache.
+# -----------------------------------------------------
+def save_cached(cache_dir, key, counts):
+    """
+    Stores counts in the cache. The file is written under a temporary name and
+    renamed, so an interrupted sweep never leaves a partial cache entry.
+
+    Parameters:
+        cache_dir (str): The cache directory, or None for no cache.
+        key (str): A key from cache_key.
+        counts (numpy.ndarray): The counts to store.
+    """
+    if cache_dir is None:
+        return
+    path = cache_path(cache_dir, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as file:
+        np.save(file, counts)
+    os.replace(temporary_path, path)
+
+# -----------------------------------------------------
+# Function: run_sweep
+# Runs every sweep point and seed, reusing cached results.
+# -----------------------------------------------------
+def run_sweep(parameters, points, seeds=(0,), cache_dir=None, processes=None, engine="python"):
+    """
+    Runs the simulation for each sweep point and seed.
+
+    Parameters:
+        parameters (dict): Base simulation parameters.
+        points (list): Dictionaries of values that override the base parameters,
+                       for example from grid_points or latin_hypercube.
+        seeds (list): The random seeds to run at every point.
+        cache_dir (str): Optional directory for cached results.
+        processes (int): Number of worker processes. Defaults to all cores;
+                         1 runs everything in this process, as do the
+                         engines in PROCESS_ENGINES, which start their own.
+        engine (str): The run_simulation engine to use. With "ode", all points
+                      are solved together by the mean-field model.
+
+    Returns:
+        pandas.DataFrame: State counts indexed by the swept parameters,
+                          "seed" and "Time Step". It is empty when there
+                          are no points or no seeds.
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    swept_keys = sorted({key for point in points for key in point})
+
+    runs = []
+    keys = []
+    missing = []
+    for point in points:
+        for seed in seeds:
+            run_parameters = dict(parameters, **point)
+            key = cache_key(run_parameters, seed, engine)
+            counts = load_cached(cache_dir, key)
+            if counts is None:
+                missing.append((len(runs), run_parameters, engine, seed))
+            runs.append(((point, seed), counts))
+            keys.append(key)
+
+    # Only the points that are not cached are simulated
+    def store(task_results):
+        for number, counts in task_results:
+            save_cached(cache_dir, keys[number], counts)
+            runs[number] = (runs[number][0], counts)
+
+    if engine == "ode":
+        # The mean-field model is deterministic and solves every point in one batch
+        from simulation_ode import solve_mean_field
+        counts = solve_mean_field([run_parameters for _, run_parameters, _, _ in missing]) if missing else []
+        store((number, run_counts[:run_parameters["simulation_steps"] + 1])
+              for (number, run_parameters, _, _), run_counts in zip(missing, counts))
+    elif processes == 1 or len(missing) <= 1 or engine in PROCESS_ENGINES:
+        store(run_replicate(task) for task in missing)
+    else:
+        with Pool(min(processes, len(missing))) as pool:
+            store(pool.imap_unordered(run_replicate, missing))
+
+    frames = []
+    for (point, seed), counts in runs:
+        frame = pd.DataFrame(counts, columns=STATES)
+        for key in swept_keys:
+            frame[key] = point.get(key, parameters.get(key))
+        frame["seed"] = seed
+        frame["Time Step"] = np.arange(len(counts))
+        frames.append(frame)
+    if not frames:
+        # Without points or seeds there is nothing to run, but the columns and index stay the same
+        frames = [pd.DataFrame(columns=list(STATES) + swept_keys + ["seed", "Time Step"])]
+    df = pd.concat(frames, ignore_index=True)
+    return df.set_index(swept_keys + ["seed", "Time Step"])
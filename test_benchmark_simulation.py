@@ -0,0 +1,85 @@
+from benchmark_simulation import (
+    ENGINES,
+    UNMEASURED_ENGINES,
+    make_parameters,
+    run_benchmarks,
+    compare_to_baseline,
+    format_result,
+    save_results,
+    load_baseline,
+    main
+)
+from math import isclose
+import pytest
+
+
+def test_make_parameters():
+    """Verify that make_parameters sizes the grid for the requested density."""
+    parameters = make_parameters(1000, 0.1, 5)
+    density = parameters["population_size"] / parameters["grid_size"]**2
+    assert isclose(density, 0.1), f"Expected a density of 0.1 but got {density}"
+
+
+def test_run_benchmarks():
+    """Verify that run_benchmarks measures every case of a small ladder."""
+    ladder = {"population_sizes": [100, 200], "densities": [0.1], "step_counts": [2]}
+    results = run_benchmarks(ladder, engines=["python", "numpy"], repeats=1, log=None)
+    assert len(results) == 4, f"Expected 4 cases but got {len(results)}"
+    for result in results:
+        assert result["steps_per_second"] > 0, f"No speed measured in {result}"
+        assert result["peak_memory_bytes"] > 0, f"No memory measured in {result}"
+
+
+def test_run_benchmarks_every_engine():
+    """Verify that every registered engine can be benchmarked."""
+    ladder = {"population_sizes": [200], "densities": [0.1], "step_counts": [2]}
+    results = run_benchmarks(ladder, engines=list(ENGINES), repeats=1, log=None)
+    assert [result["engine"] for result in results] == list(ENGINES), "An engine was not benchmarked"
+    for result in results:
+        assert result["steps_per_second"] > 0, f"No speed measured in {result}"
+        assert (result["distance_evaluations_per_step"] is None) == (
+            ENGINES[result["engine"]][0] in UNMEASURED_ENGINES
+        ), f"Unexpected distance evaluations in {result}"
+        format_result(result)
+
+
+def test_compare_to_baseline():
+    """Verify that compare_to_baseline reports slower cases and ignores faster ones."""
+    baseline = [
+        {"engine": "numpy", "population_size": 100, "density": 0.1, "simulation_steps": 2,
+         "steps_per_second": 100.0, "peak_memory_bytes": 1000, "distance_evaluations_per_step": 50},
+        {"engine": "python", "population_size": 100, "density": 0.1, "simulation_steps": 2,
+         "steps_per_second": 100.0, "peak_memory_bytes": 1000, "distance_evaluations_per_step": 50}
+    ]
+    results = [
+        dict(baseline[0], steps_per_second=50.0),
+        dict(baseline[1], steps_per_second=150.0)
+    ]
+    regressions = compare_to_baseline(results, baseline)
+    assert len(regressions) == 1, f"Expected 1 regression but got {regressions}"
+    assert regressions[0]["case"][0] == "numpy", f"Unexpected regression {regressions[0]}"
+    assert regressions[0]["metric"] == "steps_per_second", f"Unexpected regression {regressions[0]}"
+    assert isclose(regressions[0]["ratio"], 0.5), f"Expected a ratio of 0.5 in {regressions[0]}"
+
+
+def test_main_saves_and_checks_a_baseline(tmp_path, capsys):
+    """Verify that a saved baseline is read back and that regressions give exit status 1."""
+    options = ["--quick", "--engines", "numpy", "--repeats", "1", "--output", str(tmp_path / "bench.json")]
+    baseline_path = str(tmp_path / "baseline.json")
+    assert main(options + ["--save-baseline", baseline_path]) == 0, "Saving a baseline failed"
+    baseline = load_baseline(baseline_path)
+    assert [result["engine"] for result in baseline] == ["numpy", "numpy"], f"Unexpected baseline {baseline}"
+    # A generous tolerance keeps timing noise from counting as a regression
+    assert main(options + ["--baseline", baseline_path, "--tolerance", "100"]) == 0, (
+        "A run within the tolerance was reported as a regression"
+    )
+    assert "No regressions" in capsys.readouterr().out, "The comparison was not reported"
+    faster = [dict(result, steps_per_second=result["steps_per_second"] * 1000) for result in baseline]
+    save_results(baseline_path, faster, {})
+    assert main(options + ["--baseline", baseline_path]) == 1, "A regression did not give exit status 1"
+    assert "REGRESSION" in capsys.readouterr().out, "The regression was not printed"
+
+
+# Call the main function that is part of pytest so that the
+# computer will execute the test functions in this file.
+pytest.main(["-v", "--tb=line", "-rN", __file__])
@@ -0,0 +1,72 @@
+from simulation_calibration import (
+    nelder_mead,
+    point_to_parameters,
+    curve_error,
+    calibrate
+)
+from simulation_program import run_simulation
+import numpy as np
+import pytest
+from conftest import make_parameters
+
+
+def test_nelder_mead():
+    """Verify that nelder_mead finds the minimum of a quadratic inside the unit cube."""
+    calls = []
+
+    def evaluate(points):
+        calls.append(len(points))
+        return [float(np.sum((point - [0.3, 0.7])**2)) for point in points]
+
+    best, value = nelder_mead(evaluate, [0.5, 0.5], max_evaluations=200, tolerance=1e-12)
+    assert np.allclose(best, [0.3, 0.7], atol=1e-3), f"Expected [0.3, 0.7] but got {best}"
+    assert calls[0] == 3, "The starting simplex should be evaluated as one batch"
+
+
+def test_point_to_parameters():
+    """Verify that point_to_parameters scales coordinates and rounds integer bounds."""
+    values = point_to_parameters([0.5, 0.26], {"p_transmission": (0.0, 0.4), "infection_distance": (1, 11)})
+    assert values == {"p_transmission": 0.2, "infection_distance": 4}, f"Unexpected values {values}"
+
+
+def test_curve_error():
+    """Verify that curve_error compares the replicate mean over the shared steps."""
+    runs = np.zeros((2, 3, 4))
+    runs[0, :, 1] = [1, 2, 3]
+    runs[1, :, 1] = [3, 4, 5]
+    assert curve_error(runs, np.array([2, 3])) == 0.0, "The replicate mean should match the target"
+    assert curve_error(runs, np.array([2, 3, 7]), "infected") == pytest.approx(3.0), "Unexpected error"
+
+
+def test_calibrate_recovers_parameters():
+    """Verify that calibrate fits the mean-field model back to its own curve and memoizes candidates."""
+    parameters = make_parameters(population_size=2000, grid_size=200, simulation_steps=40)
+    target = run_simulation(dict(parameters, p_transmission=0.2), engine="ode").to_array()[:, 1]
+    result = calibrate(parameters, target, {"p_transmission": (0.05, 0.5)}, replicates=1,
+                       processes=1, engine="ode", max_evaluations=40)
+    assert result["best_parameters"]["p_transmission"] == pytest.approx(0.2, abs=0.01), (
+        f"Expected p_transmission near 0.2 but got {result['best_parameters']['p_transmission']}"
+    )
+    history = result["history"]
+    assert list(history.columns) == ["p_transmission", "error", "seconds", "cached"], (
+        f"Unexpected history columns {list(history.columns)}"
+    )
+    assert result["evaluations"] == (~history["cached"]).sum(), "Memoized candidates were counted as runs"
+
+
+def test_calibrate_parallel_common_random_numbers():
+    """Verify that replicates run on a pool with shared seeds give the same errors as a serial run."""
+    parameters = make_parameters()
+    target = [10, 15, 22, 30, 35, 38, 36, 30, 25, 20, 15, 10, 8, 5, 3, 2]
+    bounds = {"p_transmission": (0.1, 0.5), "infection_distance": (2, 6)}
+    serial = calibrate(parameters, target, bounds, replicates=3, processes=1, max_evaluations=6)
+    parallel = calibrate(parameters, target, bounds, replicates=3, processes=2, max_evaluations=6)
+    assert serial["history"]["error"].tolist() == parallel["history"]["error"].tolist(), (
+        "The pool changed the replicate results"
+    )
+    assert (serial["history"]["seconds"][~serial["history"]["cached"]] > 0).all(), "Run times were not measured"
+
+
+# Call the main function that is part of pytest so that the
+# computer will execute the test functions in this file.
+pytest.main(["-v", "--tb=line", "-rN", __file__])
@@ -0,0 +1,127 @@
+from simulation_cli import (
+    load_scenarios,
+    prepare_scenarios,
+    run_batch,
+    throughput_summary,
+    main
+)
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_scenarios():
+    """Return a few small scenarios for the batch runner."""
+    return [
+        {"name": "small", "population_size": 60, "simulation_steps": 8},
+        {"population_size": 80, "p_transmission": 0.5, "simulation_steps": 8},
+        {"name": "arrays", "engine": "numpy", "population_size": 100, "simulation_steps": 8, "seed": 3}
+    ]
+
+
+def test_load_scenarios(tmp_path):
+    """Verify that scenarios are read from JSON objects, JSON lists and JSON lines."""
+    scenarios = make_scenarios()
+    json_lines = tmp_path / "scenarios.jsonl"
+    json_lines.write_text("\n".join(json.dumps(scenario) for scenario in scenarios) + "\n\n")
+    assert load_scenarios(str(json_lines)) == scenarios, "JSON lines were read incorrectly"
+    json_list = tmp_path / "scenarios.json"
+    json_list.write_text(json.dumps(scenarios))
+    assert load_scenarios(str(json_list)) == scenarios, "A JSON list was read incorrectly"
+    json_list.write_text(json.dumps(scenarios[0]))
+    assert load_scenarios(str(json_list)) == scenarios[:1], "A single JSON object was read incorrectly"
+
+
+def test_prepare_scenarios():
+    """Verify that scenarios get names, engines and default parameters."""
+    prepared = prepare_scenarios(make_scenarios(), engine="ode")
+    assert [name for name, _, _ in prepared] == ["small", "scenario-001", "arrays"], "Unexpected names"
+    assert [engine for _, engine, _ in prepared] == ["ode", "ode", "numpy"], "Unexpected engines"
+    assert prepared[1][2]["p_transmission"] == 0.5, "A scenario parameter was lost"
+    assert prepared[1][2]["grid_size"] == 100, "A default parameter was not filled in"
+    assert "name" not in prepared[0][2], "The name was left in the parameters"
+    with pytest.raises(ValueError):
+        prepare_scenarios([{"name": "same"}, {"name": "same"}])
+    for name in ("../outside", "/tmp/absolute", "nested/name", ".."):
+        with pytest.raises(ValueError):
+            prepare_scenarios([{"name": name}])
+
+
+def test_run_batch_is_independent_of_workers(tmp_path):
+    """Verify that a batch writes the same counts with one or several workers."""
+    serial, _ = run_batch(make_scenarios(), str(tmp_path / "serial"), "npy", processes=1, log=lambda line: None)
+    parallel, wall_time = run_batch(make_scenarios(), str(tmp_path / "parallel"), "npy", processes=2,
+                                    log=lambda line: None)
+    for first, second in zip(serial, parallel):
+        assert np.array_equal(np.load(first["path"]), np.load(second["path"])), (
+            f"Scenario {first['name']} differs between worker counts"
+        )
+    counts = np.load(parallel[2]["path"])
+    assert counts.shape == (9, 4), f"Unexpected counts shape {counts.shape}"
+    summary = throughput_summary(parallel, wall_time)
+    assert summary["scenarios"] == 3 and summary["steps"] == 24, f"Unexpected summary {summary}"
+    assert summary["individual_steps_per_second"] > 0, "The throughput was not measured"
+
+
+def test_failed_scenario_does_not_stop_the_batch(tmp_path):
+    """Verify that a failing scenario is reported in its summary while the others still run."""
+    scenarios = make_scenarios()
+    scenarios.insert(1, {"name": "broken", "engine": "warp", "simulation_steps": 8})
+    summaries, _ = run_batch(scenarios, str(tmp_path), "npy", processes=2, log=lambda line: None)
+    assert [summary["name"] for summary in summaries] == ["small", "broken", "scenario-002", "arrays"], (
+        "A scenario summary is missing"
+    )
+    assert "warp" in summaries[1]["error"] and summaries[1]["path"] is None, f"Unexpected summary {summaries[1]}"
+    for summary in summaries[:1] + summaries[2:]:
+        assert summary["error"] is None and os.path.exists(summary["path"]), f"{summary['name']} was not written"
+    assert throughput_summary(summaries, 1.0)["steps"] == 24, "The failed scenario was counted"
+    with pytest.raises(SystemExit):
+        main([str(tmp_path / "scenarios.json"), "--engine", "warp"])
+
+
+def test_main_writes_csv_and_plots(tmp_path, capsys):
+    """Verify the command line writes CSV files and charts and prints a throughput summary."""
+    scenario_file = tmp_path / "scenarios.jsonl"
+    scenario_file.write_text("\n".join(json.dumps(scenario) for scenario in make_scenarios()[:2]))
+    output_dir = tmp_path / "output"
+    assert main([str(scenario_file), "--output-dir", str(output_dir), "--workers", "1", "--plot"]) == 0, (
+        "A successful batch did not exit with status 0"
+    )
+    df = pd.read_csv(output_dir / "small.csv", index_col="Time Step")
+    assert list(df.columns) == ["susceptible", "infected", "recovered", "dead"], "Unexpected CSV columns"
+    assert len(df) == 9 and (df.sum(axis=1) == 60).all(), "The CSV counts are wrong"
+    assert (output_dir / "scenario-001.png").stat().st_size > 0, "No chart was saved"
+    assert "scenarios/s" in capsys.readouterr().out, "No throughput summary was printed"
+
+
+def test_main_exit_status_reports_failed_scenarios(tmp_path):
+    """Verify that the command exits with a non-zero status when a scenario fails."""
+    scenario_file = tmp_path / "scenarios.jsonl"
+    scenarios = [make_scenarios()[0], {"name": "broken", "engine": "warp", "simulation_steps": 8}]
+    scenario_file.write_text("\n".join(json.dumps(scenario) for scenario in scenarios))
+    completed = subprocess.run([sys.executable, "simulation_cli.py", str(scenario_file),
+                                "--output-dir", str(tmp_path / "output"), "--workers", "1"],
+                               capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert completed.returncode == 1, f"Expected exit status 1 but got {completed.returncode}"
+    assert "1 of 2 scenarios failed: broken" in completed.stdout, "The failed scenario was not reported"
+
+
+def test_main_does_not_import_gui_modules(tmp_path):
+    """Verify that a batch without plots never imports tkinter or pyplot."""
+    scenario_file = tmp_path / "scenario.json"
+    scenario_file.write_text(json.dumps(make_scenarios()[0]))
+    code = ("import sys, simulation_cli; "
+            f"simulation_cli.main([{str(scenario_file)!r}, '--output-dir', {str(tmp_path / 'output')!r}]); "
+            "print(sorted(name for name in ('tkinter', 'matplotlib.pyplot') if name in sys.modules))")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    assert output.splitlines()[-1] == "[]", f"GUI modules were imported: {output.splitlines()[-1]}"
+
+
+# Call the main function that is part of pytest so that the
+# computer will execute the test functions in this file.
+pytest.main(["-v", "--tb=line", "-rN", __file__])
@@ -0,0 +1,65 @@
+from simulation_distributed import (
+    plan_strips,
+    strip_of,
+    select_halo,
+    run_simulation_distributed
+)
+from simulation_numpy import INFECTED, PopulationArrays, make_rng, run_simulation_arrays
+from simulation_program import run_simulation
+import random
+import numpy as np
+import pytest
+from conftest import make_parameters
+
+
+def test_plan_strips():
+    """Verify that plan_strips never makes a strip narrower than a move plus an infection."""
+    assert plan_strips(make_parameters(), 4) == (4, 12.5), "Expected 4 strips of width 12.5"
+    strips, width = plan_strips(make_parameters(), 100)
+    assert strips == 5, f"Expected the strips to be limited to 5 but got {strips}"
+    assert width >= 9, f"Strip width {width} is narrower than movement_rate + infection_distance"
+    assert strip_of(np.array([0.0, 14.9, 15.0, 60.0]), 15.0, 4).tolist() == [0, 0, 1, 3], (
+        "strip_of put a coordinate in the wrong strip"
+    )
+
+
+def test_select_halo():
+    """Verify that select_halo only returns infected individuals near the strip."""
+    population = PopulationArrays(np.array([1.0, 8.0, 13.0, 13.0, 30.0]), np.zeros(5),
+                                  np.array([INFECTED, INFECTED, 0, INFECTED, INFECTED], dtype=np.int8),
+                                  np.zeros(5, dtype=np.int32))
+    halo_x = select_halo(population, 15.0, 30.0, 4).x
+    assert halo_x.tolist() == [13.0, 30.0], f"Unexpected halo {halo_x.tolist()}"
+    halo_x = select_halo(population, 15.0, 30.0, 4, exclude=population.x == 30.0).x
+    assert halo_x.tolist() == [13.0], f"Excluded individuals were in the halo {halo_x.tolist()}"
+
+
+def test_distributed_matches_single_process():
+    """Verify that infections cross strip boundaries exactly as in the array engine."""
+    # Without movement, transmission or death chances the run is deterministic
+    parameters = make_parameters(movement_rate=0, p_transmission=1.0, p_death=0.0,
+                                 population_size=600, initial_infected=3, simulation_steps=8,
+                                 stop_when_extinct=False)
+    expected = run_simulation_arrays(parameters, rng=make_rng(5))
+    results = run_simulation_distributed(parameters, workers=4, rng=make_rng(5))
+    assert results == expected, "The distributed run differs from the single-process run"
+
+
+def test_distributed_run_simulation():
+    """Verify that the distributed engine conserves the population across strips."""
+    random.seed(3)
+    parameters = make_parameters(workers=3, stop_when_extinct=False)
+    results = run_simulation(parameters, engine="distributed")
+    assert len(results) == parameters["simulation_steps"] + 1, (
+        f"Expected {parameters['simulation_steps'] + 1} records but got {len(results)}"
+    )
+    for counts in results:
+        assert sum(counts.values()) == parameters["population_size"], f"Individuals were lost: {counts}"
+    assert results[-1]["recovered"] + results[-1]["dead"] > 0, "Nobody recovered or died"
+    with pytest.raises(ValueError):
+        run_simulation(dict(parameters, scheduled_recovery=True), engine="distributed")
+
+
+# Call the main function that is part of pytest so that the
+# computer will execute the test functions in this file.
+pytest.main(["-v", "--tb=line", "-rN", __file__])
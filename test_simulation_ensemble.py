@@ -0,0 +1,111 @@
+from simulation_ensemble import (
+    STATES,
+    results_to_array,
+    replicate_seeds,
+    run_replicates,
+    summarize_runs,
+    run_ensemble
+)
+from simulation_program import run_simulation
+import random
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import make_parameters
+
+
+def test_results_to_array():
+    """Verify that results_to_array keeps one row per step in STATES column order."""
+    simulation_results = [
+        {"susceptible": 95, "infected": 5, "recovered": 0, "dead": 0},
+        {"dead": 1, "recovered": 3, "infected": 6, "susceptible": 90}
+    ]
+    counts = results_to_array(simulation_results)
+    expected = np.array([[95, 5, 0, 0], [90, 6, 3, 1]])
+    assert np.array_equal(counts, expected), f"Expected {expected} but got {counts}"
+    assert counts.dtype == np.int64, f"Whole counts became {counts.dtype}"
+    counts = results_to_array([{"susceptible": 94.5, "infected": 5.25, "recovered": 0.25, "dead": 0.0}])
+    assert counts.dtype == np.float64 and counts[0, 1] == 5.25, "Expected counts were truncated"
+
+
+def test_replicate_seeds():
+    """Verify that replicate seeds are distinct and repeatable."""
+    seeds = replicate_seeds(3, 10)
+    assert len(set(seeds)) == 10, f"Expected 10 distinct seeds but got {seeds}"
+    assert seeds == replicate_seeds(3, 10), "The same ensemble seed gave different seeds"
+
+
+def test_run_replicates_is_independent_of_processes():
+    """Verify that the pool gives the same replicates as running them in one process."""
+    parameters = make_parameters()
+    serial = run_replicates(parameters, 4, seed=1, processes=1)
+    parallel = run_replicates(parameters, 4, seed=1, processes=2)
+    assert serial.shape == (4, parameters["simulation_steps"] + 1, len(STATES)), (
+        f"Unexpected shape {serial.shape}"
+    )
+    assert np.array_equal(serial, parallel), "The process pool changed the replicates"
+
+
+def test_run_replicates_leaves_the_random_state_alone():
+    """Verify that replicates run in this process do not reseed the caller's random numbers."""
+    random.seed(8)
+    expected = random.random()
+    random.seed(8)
+    run_replicates(make_parameters(), 2, seed=1, processes=1)
+    assert random.random() == expected, "The replicates changed the global random state"
+
+
+def test_run_replicates_needs_a_replicate():
+    """Verify that an ensemble without replicates is refused."""
+    for replicates in (0, -1):
+        with pytest.raises(ValueError):
+            run_replicates(make_parameters(), replicates, processes=1)
+
+
+def test_run_replicates_with_process_engines():
+    """Verify that engines with worker processes of their own are not run inside the pool."""
+    parameters = make_parameters(workers=2, seed=4)
+    serial = run_replicates(parameters, 2, seed=1, processes=1, engine="numpy")
+    for engine in ("shared", "distributed"):
+        runs = run_replicates(parameters, 2, seed=1, processes=2, engine=engine)
+        assert np.array_equal(runs, serial), f"The {engine} engine differs from the numpy engine"
+
+
+def test_run_replicates_keeps_expected_counts():
+    """Verify that the mean-field model's float counts are not truncated."""
+    runs = run_replicates(make_parameters(), 2, processes=1, engine="ode")
+    expected = run_simulation(make_parameters(), engine="ode").to_array()
+    assert runs.dtype == np.float64, f"Expected float64 counts but got {runs.dtype}"
+    assert np.array_equal(runs[0], expected) and np.array_equal(runs[1], expected), "The counts were changed"
+
+
+def test_summarize_runs():
+    """Verify that summarize_runs reports the mean and percentile columns."""
+    runs = np.array([
+        [[10, 0, 0, 0], [8, 2, 0, 0]],
+        [[10, 0, 0, 0], [6, 4, 0, 0]]
+    ])
+    df = summarize_runs(runs, percentiles=(0, 100))
+    assert isinstance(df, pd.DataFrame), f"Expected a DataFrame but got {type(df)}"
+    assert df.index.name == "Time Step", f"Unexpected index name {df.index.name}"
+    assert df.loc[1, "susceptible"] == 7, f"Expected a mean of 7 but got {df.loc[1, 'susceptible']}"
+    assert df.loc[1, "infected_p0"] == 2, f"Expected a minimum of 2 but got {df.loc[1, 'infected_p0']}"
+    assert df.loc[1, "infected_p100"] == 4, f"Expected a maximum of 4 but got {df.loc[1, 'infected_p100']}"
+
+
+def test_run_ensemble():
+    """Verify that run_ensemble returns one row per step with ordered percentile bands."""
+    parameters = make_parameters()
+    df = run_ensemble(parameters, 6, seed=2, processes=2)
+    assert df.shape[0] == parameters["simulation_steps"] + 1, (
+        f"Expected {parameters['simulation_steps'] + 1} rows but got {df.shape[0]}"
+    )
+    for state in STATES:
+        assert (df[f"{state}_p5"] <= df[f"{state}_p95"]).all(), (
+            f"The 5th percentile of {state} is above the 95th"
+        )
+
+
+# Call the main function that is part of pytest so that the
+# computer will execute the test functions in this file.
+pytest.main(["-v", "--tb=line", "-rN", __file__])
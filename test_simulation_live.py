@@ -0,0 +1,77 @@
+from simulation_live import (
+    LiveView,
+    frame_from_individuals,
+    watch_simulation
+)
+from simulation_numpy import INFECTED, DEAD, make_rng
+from simulation_program import Individual, run_simulation
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import numpy as np
+import pytest
+from conftest import make_parameters
+
+
+def make_view(**options):
+    """Return a LiveView drawing on an off-screen figure."""
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    return LiveView(100, figure=figure, **options)
+
+
+def test_frame_from_individuals():
+    """Verify that frame_from_individuals converts state names to state codes."""
+    population = [Individual(1, 2), Individual(3, 4, "infected"), Individual(5, 6, "dead")]
+    x, y, state = frame_from_individuals(population)
+    assert x.tolist() == [1, 3, 5] and y.tolist() == [2, 4, 6], "Positions were not copied"
+    assert state.tolist() == [0, INFECTED, DEAD], f"Unexpected state codes {state.tolist()}"
+
+
+def test_live_view_markers():
+    """Verify that small populations are drawn as one marker artist per state."""
+    view = make_view()
+    x = np.array([10.0, 20.0, 30.0])
+    view.draw_frame(0, x, x, np.array([0, INFECTED, INFECTED], dtype=np.int8))
+    view.draw_frame(1, x + 1, x, np.array([0, INFECTED, DEAD], dtype=np.int8))
+    assert view.raster is None, "A small population should not use the density raster"
+    assert view.frames == 2, f"Expected 2 frames but got {view.frames}"
+    infected_x, _ = view.artists[INFECTED].get_data()
+    assert list(infected_x) == [21.0], f"Unexpected infected markers {list(infected_x)}"
+    assert "dead: 1" in view.label.get_text(), f"Unexpected label {view.label.get_text()}"
+
+
+def test_live_view_density_raster():
+    """Verify that large populations are binned into a density image."""
+    view = make_view(density_threshold=10, raster_bins=10)
+    x = np.full(20, 5.0)
+    y = np.concatenate([np.full(10, 5.0), np.full(10, 95.0)])
+    state = np.full(20, INFECTED, dtype=np.int8)
+    view.draw_frame(0, x, y, state)
+    image = view.raster.get_array()
+    assert image.shape == (10, 10, 4), f"Unexpected raster shape {image.shape}"
+    assert np.allclose(image[0, 0], [*view.density_image(x, y, state)[0, 0]]), "The raster was not updated"
+    assert image[0, 0, 3] == 1 and image[9, 0, 3] == 1, "Occupied cells should be opaque"
+    assert image[5, 5, 3] == 0, "Empty cells should be transparent"
+
+
+def test_watch_simulation():
+    """Verify that watch_simulation draws a frame for every step."""
+    parameters = make_parameters(simulation_steps=5)
+    view = make_view()
+    results = watch_simulation(parameters, rng=make_rng(1), view=view)
+    assert len(results) == 6, f"Expected 6 records but got {len(results)}"
+    assert view.frames == 6, f"Expected 6 frames but got {view.frames}"
+
+
+def test_watch_simulation_is_seeded():
+    """Verify that a seeded live run shows the same counts as a seeded run_simulation."""
+    for changes in ({}, {"scheduled_recovery": True}):
+        parameters = make_parameters(seed=12, **changes)
+        results = watch_simulation(parameters, view=make_view())
+        expected = run_simulation(parameters, engine="numpy")
+        assert expected == results, f"The live run differs from run_simulation with {changes}"
+
+
+# Call the main function that is part of pytest so that the
+# computer will execute the test functions in this file.
+pytest.main(["-v", "--tb=line", "-rN", __file__])
@@ -0,0 +1,84 @@
+from simulation_memmap import (
+    BYTES_PER_INDIVIDUAL,
+    TILES_IN_MEMORY,
+    MemmapPopulation,
+    plan_tiles,
+    run_simulation_memmap
+)
+from simulation_numpy import PopulationArrays, make_rng, run_simulation_arrays
+from simulation_program import StepStats, run_simulation
+import os
+import random
+import numpy as np
+import pytest
+from conftest import make_parameters
+
+
+# Room for 50 individuals per tile, so the runs are split into several bands
+MEMORY_BUDGET = 50 * BYTES_PER_INDIVIDUAL * TILES_IN_MEMORY
+
+
+def test_memmap_population(tmp_path):
+    """Verify that MemmapPopulation stores individuals and counts the bytes moved."""
+    population = MemmapPopulation(str(tmp_path), "test", 5)
+    individuals = PopulationArrays(np.arange(3.0), np.arange(3.0) + 10, np.array([0, 1, 3], dtype=np.int8),
+                                   np.array([0, 2, 0], dtype=np.int32), np.array([7, 8, 9]))
+    population.write(2, individuals)
+    assert population.bytes_written == 3 * BYTES_PER_INDIVIDUAL, "Written bytes were miscounted"
+    read = population.read(2, 5)
+    assert read.y.tolist() == [10.0, 11.0, 12.0], f"Unexpected y-coordinates {read.y.tolist()}"
+    assert read.ids.tolist() == [7, 8, 9], f"Unexpected ids {read.ids.tolist()}"
+    assert population.read(3, 5, ("x",)).state is None, "A field that was not asked for was read"
+    assert population.bytes_read == 3 * BYTES_PER_INDIVIDUAL + 2 * 8, "Read bytes were miscounted"
+    population.close()
+    assert os.path.getsize(tmp_path / "test.x.dat") == 5 * 8, "The x file has the wrong size"
+
+
+def test_plan_tiles():
+    """Verify that the memory budget sets the tile size and the number of bands."""
+    tile_size, bands, width = plan_tiles(make_parameters(population_size=400, grid_size=60,
+                                                         memory_budget=MEMORY_BUDGET))
+    assert tile_size == 50, f"Expected tiles of 50 individuals but got {tile_size}"
+    assert (bands, width) == (6, 10.0), f"Expected 6 bands of width 10 but got {bands} of {width}"
+    assert plan_tiles(make_parameters(memory_budget=None))[1] == 1, "A small population needs one band"
+
+
+def test_seeded_memmap_matches_numpy():
+    """Verify that a seeded out-of-core run is bit-identical to the array engine."""
+    for aggregate_draws in (False, True):
+        parameters = make_parameters(seed=11, aggregate_draws=aggregate_draws, memory_budget=MEMORY_BUDGET)
+        expected = run_simulation_arrays(parameters, rng=make_rng(0))
+        stats = StepStats()
+        results = run_simulation_memmap(parameters, stats=stats)
+        assert results == expected, "The memmap run differs from the array engine"
+        for record in stats.records:
+            size = parameters["population_size"] * BYTES_PER_INDIVIDUAL
+            assert record["bytes_read"] == size, f"Unexpected bytes read {record}"
+            assert record["bytes_written"] == size, f"Unexpected bytes written {record}"
+
+
+def test_memmap_run_simulation(tmp_path):
+    """Verify the memmap engine through run_simulation and that its files are removed."""
+    random.seed(4)
+    parameters = make_parameters(storage_dir=str(tmp_path), stop_when_extinct=False,
+                                 memory_budget=MEMORY_BUDGET)
+    stats = StepStats()
+    results = run_simulation(parameters, engine="memmap", stats=stats)
+    assert len(results) == parameters["simulation_steps"] + 1, (
+        f"Expected {parameters['simulation_steps'] + 1} records but got {len(results)}"
+    )
+    for counts in results:
+        assert sum(counts.values()) == parameters["population_size"], f"Individuals were lost: {counts}"
+    assert results[-1]["recovered"] + results[-1]["dead"] > 0, "Nobody recovered or died"
+    assert "bytes_read" in stats.to_dataframe().columns, "The bytes read were not recorded"
+    assert list(tmp_path.iterdir()) == [], "The memmap files were left behind"
+    with pytest.raises(ValueError):
+        run_simulation(parameters, engine="memmap", checkpoint_path=str(tmp_path / "checkpoint.pkl"),
+                       checkpoint_every=1)
+    with pytest.raises(ValueError):
+        run_simulation(dict(parameters, scheduled_recovery=True), engine="memmap")
+
+
+# Call the main function that is part of pytest so that the
+# computer will execute the test functions in this file.
+pytest.main(["-v", "--tb=line", "-rN", __file__])
@@ -0,0 +1,173 @@
+from simulation_numpy import (
+    STATES,
+    INFECTED,
+    DEAD,
+    PopulationArrays,
+    make_rng,
+    create_population_arrays,
+    move_population,
+    find_infection_pairs,
+    spread_infection,
+    update_infected,
+    count_states_arrays
+)
+from simulation_program import run_simulation, resume_simulation, StepStats
+import random
+import math
+import numpy as np
+import pytest
+from conftest import make_parameters
+
+
+def test_create_population_arrays():
+    """Verify that create_population_arrays creates the right number of individuals and infections."""
+    parameters = make_parameters()
+    population = create_population_arrays(parameters, make_rng(1))
+    assert len(population) == parameters["population_size"], (
+        f"Expected {parameters['population_size']} individuals but got {len(population)}"
+    )
+    infected_count = int(np.sum(population.state == INFECTED))
+    assert infected_count == parameters["initial_infected"], (
+        f"Expected {parameters['initial_infected']} infected individuals but got {infected_count}"
+    )
+
+
+def test_move_population():
+    """Verify that move_population keeps everyone on the grid and does not move the dead."""
+    parameters = make_parameters(grid_size=10, movement_rate=20)
+    population = create_population_arrays(parameters, make_rng(2))
+    population.state[0] = DEAD
+    dead_position = (population.x[0], population.y[0])
+    move_population(population, parameters, make_rng(3))
+    assert np.all((population.x >= 0) & (population.x <= 10)), "x coordinate out of bounds"
+    assert np.all((population.y >= 0) & (population.y <= 10)), "y coordinate out of bounds"
+    assert (population.x[0], population.y[0]) == dead_position, "A dead individual moved"
+
+
+def test_find_infection_pairs():
+    """Verify that find_infection_pairs finds exactly the pairs a full scan finds."""
+    parameters = make_parameters(population_size=400, initial_infected=40)
+    population = create_population_arrays(parameters, make_rng(4))
+    pair_susceptible, pair_infected = find_infection_pairs(population, parameters)
+    found = set(zip(pair_susceptible.tolist(), pair_infected.tolist()))
+    expected = set()
+    for i in np.flatnonzero(population.state == 0):
+        for j in np.flatnonzero(population.state == INFECTED):
+            distance = math.sqrt((population.x[i] - population.x[j])**2
+                                 + (population.y[i] - population.y[j])**2)
+            if distance <= parameters["infection_distance"]:
+                expected.add((int(i), int(j)))
+    assert found == expected, (
+        f"Expected {len(expected)} pairs but found {len(found)}"
+    )
+
+
+def test_spread_infection_aggregate_draws():
+    """Verify that aggregate_draws uses one random draw per exposed susceptible."""
+    parameters = make_parameters(population_size=500, initial_infected=100, aggregate_draws=True)
+    population = create_population_arrays(parameters, make_rng(6))
+    pair_susceptible, pair_infected = find_infection_pairs(population, parameters)
+    exposed = len(np.unique(pair_susceptible))
+    rng = make_rng(7)
+    spread_infection(population, parameters, rng)
+    # The next draw from a copy of the generator tells how many values were used
+    reference = make_rng(7)
+    reference.random(exposed)
+    assert rng.random() == reference.random(), (
+        f"Expected exactly {exposed} draws for {len(pair_susceptible)} exposures"
+    )
+
+
+def test_update_infected():
+    """Verify that update_infected resolves infections after infection_duration steps."""
+    parameters = make_parameters(infection_duration=2, p_death=0.0)
+    population = PopulationArrays(
+        np.zeros(3), np.zeros(3),
+        np.array([INFECTED, INFECTED, 0], dtype=np.int8),
+        np.array([1, 0, 0], dtype=np.int32)
+    )
+    update_infected(population, parameters, make_rng(5))
+    counts = count_states_arrays(population)
+    expected_counts = {"susceptible": 1, "infected": 1, "recovered": 1, "dead": 0}
+    assert counts == expected_counts, (
+        f"Expected counts {expected_counts} but got {counts}"
+    )
+
+
+def test_run_simulation_numpy_engine():
+    """Verify that run_simulation with engine="numpy" returns one record per step and keeps the total."""
+    parameters = make_parameters()
+    random.seed(42)
+    results = run_simulation(parameters, engine="numpy")
+    random.seed(42)
+    repeated = run_simulation(parameters, engine="numpy")
+    assert len(results) == parameters["simulation_steps"] + 1, (
+        f"Expected {parameters['simulation_steps'] + 1} records but got {len(results)}"
+    )
+    for record in results:
+        assert sum(record[key] for key in STATES) == parameters["population_size"], (
+            f"Record {record} does not add up to the population size"
+        )
+    assert results == repeated, "The same seed gave different results"
+
+
+def test_run_simulation_numpy_scheduled_recovery():
+    """Verify that the array engine gives the same results with and without scheduled_recovery."""
+    parameters = make_parameters(simulation_steps=25)
+    random.seed(12)
+    expected = run_simulation(parameters, engine="numpy")
+    random.seed(12)
+    results = run_simulation(dict(parameters, scheduled_recovery=True), engine="numpy")
+    assert results == expected, "scheduled_recovery changed the simulation results"
+
+
+def test_run_simulation_numpy_step_stats():
+    """Verify that StepStats counts transitions and draws for the array engine."""
+    parameters = make_parameters(stop_when_extinct=False)
+    random.seed(14)
+    expected = run_simulation(parameters, engine="numpy")
+    stats = StepStats()
+    random.seed(14)
+    results = run_simulation(parameters, engine="numpy", stats=stats)
+    assert results == expected, "Collecting statistics changed the simulation results"
+    df = stats.to_dataframe(results)
+    assert (df["new_infections"].iloc[1:] == -df["susceptible"].diff().iloc[1:]).all(), (
+        "new_infections does not match the drop in susceptible individuals"
+    )
+    assert (df["random_draws"].iloc[1:] >= 2 * (df["susceptible"] + df["infected"]).iloc[1:]).all(), (
+        "random_draws is smaller than the draws needed for movement"
+    )
+
+
+def test_resume_simulation_numpy(tmp_path):
+    """Verify that an array run resumed from a checkpoint matches the uninterrupted run."""
+    parameters = make_parameters(simulation_steps=12, scheduled_recovery=True)
+    checkpoint_path = str(tmp_path / "run.ckpt")
+    random.seed(13)
+    expected = run_simulation(parameters, engine="numpy",
+                              checkpoint_path=checkpoint_path, checkpoint_every=5)
+    results = resume_simulation(checkpoint_path)
+    assert results == expected, "The resumed run differs from the uninterrupted run"
+
+
+def test_resume_simulation_numpy_stops_at_convergence(tmp_path):
+    """Verify that a resumed array run stops at the same steady state as the uninterrupted run."""
+    parameters = make_parameters(simulation_steps=40, p_transmission=0.05, infection_duration=6,
+                                 stop_when_extinct=False, convergence_window=3, seed=1)
+    checkpoint_path = str(tmp_path / "run.ckpt")
+    expected = run_simulation(parameters, engine="numpy",
+                              checkpoint_path=checkpoint_path, checkpoint_every=5)
+    assert expected[-1]["infected"] > 0, "The run went extinct instead of converging"
+    results = resume_simulation(checkpoint_path)
+    assert results == expected, "The resumed run did not stop at the same steady state"
+
+
+def test_run_simulation_unknown_engine():
+    """Verify that run_simulation rejects an unknown engine."""
+    with pytest.raises(ValueError):
+        run_simulation(make_parameters(), engine="fortran")
+
+
+# Call the main function that is part of pytest so that the
+# computer will execute the test functions in this file.
+pytest.main(["-v", "--tb=line", "-rN", __file__])
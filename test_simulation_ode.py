@@ -0,0 +1,71 @@
+from simulation_ode import (
+    contact_area,
+    solve_mean_field,
+    mean_field_results
+)
+from simulation_program import run_simulation, process_results
+from simulation_sweep import grid_points, run_sweep
+import math
+import numpy as np
+import pytest
+from conftest import make_parameters
+
+
+# The mean-field model is closest to the agent-based one in a large population.
+LARGE_POPULATION = {
+    "population_size": 2000,
+    "initial_infected": 20,
+    "grid_size": 200,
+    "infection_distance": 5,
+    "infection_duration": 10,
+    "simulation_steps": 30
+}
+
+
+def test_contact_area():
+    """Verify that contact_area removes the part of the circle outside the grid."""
+    area = contact_area(np.array([1.0]), np.array([1000.0]))[0]
+    assert math.pi * 0.99 < area < math.pi, f"A small circle should be almost fully inside, got {area}"
+    area = contact_area(np.array([500.0]), np.array([10.0]))[0]
+    assert 90 < area <= 100, f"A circle larger than the grid should cover about all of it, got {area}"
+
+
+def test_solve_mean_field():
+    """Verify that the mean-field model conserves the population and ends infections on time."""
+    parameters = make_parameters(**LARGE_POPULATION)
+    counts = solve_mean_field([parameters])[0]
+    assert counts.shape == (31, 4), f"Unexpected shape {counts.shape}"
+    assert np.allclose(counts.sum(axis=1), parameters["population_size"]), "The population was not conserved"
+    # The first step matches the expected new infections of the agent-based model
+    contacts = 20 * contact_area(np.array([5.0]), np.array([200.0]))[0] / 200**2
+    expected = 1980 * (1 - math.exp(-0.3 * contacts))
+    assert counts[1, 1] == pytest.approx(20 + expected), f"Unexpected infections {counts[1, 1]}"
+    # Without transmission, the initial infections end after infection_duration steps
+    quiet = solve_mean_field([make_parameters(**LARGE_POPULATION, p_transmission=0.0)])[0]
+    assert quiet[9, 1] == 20 and quiet[10, 1] == 0, "Infections did not last infection_duration steps"
+    assert quiet[10, 3] == pytest.approx(2.0), f"Expected 2 deaths but got {quiet[10, 3]}"
+
+
+def test_mean_field_batch():
+    """Verify that a batch gives the same results as solving each parameter set alone."""
+    parameter_sets = [make_parameters(), make_parameters(p_transmission=0.1, infection_duration=4,
+                                                         simulation_steps=12)]
+    frames = mean_field_results(parameter_sets)
+    for parameters, frame in zip(parameter_sets, frames):
+        alone = process_results(run_simulation(parameters, engine="ode"))
+        assert frame.shape == (parameters["simulation_steps"] + 1, 4), f"Unexpected shape {frame.shape}"
+        assert np.allclose(frame.to_numpy(), alone.to_numpy()), "The batch differs from a single solve"
+
+
+def test_run_sweep_ode(tmp_path):
+    """Verify that run_sweep solves the mean-field model for every point."""
+    points = grid_points({"p_transmission": [0.1, 0.2, 0.3]})
+    df = run_sweep(make_parameters(**LARGE_POPULATION), points, cache_dir=str(tmp_path), engine="ode")
+    assert df.shape == (3 * 31, 4), f"Unexpected shape {df.shape}"
+    final = df.xs(30, level="Time Step")["susceptible"].tolist()
+    assert final == sorted(final, reverse=True), "More transmission should leave fewer susceptible"
+
+
+# Call the main function that is part of pytest so that the
+# computer will execute the test functions in this file.
+pytest.main(["-v", "--tb=line", "-rN", __file__])
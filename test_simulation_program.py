@@ -1,16 +1,34 @@
 from simulation_program import (
     Individual,
+    RecoveryScheduler,
+    NeighbourList,
+    StepStats,
     create_population,
     move_individual,
     calculate_distance,
+    build_spatial_hash,
+    find_nearby_indices,
+    infection_probability,
+    simulate_step,
     count_states,
+    iter_simulation,
+    pad_steady_state,
     run_simulation,
-    process_results
+    resume_simulation,
+    load_checkpoint,
+    process_results,
+    ResultsBuffer,
+    TransmissionRecorder,
+    load_transmissions,
+    first_transmission,
+    downsample_indices,
+    visualize_data
 )
 from math import isclose
 from pytest import approx
 import random
 import math
+import numpy as np
 import pandas as pd
 import pytest
 
@@ -72,6 +90,106 @@ def test_calculate_distance():
     )
 
 
+def test_find_nearby_indices():
+    """Verify that the spatial hash returns every infected individual within one cell."""
+    population = [
+        Individual(1, 1, "infected"),
+        Individual(4, 4, "infected"),
+        Individual(9, 9, "infected"),
+        Individual(5, 5, "susceptible")
+    ]
+    spatial_hash = build_spatial_hash(population, 3)
+    # The susceptible is in cell (1, 1), so cells (0..2, 0..2) are searched.
+    candidates = find_nearby_indices(population[3], spatial_hash, 3)
+    assert candidates == [0, 1], (
+        f"Expected candidates [0, 1] but got {candidates}"
+    )
+
+
+def brute_force_step(population, parameters):
+    """Reference version of simulate_step that compares every pair of individuals."""
+    for individual in population:
+        move_individual(individual, parameters)
+    for individual in population:
+        if individual.state == "susceptible":
+            for other in population:
+                if other.state == "infected":
+                    if calculate_distance(individual, other) <= parameters["infection_distance"]:
+                        if random.random() < parameters["p_transmission"]:
+                            individual.state = "infected"
+                            individual.days_infected = 0
+                            break
+    for individual in population:
+        if individual.state == "infected":
+            individual.days_infected += 1
+            if individual.days_infected >= parameters["infection_duration"]:
+                if random.random() < parameters["p_death"]:
+                    individual.state = "dead"
+                else:
+                    individual.state = "recovered"
+    return population
+
+
+def test_simulate_step():
+    """Verify that simulate_step gives the same outcomes as a full pairwise scan for a fixed seed."""
+    parameters = {
+        "population_size": 300,
+        "initial_infected": 10,
+        "grid_size": 60,
+        "movement_rate": 3,
+        "infection_distance": 4,
+        "p_transmission": 0.4,
+        "infection_duration": 4,
+        "p_death": 0.1,
+        "simulation_steps": 15
+    }
+    random.seed(7)
+    population = create_population(parameters)
+    random.seed(7)
+    reference = create_population(parameters)
+    for step in range(parameters["simulation_steps"]):
+        random.seed(step)
+        simulate_step(population, parameters)
+        random.seed(step)
+        brute_force_step(reference, parameters)
+        states = [person.state for person in population]
+        expected = [person.state for person in reference]
+        assert states == expected, (
+            f"States differ from the full pairwise scan at step {step}"
+        )
+
+
+def test_infection_probability():
+    """Verify that infection_probability combines independent exposures."""
+    assert infection_probability(0, 0.3) == 0, "No exposures should give no chance of infection"
+    assert isclose(infection_probability(1, 0.3), 0.3), "One exposure should give p_transmission"
+    assert isclose(infection_probability(2, 0.5), 0.75), "Two exposures at 0.5 should give 0.75"
+
+
+def test_simulate_step_aggregate_draws():
+    """Verify that aggregate_draws infects exposed susceptibles and leaves unexposed ones alone."""
+    parameters = {
+        "movement_rate": 0,
+        "grid_size": 100,
+        "infection_distance": 2,
+        "p_transmission": 1.0,
+        "infection_duration": 10,
+        "p_death": 0.0,
+        "aggregate_draws": True
+    }
+    population = [
+        Individual(10, 10, "infected"),
+        Individual(11, 10, "infected"),
+        Individual(11, 11, "susceptible"),
+        Individual(50, 50, "susceptible")
+    ]
+    random.seed(3)
+    simulate_step(population, parameters)
+    states = [person.state for person in population]
+    expected = ["infected", "infected", "infected", "susceptible"]
+    assert states == expected, f"Expected states {expected} but got {states}"
+
+
 def test_count_states():
     """Verify that count_states correctly counts the state of a small, predefined population."""
     # Create a small population with known states.
@@ -116,6 +234,240 @@ def test_run_simulation():
             )
 
 
+def test_recovery_scheduler():
+    """Verify that RecoveryScheduler returns individuals in the step their infection ends."""
+    parameters = {"infection_duration": 3}
+    population = [Individual(0, 0, "infected"), Individual(0, 0, "susceptible"), Individual(0, 0, "infected")]
+    population[2].days_infected = 2
+    scheduler = RecoveryScheduler(population, parameters)
+    scheduler.schedule(1)
+    due = [scheduler.pop_due() for step in range(4)]
+    assert due == [[2], [], [0, 1], []], f"Expected [[2], [], [0, 1], []] but got {due}"
+
+
+def test_run_simulation_scheduled_recovery():
+    """Verify that scheduled_recovery gives the same results as scanning every individual."""
+    parameters = {
+        "population_size": 150,
+        "initial_infected": 10,
+        "grid_size": 40,
+        "movement_rate": 3,
+        "infection_distance": 4,
+        "p_transmission": 0.3,
+        "infection_duration": 4,
+        "p_death": 0.2,
+        "simulation_steps": 20
+    }
+    random.seed(11)
+    expected = run_simulation(parameters)
+    random.seed(11)
+    results = run_simulation(dict(parameters, scheduled_recovery=True))
+    assert results == expected, "scheduled_recovery changed the simulation results"
+
+
+def test_run_simulation_neighbour_list():
+    """Verify that Verlet neighbour lists give the same results and only rebuild when needed."""
+    parameters = {
+        "population_size": 200,
+        "initial_infected": 10,
+        "grid_size": 50,
+        "movement_rate": 1,
+        "infection_distance": 3,
+        "p_transmission": 0.3,
+        "infection_duration": 5,
+        "p_death": 0.1,
+        "simulation_steps": 20
+    }
+    random.seed(21)
+    expected = run_simulation(parameters)
+    neighbour_list = NeighbourList(parameters, skin=6)
+    random.seed(21)
+    results = run_simulation(parameters, neighbour_list=neighbour_list)
+    assert results == expected, "Neighbour lists changed the simulation results"
+    # The lists are rebuilt once someone has moved more than 3 since the last rebuild, which
+    # takes longer than the two steps the worst case of 2 * sqrt(2) per step would allow.
+    assert neighbour_list.rebuilds == 6, (
+        f"Expected 6 rebuilds in 20 steps but got {neighbour_list.rebuilds}"
+    )
+    assert isclose(neighbour_list.rebuild_rate(), 6 / 20), (
+        f"Expected a rebuild rate of 0.3 but got {neighbour_list.rebuild_rate()}"
+    )
+
+
+def test_iter_simulation():
+    """Verify that iter_simulation yields the same counts as run_simulation and can stop early."""
+    parameters = {
+        "population_size": 80,
+        "initial_infected": 5,
+        "grid_size": 40,
+        "movement_rate": 2,
+        "infection_distance": 4,
+        "p_transmission": 0.3,
+        "infection_duration": 4,
+        "p_death": 0.1,
+        "simulation_steps": 10
+    }
+    random.seed(8)
+    expected = run_simulation(parameters)
+    random.seed(8)
+    streamed = list(iter_simulation(parameters))
+    assert streamed == expected, "iter_simulation yielded different counts from run_simulation"
+
+    seen = []
+    def stop_after_three(step, counts):
+        seen.append(step)
+        return step == 3
+    random.seed(8)
+    results = run_simulation(parameters, callback=stop_after_three)
+    assert seen == [0, 1, 2, 3], f"Expected the callback for steps [0, 1, 2, 3] but got {seen}"
+    assert results == expected[:4], "Stopping early changed the counts of the steps that ran"
+
+
+def counts_generator(infected_series, consumed):
+    """Yield counts with the given infected numbers, recording how many were consumed."""
+    for infected in infected_series:
+        consumed.append(infected)
+        yield {"susceptible": 10 - infected, "infected": infected, "recovered": 0, "dead": 0}
+
+
+def test_pad_steady_state():
+    """Verify that pad_steady_state stops simulating once nobody is infected."""
+    parameters = {"simulation_steps": 6}
+    consumed = []
+    records = list(pad_steady_state(counts_generator([2, 1, 0, 0, 0, 0, 0], consumed), parameters))
+    assert len(records) == 7, f"Expected 7 records but got {len(records)}"
+    assert consumed == [2, 1, 0], f"Expected 3 simulated records but {len(consumed)} were simulated"
+    assert [record["infected"] for record in records] == [2, 1, 0, 0, 0, 0, 0], (
+        "Padded records do not repeat the final counts"
+    )
+
+    consumed = []
+    list(pad_steady_state(counts_generator([2, 1, 0, 0, 0, 0, 0], consumed),
+                          dict(parameters, stop_when_extinct=False)))
+    assert len(consumed) == 7, "stop_when_extinct=False should simulate every step"
+
+
+def test_pad_steady_state_convergence_window():
+    """Verify that a convergence window stops the run once the counts stop changing."""
+    parameters = {"simulation_steps": 7, "convergence_window": 2, "convergence_tolerance": 1}
+    consumed = []
+    records = list(pad_steady_state(counts_generator([5, 3, 3, 4, 3, 3, 3, 3], consumed), parameters))
+    assert len(records) == 8, f"Expected 8 records but got {len(records)}"
+    assert consumed == [5, 3, 3, 4], f"Expected to stop after 4 records but simulated {consumed}"
+
+
+def test_run_simulation_step_stats():
+    """Verify that StepStats records one row per step that agrees with the state counts."""
+    parameters = {
+        "population_size": 150,
+        "initial_infected": 10,
+        "grid_size": 40,
+        "movement_rate": 2,
+        "infection_distance": 4,
+        "p_transmission": 0.3,
+        "infection_duration": 3,
+        "p_death": 0.2,
+        "simulation_steps": 12,
+        "stop_when_extinct": False
+    }
+    random.seed(9)
+    expected = run_simulation(parameters)
+    stats = StepStats()
+    random.seed(9)
+    results = run_simulation(parameters, stats=stats)
+    assert results == expected, "Collecting statistics changed the simulation results"
+
+    df = stats.to_dataframe(results)
+    assert df.shape[0] == parameters["simulation_steps"] + 1, (
+        f"Expected {parameters['simulation_steps'] + 1} rows but got {df.shape[0]}"
+    )
+    steps = df.iloc[1:]
+    assert (steps["new_infections"] == -df["susceptible"].diff().iloc[1:]).all(), (
+        "new_infections does not match the drop in susceptible individuals"
+    )
+    assert (steps["deaths"] == df["dead"].diff().iloc[1:]).all(), (
+        "deaths does not match the rise in dead individuals"
+    )
+    summary = stats.summary()
+    assert summary["steps"] == parameters["simulation_steps"], f"Unexpected summary {summary}"
+    assert isclose(summary["movement_share"] + summary["infection_share"] + summary["update_share"], 1), (
+        f"Phase shares do not add up to 1 in {summary}"
+    )
+
+
+def test_resume_simulation(tmp_path):
+    """Verify that resuming from a checkpoint gives the same results as an uninterrupted run."""
+    parameters = {
+        "population_size": 120,
+        "initial_infected": 6,
+        "grid_size": 40,
+        "movement_rate": 2,
+        "infection_distance": 4,
+        "p_transmission": 0.3,
+        "infection_duration": 4,
+        "p_death": 0.2,
+        "simulation_steps": 12,
+        "scheduled_recovery": True,
+        "verlet_skin": 4
+    }
+    checkpoint_path = str(tmp_path / "run.ckpt")
+    random.seed(5)
+    expected = run_simulation(parameters, checkpoint_path=checkpoint_path, checkpoint_every=5)
+    # The last checkpoint was taken after step 10; throw away the random state since then.
+    random.seed(99)
+    results = resume_simulation(checkpoint_path)
+    assert results == expected, "The resumed run differs from the uninterrupted run"
+    assert not (tmp_path / "run.ckpt.tmp").exists(), "A temporary checkpoint file was left behind"
+
+
+def test_checkpoint_arguments_go_together(tmp_path):
+    """Verify that a checkpoint file without an interval, or an interval without a file, is refused."""
+    parameters = {
+        "population_size": 20,
+        "initial_infected": 2,
+        "grid_size": 20,
+        "movement_rate": 2,
+        "infection_distance": 3,
+        "p_transmission": 0.3,
+        "infection_duration": 4,
+        "p_death": 0.1,
+        "simulation_steps": 4
+    }
+    for engine in ("python", "numpy"):
+        with pytest.raises(ValueError):
+            run_simulation(parameters, engine, checkpoint_path=str(tmp_path / "run.ckpt"))
+        with pytest.raises(ValueError):
+            run_simulation(parameters, engine, checkpoint_every=2)
+        with pytest.raises(ValueError):
+            run_simulation(parameters, engine, checkpoint_path=str(tmp_path / "run.ckpt"), checkpoint_every=0)
+    assert not (tmp_path / "run.ckpt").exists(), "A refused run saved a checkpoint"
+
+
+def test_resume_simulation_stops_at_convergence(tmp_path):
+    """Verify that a resumed run stops at the same steady state as the uninterrupted run."""
+    parameters = {
+        "population_size": 200,
+        "initial_infected": 10,
+        "grid_size": 50,
+        "movement_rate": 5,
+        "infection_distance": 4,
+        "p_transmission": 0.05,
+        "infection_duration": 6,
+        "p_death": 0.1,
+        "simulation_steps": 40,
+        "stop_when_extinct": False,
+        "convergence_window": 3
+    }
+    checkpoint_path = str(tmp_path / "run.ckpt")
+    random.seed(1)
+    expected = run_simulation(parameters, checkpoint_path=checkpoint_path, checkpoint_every=5)
+    # The run converged after its last checkpoint and was padded from there
+    assert load_checkpoint(checkpoint_path)["step"] < 40, "The run never stopped early"
+    assert expected[-1]["infected"] > 0, "The run went extinct instead of converging"
+    results = resume_simulation(checkpoint_path)
+    assert results == expected, "The resumed run did not stop at the same steady state"
+
+
 def test_process_results():
     """Verify that process_results converts simulation results into a pandas DataFrame."""
     simulation_results = [
@@ -136,5 +488,141 @@ def test_process_results():
         assert col in df.columns, f"DataFrame is missing the column '{col}'"
 
 
+
+def test_results_buffer():
+    """Verify that ResultsBuffer behaves like a list of counts and grows when full."""
+    results = ResultsBuffer(1)
+    results.append({"susceptible": 9, "infected": 1, "recovered": 0, "dead": 0})
+    results.append([8, 1, 1, 0])
+    results.append([7, 1, 1, 1])
+    assert len(results) == 3, f"Expected 3 records but got {len(results)}"
+    assert results[-1] == {"susceptible": 7, "infected": 1, "recovered": 1, "dead": 1}, (
+        f"Unexpected last record {results[-1]}"
+    )
+    assert results[:1] == [{"susceptible": 9, "infected": 1, "recovered": 0, "dead": 0}], "Slicing failed"
+    assert results == list(results), "A ResultsBuffer should equal the list of its records"
+    df = process_results(results)
+    assert np.shares_memory(df["dead"].to_numpy(), results.counts), "process_results copied the counts"
+    assert df["dead"].tolist() == [0, 0, 1], f"Unexpected dead column {df['dead'].tolist()}"
+
+
+def test_run_simulation_incremental_counts():
+    """Verify that the counts kept from transitions match recounting the population."""
+    parameters = {
+        "population_size": 100,
+        "initial_infected": 10,
+        "grid_size": 30,
+        "movement_rate": 3,
+        "infection_distance": 3,
+        "p_transmission": 0.3,
+        "infection_duration": 3,
+        "p_death": 0.2,
+        "simulation_steps": 10,
+        "stop_when_extinct": False
+    }
+    random.seed(8)
+    population = create_population(parameters)
+    counts = [count_states(population)[state] for state in ("susceptible", "infected", "recovered", "dead")]
+    for step in range(parameters["simulation_steps"]):
+        simulate_step(population, parameters, counts=counts)
+        recounted = count_states(population)
+        assert counts == [recounted[state] for state in ("susceptible", "infected", "recovered", "dead")], (
+            f"Incremental counts {counts} differ from a recount {recounted} at step {step}"
+        )
+
+
+def test_run_simulation_transmission_recorder():
+    """Verify that recording transmissions keeps the results and records every infection."""
+    parameters = {
+        "population_size": 150,
+        "initial_infected": 5,
+        "grid_size": 40,
+        "movement_rate": 3,
+        "infection_distance": 4,
+        "p_transmission": 0.3,
+        "infection_duration": 4,
+        "p_death": 0.1,
+        "simulation_steps": 15
+    }
+    for aggregate_draws in (False, True):
+        run_parameters = dict(parameters, aggregate_draws=aggregate_draws)
+        random.seed(21)
+        expected = run_simulation(run_parameters)
+        random.seed(21)
+        recorder = TransmissionRecorder(parameters["population_size"])
+        results = run_simulation(run_parameters, recorder=recorder)
+        assert results == expected, "Recording transmissions changed the results"
+        infectee, infector, step = recorder.to_arrays()
+        assert list(infector[step == 0]) == [-1] * parameters["initial_infected"], (
+            "Initially infected individuals should have no infector"
+        )
+        infections = results[0]["susceptible"] - results[-1]["susceptible"]
+        assert len(recorder) == parameters["initial_infected"] + infections, (
+            f"Expected {parameters['initial_infected'] + infections} records but got {len(recorder)}"
+        )
+        assert len(set(infectee.tolist())) == len(infectee), "Someone was recorded as infected twice"
+        assert (recorder.generation_intervals() >= 0).all(), "An infector was infected after their infectee"
+
+
+def test_first_transmission():
+    """Verify that first_transmission inverts the draw of an aggregated infection."""
+    p_transmission = 0.3
+    assert first_transmission(0.0, 3, p_transmission) == 0, "The smallest draw should pick the first exposure"
+    assert first_transmission(0.3, 3, p_transmission) == 1, "A draw of p should pick the second exposure"
+    assert first_transmission(0.6569, 3, p_transmission) == 2, "A draw near 1 - (1 - p)**3 should pick the last"
+    assert first_transmission(0.5, 2, 1.0) == 0, "With certain transmission the first exposure transmits"
+
+
+def test_transmission_recorder_analysis(tmp_path):
+    """Verify R_t, generation intervals, chunked growth and saving to CSV and binary files."""
+    recorder = TransmissionRecorder()
+    recorder.record(0, -1)
+    recorder.step = 1
+    recorder.record(1, 0)
+    recorder.record(2, 0)
+    recorder.step = 3
+    recorder.record(3, 1)
+    assert list(recorder.generation_intervals()) == [1, 1, 2], (
+        f"Unexpected generation intervals {list(recorder.generation_intervals())}"
+    )
+    r_t = recorder.reproduction_numbers(3)
+    assert list(r_t[[0, 1, 3]]) == [2.0, 0.5, 0.0], f"Unexpected R_t {list(r_t)}"
+    assert math.isnan(r_t[2]), "R_t should be NaN in a step with no infections"
+    assert len(recorder.infectee) == TransmissionRecorder.CHUNK_SIZE, "The arrays did not grow by a chunk"
+
+    for name in ("tree.csv", "tree.npz"):
+        path = str(tmp_path / name)
+        recorder.save(path)
+        loaded = load_transmissions(path)
+        for saved, read in zip(recorder.to_arrays(), loaded.to_arrays()):
+            assert list(saved) == list(read), f"{name} did not round-trip"
+
+
+def test_downsample_indices():
+    """Verify that downsample_indices keeps the ends and the extremes of every bucket."""
+    values = np.zeros(10000)
+    values[1234] = 50
+    values[8765] = -50
+    keep = downsample_indices(values, 100)
+    assert len(keep) <= 202, f"Expected at most 202 points but got {len(keep)}"
+    for index in (0, 1234, 8765, 9999):
+        assert index in keep, f"Index {index} was dropped"
+    assert list(downsample_indices(np.arange(10), 100)) == list(range(10)), (
+        "A short series should not be downsampled"
+    )
+
+
+def test_visualize_data_png(tmp_path, monkeypatch):
+    """Verify that visualize_data can write a long run straight to a PNG file."""
+    monkeypatch.setattr("simulation_program.plt.show", lambda: pytest.fail("A window was opened"))
+    steps = 100000
+    df = process_results([{"susceptible": steps - step, "infected": step % 7, "recovered": step, "dead": 0}
+                          for step in range(steps)])
+    output_path = tmp_path / "chart.png"
+    visualize_data(df, output_path=str(output_path))
+    with open(output_path, "rb") as file:
+        assert file.read(8) == b"\x89PNG\r\n\x1a\n", "The output is not a PNG file"
+
+
 # Run the tests when this file is executed directly.
 pytest.main(["-v", "--tb=line", "-rN", __file__])
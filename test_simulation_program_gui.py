@@ -6,6 +6,7 @@ from simulation_program_gui import (
     simulate_step,
     count_states,
     run_simulation,
+    run_in_background,
     process_results,
     main
 )
@@ -14,6 +15,8 @@ from pytest import approx
 import random
 import math
 import pandas as pd
+import queue
+import threading
 import pytest
 
 # ---------------------------
@@ -151,6 +154,51 @@ def test_run_simulation():
         for key in ["susceptible", "infected", "recovered", "dead"]:
             assert key in record, f"Record {record} is missing key '{key}'"
 
+# ---------------------------
+# Test for run_in_background
+# ---------------------------
+def test_run_in_background():
+    """Verify that run_in_background reports every step and stops when cancelled."""
+    parameters = {
+        "population_size": 50,
+        "initial_infected": 5,
+        "grid_size": 100,
+        "movement_rate": 1,
+        "infection_distance": 2,
+        "p_transmission": 0.5,
+        "infection_duration": 5,
+        "p_death": 0.1,
+        "simulation_steps": 10
+    }
+    progress_queue = queue.Queue()
+    run_in_background(parameters, progress_queue, threading.Event())
+    messages = [progress_queue.get_nowait() for _ in range(progress_queue.qsize())]
+    steps = [message[1] for message in messages if message[0] == "step"]
+    assert steps == list(range(parameters["simulation_steps"] + 1)), (
+        f"Expected progress for every step but got {steps}"
+    )
+    assert messages[-1][0] == "done", f"Expected the run to finish but got {messages[-1][0]}"
+    assert len(messages[-1][1]) == parameters["simulation_steps"] + 1, "The results are incomplete"
+
+    # With send_frames, each step is preceded by the positions and states for a live view
+    progress_queue = queue.Queue()
+    run_in_background(parameters, progress_queue, threading.Event(), send_frames=True)
+    messages = [progress_queue.get_nowait() for _ in range(progress_queue.qsize())]
+    frames = [message for message in messages if message[0] == "frame"]
+    assert len(frames) == parameters["simulation_steps"] + 1, f"Expected a frame per step but got {len(frames)}"
+    x, y, state = frames[0][2]
+    assert len(x) == len(y) == len(state) == parameters["population_size"], "A frame is missing individuals"
+
+    # A cancelled run stops at the first step boundary
+    cancel_event = threading.Event()
+    cancel_event.set()
+    progress_queue = queue.Queue()
+    run_in_background(parameters, progress_queue, cancel_event)
+    messages = [progress_queue.get_nowait() for _ in range(progress_queue.qsize())]
+    assert messages[-1] == ("cancelled", [messages[0][2]]), (
+        f"Expected the run to be cancelled after the initial state but got {messages[-1]}"
+    )
+
 # ---------------------------
 # Test for process_results
 # ---------------------------
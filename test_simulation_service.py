@@ -0,0 +1,171 @@
+from simulation_service import SimulationService, job_key, make_server
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+import pytest
+from conftest import make_parameters
+
+
+@pytest.fixture
+def server():
+    """Start a service with two workers on a free localhost port."""
+    service = SimulationService(processes=2, max_queued=8)
+    http_server = make_server(service)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield http_server
+    http_server.shutdown()
+    http_server.server_close()
+    service.close()
+
+
+def request(server, path, body=None):
+    """Send a request to the test server and return its status and JSON body."""
+    host, port = server.server_address[:2]
+    data = None if body is None else json.dumps(body).encode("utf-8")
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}{path}", data=data, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, json.loads(error.read())
+
+
+def read_events(server, path):
+    """Read a server-sent event stream to its end and return the (name, data) events."""
+    host, port = server.server_address[:2]
+    events = []
+    with urllib.request.urlopen(f"http://{host}:{port}{path}", timeout=30) as response:
+        assert response.headers["Content-Type"] == "text/event-stream", "The stream has the wrong type"
+        name = None
+        for line in response:
+            line = line.decode("utf-8").rstrip("\n")
+            if line.startswith("event: "):
+                name = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((name, json.loads(line[len("data: "):])))
+    return events
+
+
+def wait_for(condition, timeout=30):
+    """Wait until condition() is true, and fail the test if it takes longer than timeout seconds."""
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "Timed out waiting for the service"
+        time.sleep(0.01)
+
+
+def test_job_key():
+    """Verify that job keys only match identical requests."""
+    key = job_key(make_parameters(), 2, "python", 0)
+    assert key == job_key(dict(reversed(list(make_parameters().items()))), 2, "python", 0), (
+        "The key depends on the order of the parameters"
+    )
+    assert key != job_key(make_parameters(), 3, "python", 0), "Different replicate counts share a key"
+
+
+def test_job_streams_steps_and_results(server):
+    """Verify that a job streams every step of every replicate and then its results."""
+    status, body = request(server, "/jobs", {"parameters": make_parameters(), "replicates": 3, "seed": 5})
+    assert status == 202 and not body["deduplicated"], f"Unexpected response {status} {body}"
+    events = read_events(server, body["events"])
+    steps = [data for name, data in events if name == "step"]
+    assert len(steps) == 3 * 11, f"Expected 33 step events but got {len(steps)}"
+    assert all(sum(data["counts"].values()) == 200 for data in steps), "A step lost individuals"
+    assert events[-1][0] == "done", f"The stream ended with {events[-1][0]}"
+
+    status, job = request(server, f"/jobs/{body['job_id']}")
+    assert job["status"] == "done" and len(job["results"]) == 3, f"Unexpected job {job}"
+    assert job["mean"] == events[-1][1]["mean"], "The streamed mean differs from the job's"
+    assert len(job["mean"]) == 11, f"Expected 11 mean records but got {len(job['mean'])}"
+
+    # Late subscribers get the whole stream replayed
+    assert read_events(server, body["events"]) == events, "Replayed events differ"
+    metrics = request(server, "/metrics")[1]
+    assert metrics["steps"] == 33 and metrics["replicates_done"] == 3, f"Unexpected metrics {metrics}"
+    assert metrics["queue_depth"] == 0 and metrics["running_replicates"] == 0, f"Work was left over {metrics}"
+
+
+def test_identical_jobs_are_shared(server):
+    """Verify that an identical in-flight job is shared and a finished one is run again."""
+    # Hold back the workers' progress, so the first job cannot finish before the second request
+    service = server.service
+    release = threading.Event()
+    apply = service.apply
+
+    def held_apply(message):
+        release.wait()
+        apply(message)
+
+    service.apply = held_apply
+    job = {"parameters": make_parameters(), "replicates": 2}
+    first = request(server, "/jobs", job)[1]
+    status, second = request(server, "/jobs", job)
+    assert status == 200 and second["deduplicated"], f"The identical job was not shared: {second}"
+    assert second["job_id"] == first["job_id"], "The shared job has a different id"
+    assert request(server, "/metrics")[1]["deduplicated"] == 1, "The shared job was not counted"
+
+    release.set()
+    read_events(server, first["events"])
+    third = request(server, "/jobs", job)[1]
+    assert third["job_id"] != first["job_id"], "A finished job was shared"
+    read_events(server, third["events"])
+
+
+def test_failing_job_cancels_its_replicates(capsys):
+    """Verify that a failing replicate fails its job and cancels the others, and that the
+    dispatcher logs a broken message and carries on."""
+    service = SimulationService(processes=1, max_queued=8)
+    try:
+        job, _ = service.submit({"parameters": make_parameters(p_transmission="high"), "replicates": 4})
+        wait_for(lambda: job.events and job.events[-1][0] == "error")
+        assert job.status == "failed" and "TypeError" in job.error, f"Unexpected job {job.describe()}"
+        # The first replicate fails, so the single worker skips the other three
+        wait_for(lambda: service.metrics()["replicates_cancelled"] == 3)
+        metrics = service.metrics()
+        assert metrics["failed"] == 1 and metrics["replicates_done"] == 0, f"Unexpected metrics {metrics}"
+        assert metrics["queue_depth"] == 0 and metrics["running_replicates"] == 0, f"Work was left over {metrics}"
+
+        service.progress.put(("broken",))
+        job, _ = service.submit({"parameters": make_parameters(), "replicates": 1})
+        wait_for(lambda: job.status == "done")
+        assert service.metrics()["dispatch_errors"] == 1, "The broken message was not counted"
+        assert "Traceback" in capsys.readouterr().err, "The broken message was not logged"
+    finally:
+        service.close()
+
+
+def test_finished_jobs_are_evicted():
+    """Verify that only the newest max_finished finished jobs are kept."""
+    service = SimulationService(processes=1, max_queued=8, max_finished=1)
+    try:
+        jobs = []
+        for seed in range(2):
+            job, _ = service.submit({"parameters": make_parameters(), "seed": seed})
+            wait_for(lambda: job.status == "done")
+            jobs.append(job)
+        wait_for(lambda: service.metrics()["evicted"] == 1)
+        assert list(service.jobs) == [jobs[1].job_id], "The older finished job was kept"
+    finally:
+        service.close()
+
+
+def test_bad_requests(server):
+    """Verify that malformed, unknown and oversized requests are refused."""
+    assert request(server, "/jobs", {"parameters": make_parameters(), "engine": "shared"})[0] == 400, (
+        "An engine that cannot run in the pool was accepted"
+    )
+    assert request(server, "/jobs", {"parameters": make_parameters(), "replicates": 0})[0] == 400, (
+        "A job without replicates was accepted"
+    )
+    assert request(server, "/jobs", {"parameters": make_parameters(), "replicates": 9})[0] == 503, (
+        "A job larger than the queue was accepted"
+    )
+    assert request(server, "/jobs/unknown")[0] == 404, "An unknown job was found"
+    assert request(server, "/metrics")[1]["rejected"] == 1, "The refused job was not counted"
+
+
+# Call the main function that is part of pytest so that the
+# computer will execute the test functions in this file.
+pytest.main(["-v", "--tb=line", "-rN", __file__])
@@ -0,0 +1,80 @@
+from simulation_shared import (
+    SharedPopulation,
+    split_ranges,
+    run_simulation_shared
+)
+from simulation_numpy import (
+    SUSCEPTIBLE,
+    make_rng,
+    create_population_arrays,
+    find_infection_pairs,
+    run_simulation_arrays
+)
+from simulation_program import run_simulation
+import random
+import numpy as np
+import pytest
+from conftest import make_parameters
+
+
+def test_shared_population():
+    """Verify that an attached SharedPopulation sees the owner's arrays and changes."""
+    population = create_population_arrays(make_parameters(), make_rng(1))
+    shared = SharedPopulation(population)
+    attached = SharedPopulation(layout=shared.layout())
+    assert np.array_equal(attached.arrays.x, population.x), "The attached positions differ"
+    shared.arrays.state[0] = 3
+    assert attached.arrays.state[0] == 3, "A change was not visible through shared memory"
+    attached.close()
+    shared.close()
+
+
+def test_split_ranges_cover_pairs():
+    """Verify that searching each range finds exactly the pairs of a full search."""
+    parameters = make_parameters(population_size=500, initial_infected=50)
+    population = create_population_arrays(parameters, make_rng(2))
+    expected, _ = find_infection_pairs(population, parameters)
+    shared = SharedPopulation(population)
+    infected_index = shared.infected_index(shared.index_infected(parameters))
+    found = []
+    indexed = []
+    for start, end in split_ranges(len(population), 3):
+        susceptible = start + np.flatnonzero(population.state[start:end] == SUSCEPTIBLE)
+        found.append(find_infection_pairs(population, parameters, susceptible=susceptible)[0])
+        indexed.append(find_infection_pairs(population, parameters, susceptible=susceptible,
+                                            infected_index=infected_index)[0])
+    shared.close()
+    assert sorted(np.concatenate(found).tolist()) == sorted(expected.tolist()), (
+        "The ranges found different pairs than the full search"
+    )
+    assert sorted(np.concatenate(indexed).tolist()) == sorted(expected.tolist()), (
+        "The shared infected index found different pairs than the full search"
+    )
+
+
+def test_shared_matches_single_process():
+    """Verify that the parallel infection phase infects the same individuals as the array engine."""
+    # Without movement, transmission or death chances the run is deterministic
+    parameters = make_parameters(movement_rate=0, p_transmission=1.0, p_death=0.0,
+                                 population_size=600, initial_infected=3, simulation_steps=8,
+                                 stop_when_extinct=False)
+    expected = run_simulation_arrays(parameters, rng=make_rng(5))
+    results = run_simulation_shared(parameters, processes=3, rng=make_rng(5))
+    assert results == expected, "The shared-memory run differs from the single-process run"
+
+
+def test_shared_run_simulation():
+    """Verify that the shared engine runs through run_simulation."""
+    random.seed(3)
+    parameters = make_parameters(workers=2, scheduled_recovery=True, stop_when_extinct=False)
+    results = run_simulation(parameters, engine="shared")
+    assert len(results) == parameters["simulation_steps"] + 1, (
+        f"Expected {parameters['simulation_steps'] + 1} records but got {len(results)}"
+    )
+    for counts in results:
+        assert sum(counts.values()) == parameters["population_size"], f"Individuals were lost: {counts}"
+
+
+# Call the main function that is part of pytest so that the
+# computer will execute the test functions in this file.
+pytest.main(["-v", "--tb=line", "-rN", __file__])
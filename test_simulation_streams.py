@@ -0,0 +1,72 @@
+from simulation_streams import (
+    MOVE_X,
+    TRANSMISSION,
+    CounterStreams,
+    philox4x32,
+    make_streams
+)
+from simulation_numpy import make_rng, run_simulation_arrays
+from simulation_shared import run_simulation_shared
+from simulation_distributed import run_simulation_distributed
+from simulation_ensemble import run_replicates
+import numpy as np
+import pytest
+from conftest import make_parameters
+
+
+def test_philox4x32_known_answers():
+    """Verify philox4x32 against the Random123 known-answer vectors."""
+    cases = [
+        ((0, 0, 0, 0), (0, 0), (0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8)),
+        ((0xffffffff,) * 4, (0xffffffff,) * 2, (0x408f276d, 0x41c83b0e, 0xa20bc7c6, 0x6d5451fd)),
+        ((0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344), (0xa4093822, 0x299f31d0),
+         (0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1))
+    ]
+    for counter, key, expected in cases:
+        words = tuple(int(word) for word in philox4x32(counter, key))
+        assert words == expected, f"Philox output {words} does not match {expected}"
+
+
+def test_counter_streams_are_random_access():
+    """Verify that a draw only depends on its seed, step, purpose and individuals."""
+    streams = CounterStreams(7, step=3)
+    ids = np.arange(1000)
+    draws = streams.uniform(MOVE_X, ids)
+    assert np.all((draws >= 0) & (draws < 1)), "Draws fell outside [0, 1)"
+    assert abs(draws.mean() - 0.5) < 0.05, f"Draws have mean {draws.mean()}"
+    assert np.array_equal(streams.uniform(MOVE_X, ids[::-1])[::-1], draws), (
+        "Draws depend on the order they were asked for in"
+    )
+    assert not np.array_equal(streams.uniform(TRANSMISSION, ids), draws), "Purposes share draws"
+    assert not np.array_equal(CounterStreams(8, step=3).uniform(MOVE_X, ids), draws), "Seeds share draws"
+    assert make_streams({}) is None, "Streams were made without a seed"
+
+
+def test_seeded_engines_are_bit_identical():
+    """Verify that a seeded run gives the same counts on every engine and worker count."""
+    for aggregate_draws in (False, True):
+        parameters = make_parameters(seed=2024, aggregate_draws=aggregate_draws)
+        expected = run_simulation_arrays(parameters, rng=make_rng(1))
+        assert expected[-1]["recovered"] + expected[-1]["dead"] > 0, "Nobody recovered or died"
+        assert run_simulation_arrays(parameters, rng=make_rng(2)) == expected, (
+            "The seeded run depends on the generator"
+        )
+        for processes in (1, 3):
+            results = run_simulation_shared(parameters, processes=processes)
+            assert results == expected, f"The shared run with {processes} workers differs"
+        for workers in (1, 2, 4, 6):
+            results = run_simulation_distributed(parameters, workers=workers)
+            assert results == expected, f"The distributed run with {workers} workers differs"
+
+
+def test_replicates_get_their_own_seed():
+    """Verify that seeded replicates still differ from each other."""
+    runs = run_replicates(make_parameters(seed=2024), 3, seed=4, processes=1, engine="numpy")
+    assert not np.array_equal(runs[0], runs[1]), "Replicates shared the parameters' seed"
+    again = run_replicates(make_parameters(seed=99), 3, seed=4, processes=1, engine="numpy")
+    assert np.array_equal(runs, again), "Replicates depend on the parameters' seed"
+
+
+# Call the main function that is part of pytest so that the
+# computer will execute the test functions in this file.
+pytest.main(["-v", "--tb=line", "-rN", __file__])
@@ -0,0 +1,76 @@
+from simulation_sweep import (
+    grid_points,
+    latin_hypercube,
+    cache_key,
+    load_cached,
+    run_sweep
+)
+import os
+import pytest
+from conftest import make_parameters
+
+
+def test_grid_points():
+    """Verify that grid_points builds every combination of values."""
+    points = grid_points({"p_transmission": [0.1, 0.2], "movement_rate": [1, 2, 3]})
+    assert len(points) == 6, f"Expected 6 grid points but got {len(points)}"
+    assert {"p_transmission": 0.2, "movement_rate": 3} in points, "A grid point is missing"
+
+
+def test_latin_hypercube():
+    """Verify that latin_hypercube uses each stratum once and rounds integer bounds."""
+    points = latin_hypercube({"p_transmission": (0.0, 1.0), "population_size": (10, 20)}, 5, seed=1)
+    strata = sorted(int(point["p_transmission"] * 5) for point in points)
+    assert strata == [0, 1, 2, 3, 4], f"Expected one sample per stratum but got {strata}"
+    for point in points:
+        assert isinstance(point["population_size"], int), (
+            f"Expected an integer population_size but got {point['population_size']}"
+        )
+        assert 10 <= point["population_size"] <= 20, (
+            f"population_size {point['population_size']} is outside its bounds"
+        )
+
+
+def test_cache_key():
+    """Verify that cache_key depends on the content and not on dictionary order."""
+    first = cache_key({"a": 1, "b": 2}, 0)
+    assert first == cache_key({"b": 2, "a": 1}, 0), "Key order changed the cache key"
+    assert first != cache_key({"a": 1, "b": 2}, 1), "The seed did not change the cache key"
+
+
+def test_run_sweep_uses_cache(tmp_path):
+    """Verify that run_sweep returns a tidy DataFrame and reuses cached runs."""
+    parameters = make_parameters()
+    points = grid_points({"p_transmission": [0.1, 0.5]})
+    df = run_sweep(parameters, points, seeds=[1, 2], cache_dir=str(tmp_path), processes=2)
+    expected_rows = 2 * 2 * (parameters["simulation_steps"] + 1)
+    assert df.shape[0] == expected_rows, f"Expected {expected_rows} rows but got {df.shape[0]}"
+    assert list(df.index.names) == ["p_transmission", "seed", "Time Step"], (
+        f"Unexpected index names {df.index.names}"
+    )
+    cached_files = sum(len(files) for _, _, files in os.walk(tmp_path))
+    assert cached_files == 4, f"Expected 4 cached runs but found {cached_files}"
+
+    # Extending the sweep only runs the new point, and cached points are unchanged
+    extended = run_sweep(parameters, grid_points({"p_transmission": [0.1, 0.5, 0.9]}),
+                         seeds=[1, 2], cache_dir=str(tmp_path), processes=1)
+    cached_files = sum(len(files) for _, _, files in os.walk(tmp_path))
+    assert cached_files == 6, f"Expected 6 cached runs but found {cached_files}"
+    assert extended.loc[0.5].equals(df.loc[0.5]), "Cached results changed between sweeps"
+    key = cache_key(dict(parameters, p_transmission=0.9), 2)
+    assert load_cached(str(tmp_path), key) is not None, "The new point was not cached"
+
+
+def test_run_sweep_without_points():
+    """Verify that an empty sweep returns an empty DataFrame with the usual columns and index."""
+    df = run_sweep(make_parameters(), [])
+    assert df.empty, f"Expected an empty DataFrame but got {len(df)} rows"
+    assert list(df.columns) == ["susceptible", "infected", "recovered", "dead"], (
+        f"Unexpected columns {list(df.columns)}"
+    )
+    assert list(df.index.names) == ["seed", "Time Step"], f"Unexpected index names {df.index.names}"
+
+
+# Call the main function that is part of pytest so that the
+# computer will execute the test functions in this file.
+pytest.main(["-v", "--tb=line", "-rN", __file__])